@@ -1,7 +1,9 @@
+from weakref import WeakKeyDictionary
+
 from .ifp_object import IFPObject
 from .thing_base import Thing
 from . import vocab
-from .tokenizer import cleanInput, tokenize, removeArticles
+from .tokenizer import cleanInput, tokenize, removeArticles, PhraseIndex
 
 ##############################################################
 # ACTOR.PY - the Actor class for IntFicPy
@@ -47,6 +49,10 @@ class Actor(Thing):
 
     POSITION_STATE_DESC_KEY = "position_state_desc"
 
+    # special topic indexes, by Actor
+    # Indexes are kept outside of the Actor, so they are never saved
+    _special_topic_indexes = WeakKeyDictionary()
+
     def __init__(self, game, name):
         super().__init__(game, name)
 
@@ -242,8 +248,13 @@ class Actor(Thing):
         :type topic: SpecialTopic
         """
         topic.owner = self
+        index = self.special_topic_index
+        if topic.suggestion not in self.special_topics:
+            index.add(topic.suggestion)
         self.special_topics[topic.suggestion] = topic
         for x in topic.alternate_phrasings:
+            if x not in self.special_topics_alternate_keys:
+                index.add(x)
             self.special_topics_alternate_keys[x] = topic
 
     def removeSpecialTopic(self, topic):
@@ -253,11 +264,37 @@ class Actor(Thing):
         :param topic: the SpecialTopic to remove
         :type topic: SpecialTopic
         """
+        index = self.special_topic_index
         if topic.suggestion in self.special_topics:
             del self.special_topics[topic.suggestion]
+            index.remove(topic.suggestion)
         for x in topic.alternate_phrasings:
             if x in self.special_topics_alternate_keys:
                 del self.special_topics_alternate_keys[x]
+                index.remove(x)
+
+    @property
+    def special_topic_index(self):
+        """A PhraseIndex of the suggestions and alternate phrasings of this Actor's
+        SpecialTopics, used by the parser to match the player's response to a
+        suggestion. Rebuilt if `special_topics` or `special_topics_alternate_keys`
+        have been replaced, as they are when a game is loaded.
+        """
+        index = self._special_topic_indexes.get(self)
+        if (
+            index is None
+            or index.source[0] is not self.special_topics
+            or index.source[1] is not self.special_topics_alternate_keys
+        ):
+            index = PhraseIndex(
+                source=(self.special_topics, self.special_topics_alternate_keys)
+            )
+            for phrase in self.special_topics:
+                index.add(phrase)
+            for phrase in self.special_topics_alternate_keys:
+                index.add(phrase)
+            self._special_topic_indexes[self] = index
+        return index
 
     def removeAllSpecialTopics(self):
         """Clear all SpecialTopics from this Actor. This removes all conversation
@@ -291,13 +328,10 @@ class Actor(Thing):
         if self.special_topics != {}:
             for suggestion in self.special_topics:
                 game.addTextToEvent("turn", "(You could " + suggestion + ")")
-                game.parser.command.specialTopics[suggestion] = self.special_topics[
-                    suggestion
-                ]
-            for phrasing in self.special_topics_alternate_keys:
-                game.parser.command.specialTopics[
-                    phrasing
-                ] = self.special_topics_alternate_keys[phrasing]
+            game.parser.command.specialTopics.update(self.special_topics)
+            game.parser.command.specialTopics.update(
+                self.special_topics_alternate_keys
+            )
 
     def defaultTopic(self, game):
         """Called when the Actor's default topic is triggered. Prints the `default_topic`
@@ -699,6 +733,10 @@ class SpecialTopic(Topic):
         :type phrasing: str
         """
         self.alternate_phrasings.append(phrasing)
+        if self.owner and self.owner.special_topics.get(self.suggestion) is self:
+            if phrasing not in self.owner.special_topics_alternate_keys:
+                self.owner.special_topic_index.add(phrasing)
+            self.owner.special_topics_alternate_keys[phrasing] = self
 
 
 class SaleItem(IFPObject):
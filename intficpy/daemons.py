@@ -1,35 +1,305 @@
+import time
+import warnings
+from heapq import heapify, heappush, heappop
+
 from intficpy.ifp_object import IFPObject
+from intficpy.exceptions import DaemonBudgetWarning
+
+
+class DaemonTimer:
+    """
+    Records how long each Daemon takes to run
+    Timings are not saved with the game.
+    """
+
+    def __init__(self):
+        # daemon ix -> [number of runs, total seconds, longest run in seconds]
+        self.timings = {}
+
+    def record(self, daemon, elapsed):
+        timing = self.timings.get(daemon.ix)
+        if timing is None:
+            self.timings[daemon.ix] = [1, elapsed, elapsed]
+        else:
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+
+    def report(self):
+        """
+        Get the timings of every Daemon that has run, slowest in total first
+        Returns a list of (daemon ix, runs, total seconds, longest run in seconds)
+        """
+        return sorted(
+            [(ix, *timing) for ix, timing in self.timings.items()],
+            key=lambda timing: timing[2],
+            reverse=True,
+        )
+
+    def reset(self):
+        self.timings = {}
 
 
 class DaemonManager(IFPObject):
+    """
+    Runs the game's Daemons at the end of each turn
+
+    Daemons added with `add` run every turn until they are removed. A Daemon can
+    also be scheduled to run once, either a set number of turns from now
+    (`schedule`), or at the end of the turn on which an event fires
+    (`waitFor`/`notify`).
+    Scheduled Daemons are kept in a priority queue by turn, so only the Daemons that
+    are due are looked at each turn.
+
+    Daemons that are due run in order of their `priority` (lowest first). Every run
+    is timed (see `timer`), and a DaemonBudgetWarning is issued when a Daemon takes
+    longer than its `time_budget`, or the manager's `time_budget` if the Daemon
+    does not set one.
+
+    Daemons marked `pure` all run first, before any other Daemon that is due, so
+    they see the game as it was when the Daemons started. Their effects are then
+    applied in priority order, together with the runs of the other Daemons. If
+    `use_threads` is True, the pure Daemons run in a pool of worker threads.
+    """
+
+    # default soft time budget per daemon, in seconds, or None for no budget
+    time_budget = None
+    use_threads = False
+    max_workers = 4
+
     def __init__(self, game):
         super().__init__(game)
         self.active = []
+        self.turn = 0
+        # heap of [turn, order scheduled, daemon]
+        self.scheduled = []
+        self.next_seq = 0
+        # event name -> list of daemons to wake when the event fires
+        self.waiting = {}
+        self.running = False
+        self.timer = DaemonTimer()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # worker threads belong to the running session
+        state.pop("_executor", None)
+        return state
 
     def runAll(self, game):
-        for daemon in self.active:
-            daemon.func(game)
+        self.turn += 1
+        self.running = True
+        try:
+            due = list(self.active)
+            while self.scheduled and self.scheduled[0][0] <= self.turn:
+                due.append(heappop(self.scheduled)[2])
+            self._runDaemons(game, sorted(due, key=lambda daemon: daemon.priority))
+            # daemons can schedule others to run on the current turn
+            while self.scheduled and self.scheduled[0][0] <= self.turn:
+                self._runDaemons(game, [heappop(self.scheduled)[2]])
+        finally:
+            self.running = False
+
+    def _runDaemons(self, game, daemons):
+        # run every pure daemon before the game changes
+        pure = [daemon for daemon in daemons if daemon.pure]
+        if self.use_threads and len(pure) > 1:
+            executor = self._getExecutor()
+            futures = [executor.submit(_timeDaemon, daemon, game) for daemon in pure]
+            results = [future.result() for future in futures]
+        else:
+            results = [_timeDaemon(daemon, game) for daemon in pure]
+        results = iter(results)
+
+        # then apply their effects, and run the other daemons, in priority order
+        for daemon in daemons:
+            if daemon.pure:
+                ret, elapsed = next(results)
+                self._checkBudget(daemon, elapsed)
+                daemon.applyEffects(game, ret)
+            else:
+                ret, elapsed = _timeDaemon(daemon, game)
+                self._checkBudget(daemon, elapsed)
+
+    def _checkBudget(self, daemon, elapsed):
+        self.timer.record(daemon, elapsed)
+        budget = daemon.time_budget
+        if budget is None:
+            budget = self.time_budget
+        if budget is not None and elapsed > budget:
+            warnings.warn(
+                f"Daemon {daemon.ix} ({daemon.func}) took {elapsed * 1000:.1f}ms to "
+                f"run, exceeding its time budget of {budget * 1000:.1f}ms",
+                DaemonBudgetWarning,
+            )
+
+    def _getExecutor(self):
+        # created on first use, and never saved, so loading a game cannot replace it
+        executor = self.__dict__.get("_executor")
+        if executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            executor = self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="ifp-daemon"
+            )
+        return executor
+
+    def shutdown(self):
+        """
+        Stop the worker threads used for pure daemons, if any were started
+        """
+        executor = self.__dict__.pop("_executor", None)
+        if executor is not None:
+            executor.shutdown()
 
     def add(self, daemon):
         self.active.append(daemon)
         daemon.onAdd()
 
     def remove(self, daemon):
+        """
+        Stop running the Daemon every turn, and cancel any scheduled runs or events
+        it is waiting for
+        """
         if daemon in self.active:
             self.active.remove(daemon)
             daemon.onRemove()
+        self.cancel(daemon)
+
+    def schedule(self, daemon, turns=1):
+        """
+        Run the Daemon once, at the end of the turn the given number of turns from
+        now. Scheduling for 0 turns runs the Daemon at the end of the current turn.
+
+        :param daemon: the Daemon to run
+        :type daemon: Daemon
+        :param turns: the number of turns from now
+        :type turns: int
+        """
+        # self.turn is the number of the turn whose daemons are running, or the
+        # last turn whose daemons ran
+        current_turn = self.turn if self.running else self.turn + 1
+        heappush(self.scheduled, [current_turn + turns, self.next_seq, daemon])
+        self.next_seq += 1
+
+    def waitFor(self, daemon, event):
+        """
+        Run the Daemon once, at the end of the turn on which the event fires
+
+        :param daemon: the Daemon to run
+        :type daemon: Daemon
+        :param event: the name of the event to wait for
+        :type event: str
+        """
+        if event in self.waiting:
+            if daemon not in self.waiting[event]:
+                self.waiting[event].append(daemon)
+        else:
+            self.waiting[event] = [daemon]
+
+    def notify(self, event):
+        """
+        Fire an event, scheduling all Daemons waiting for it to run at the end of
+        the current turn
+
+        :param event: the name of the event
+        :type event: str
+        """
+        for daemon in self.waiting.pop(event, []):
+            self.schedule(daemon, 0)
+
+    def cancel(self, daemon):
+        """
+        Cancel any scheduled runs of the Daemon, and any events it is waiting for
+        """
+        scheduled = [entry for entry in self.scheduled if entry[2] is not daemon]
+        if len(scheduled) != len(self.scheduled):
+            self.scheduled = scheduled
+            heapify(self.scheduled)
+        for event in list(self.waiting):
+            if daemon in self.waiting[event]:
+                self.waiting[event].remove(daemon)
+                if not self.waiting[event]:
+                    del self.waiting[event]
+
+    def isScheduled(self, daemon):
+        """
+        Check whether the Daemon will run, either every turn, on a scheduled turn,
+        or when an event fires
+        """
+        return (
+            daemon in self.active
+            or any(entry[2] is daemon for entry in self.scheduled)
+            or any(daemon in daemons for daemons in self.waiting.values())
+        )
+
+
+def _timeDaemon(daemon, game):
+    """
+    Run a Daemon's func
+    Returns a tuple of the func's return value, and the time it took in seconds
+    """
+    start = time.perf_counter()
+    ret = daemon.func(game)
+    return ret, time.perf_counter() - start
 
 
 class Daemon(IFPObject):
     """
     While active, a Daemon's func is run every turn.
+    Alternatively, a Daemon can ask to run once, a number of turns from now
+    (`wakeIn`), or on the turn an event fires (`wakeOn`). To keep running, the
+    Daemon's func can ask again.
     Properties added to a Daemon object will be saved/loaded, provided they are
     serializable, and can be added so a Daemon can track its own state.
+
+    A pure Daemon's func must not change the game. Instead, it returns its effects:
+    text to add to the turn, a function that takes the game as its only argument,
+    or a list of these, and they are applied for it, in priority order with the
+    other Daemons. Pure Daemons run before any other Daemon that is due on the same
+    turn, and, if the DaemonManager's `use_threads` is set, in worker threads.
+
+    :param priority: Daemons with lower priority run first
+    :type priority: int
+    :param pure: whether the Daemon only computes and returns its effects
+    :type pure: bool
+    :param time_budget: soft time budget in seconds, overriding the
+        DaemonManager's `time_budget`
+    :type time_budget: float
     """
 
-    def __init__(self, game, func):
+    def __init__(self, game, func, priority=0, pure=False, time_budget=None):
         super().__init__(game)
         self.func = func
+        self.priority = priority
+        self.pure = pure
+        self.time_budget = time_budget
+
+    def applyEffects(self, game, effects):
+        """
+        Apply the effects returned by a pure Daemon's func
+        """
+        if effects is None:
+            return
+        if not isinstance(effects, list):
+            effects = [effects]
+        for effect in effects:
+            if callable(effect):
+                effect(game)
+            elif effect:
+                game.addTextToEvent("turn", str(effect))
+
+    def wakeIn(self, turns):
+        """
+        Run this Daemon once, at the end of the turn the given number of turns from
+        now
+        """
+        self.game.daemons.schedule(self, turns)
+
+    def wakeOn(self, event):
+        """
+        Run this Daemon once, at the end of the turn on which the event fires
+        """
+        self.game.daemons.waitFor(self, event)
 
     def onRemove(self):
         pass
@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+
+##############################################################
+# EVENT_BUS.PY - world mutation events for IntFicPy
+# Defines the EventBus class
+##############################################################
+
+# events published by IntFicPy, with the keyword arguments passed to subscribers
+# "contains_added" - container, item
+# "contains_removed" - container, item
+# "opened", "closed" - item
+# "locked", "unlocked" - item
+# "discovered" - room
+# "achievement" - achievement
+
+
+class EventBus:
+    """
+    Publishes changes to the game world to the functions that subscribe to them,
+    so authors can react to a change when it happens, instead of checking for it in
+    a Daemon every turn
+
+    A subscriber is called with the game, followed by the event's data as keyword
+    arguments. Synchronous subscribers are called as soon as the event is
+    published. Deferred subscribers are queued, and called in the order their events
+    were published when the bus is flushed, after the player's command, and again
+    after the Daemons have run.
+
+    Publishing an event also wakes any Daemons waiting for it (see
+    DaemonManager.waitFor).
+
+    Subscriptions are saved in snapshots, but not in save files, so subscribers
+    should be added when the game is built, and must be functions defined at the top
+    level of a module to be included in a snapshot.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        # event name -> list of (callback, deferred)
+        self.subscribers = {}
+        # list of (callback, data) waiting for flush
+        self.queue = []
+        self.paused_depth = 0
+
+    def subscribe(self, event, callback, deferred=False):
+        """
+        Call a function whenever an event is published
+
+        :param event: the name of the event
+        :type event: str
+        :param callback: the function to call, taking the game as its first argument,
+            and the event's data as keyword arguments
+        :type callback: function
+        :param deferred: whether to wait for the end of the command to call the
+            function
+        :type deferred: bool
+        """
+        subscription = (callback, bool(deferred))
+        if event in self.subscribers:
+            if subscription not in self.subscribers[event]:
+                self.subscribers[event].append(subscription)
+        else:
+            self.subscribers[event] = [subscription]
+
+    def unsubscribe(self, event, callback):
+        """
+        Stop calling a function when an event is published
+        """
+        subscriptions = self.subscribers.get(event)
+        if not subscriptions:
+            return
+        subscriptions[:] = [sub for sub in subscriptions if sub[0] != callback]
+        if not subscriptions:
+            del self.subscribers[event]
+
+    def publish(self, event, **data):
+        """
+        Publish an event, calling its synchronous subscribers now, and queueing its
+        deferred subscribers
+        Does nothing while the bus is paused
+
+        :param event: the name of the event
+        :type event: str
+        """
+        if self.paused_depth:
+            return
+        self.game.daemons.notify(event)
+        subscriptions = self.subscribers.get(event)
+        if not subscriptions:
+            return
+        # copy, so subscribers can unsubscribe themselves
+        for callback, deferred in list(subscriptions):
+            if deferred:
+                self.queue.append((callback, data))
+            else:
+                callback(self.game, **data)
+
+    def flush(self):
+        """
+        Call the deferred subscribers of every event published since the last flush
+        Events published by the subscribers are delivered in the same flush
+        """
+        while self.queue:
+            queue = self.queue
+            self.queue = []
+            for callback, data in queue:
+                callback(self.game, **data)
+
+    @property
+    def paused(self):
+        return bool(self.paused_depth)
+
+    @contextmanager
+    def pause(self):
+        """
+        Context manager to stop publishing events, for instance while a saved game
+        is loaded
+        """
+        self.paused_depth += 1
+        try:
+            yield self
+        finally:
+            self.paused_depth -= 1
@@ -78,3 +78,11 @@ class NoMatchingSuggestion(Exception):
 
 class IFPError(Exception):
     pass
+
+
+class DaemonBudgetWarning(UserWarning):
+    """
+    A Daemon took longer to run than its time budget
+    """
+
+    pass
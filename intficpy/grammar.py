@@ -1,4 +1,99 @@
 from .tokenizer import cleanInput, tokenize, removeArticles
+from .vocab import english
+
+# the roles a token can play in a player command
+PREPOSITION = "preposition"
+KEYWORD = "keyword"
+NOUN = "noun"
+ADJECTIVE = "adjective"
+DIRECTION = "direction"
+NUMBER = "number"
+ROLES = (PREPOSITION, KEYWORD, NOUN, ADJECTIVE, DIRECTION, NUMBER)
+
+EMPTY = frozenset()
+
+
+class TokenRoles:
+    """
+    The roles each token of a player command can play, found once when the command
+    is parsed, so the parser's later stages can look them up instead of searching
+    the vocabulary again
+
+    A token is a known adjective if it is an adjective of a Thing named by one of the
+    other tokens in the command.
+
+    :param tokens: the command's tokens
+    :type tokens: list of str
+    :param nouns: the game's nouns, mapping each noun to a list of Things
+    :type nouns: dict
+    :param directions: the direction words
+    :type directions: dict or set
+    """
+
+    def __init__(self, tokens, nouns, directions):
+        self.token_set = frozenset(tokens)
+        # token -> position of its first occurrence
+        self.positions = {}
+        self.by_token = {}
+        # role -> list of tokens with that role, in command order
+        self.by_role = {role: [] for role in ROLES}
+        # adjective -> the nouns in the command naming a Thing with that adjective
+        self.described_nouns = {}
+
+        for i, tok in enumerate(tokens):
+            if tok in self.by_token:
+                continue
+            self.positions[tok] = i
+            roles = set()
+            if tok in english.prepositions:
+                roles.add(PREPOSITION)
+            if tok in english.keywords:
+                roles.add(KEYWORD)
+            if tok in nouns:
+                roles.add(NOUN)
+                for item in nouns[tok]:
+                    for adjective in item.adjectives:
+                        if adjective in self.token_set:
+                            self.described_nouns.setdefault(adjective, set()).add(tok)
+            if tok in directions:
+                roles.add(DIRECTION)
+            if tok.isdigit():
+                roles.add(NUMBER)
+            self.by_token[tok] = roles
+
+        for adjective in self.described_nouns:
+            self.by_token[adjective].add(ADJECTIVE)
+        for tok in tokens:
+            for role in self.by_token[tok]:
+                self.by_role[role].append(tok)
+
+    def has(self, tok, role):
+        """
+        Check whether a token of the command can play the given role
+        """
+        return role in self.by_token.get(tok, EMPTY)
+
+    def index(self, tok):
+        """
+        The position of the token's first occurrence in the command
+        Raises ValueError if the token is not in the command, like list.index
+        """
+        try:
+            return self.positions[tok]
+        except KeyError:
+            raise ValueError(f"{tok!r} is not in the command")
+
+    def tokens(self, role):
+        """
+        The command's tokens that can play the given role, in command order
+        """
+        return self.by_role[role]
+
+    def describes(self, adjective, noun):
+        """
+        Check whether the adjective belongs to a Thing named by the noun
+        """
+        return noun in self.described_nouns.get(adjective, EMPTY)
 
 
 class GrammarObject(object):
@@ -18,6 +113,8 @@ class Command(object):
         self.input_string = cleanInput(input_string)
         self.tokens = tokenize(self.input_string)
 
+        self.roles = None
+
         self.verb_matches = []
         self.verb = None
         self.verb_form = None
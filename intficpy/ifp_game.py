@@ -1,7 +1,11 @@
 from .parser import Parser
 from .daemons import DaemonManager
+from .event_bus import EventBus
 from .score import AbstractScore, HintSystem
+from .storage import MemoryEngine
 from .event import IFPEvent
+from .text_store import StoryText
+from .tokenizer import splitCommands
 from .verb import get_base_verbset
 
 
@@ -95,37 +99,114 @@ class GameInfo:
 
 
 class IFPGame:
+    # whether to split input into several commands (see turnMain)
+    split_commands = True
+    # whether to compress save files, with a preset dictionary built from the game's
+    # classes (see serializer.build_save_dictionary)
+    compress_saves = False
+    # whether to leave text attributes out of saves while they are unchanged since
+    # the game started (see recordSaveDefaults)
+    # Saves made this way can only be loaded by a game that creates the same
+    # objects, as objects missing from the game cannot be recreated without their
+    # text
+    omit_unchanged_text = False
+
     def __init__(self, app, main="__main__"):
         # Track the game objects and their vocublary
         self.ifp_objects = {}
         self.next_obj_ix = 0
         self.nouns = {}
+        # incremented whenever nouns or adjectives change, so the parser knows
+        # when its cached syntax analyses are out of date
+        self.lexicon_generation = 0
+        self.text_store = None
         self.verbs = get_base_verbset()
 
         self.app = app
         app.game = self
 
-        self.main = __import__(main)
+        self.main_name = main
+        self._main = None
         self.aboutGame = GameInfo()
 
         self.daemons = DaemonManager(self)
+        self.event_bus = EventBus(self)
         self.parser = Parser(self)
 
         self.ended = False
         self.next_events = {}
+        # events from earlier commands in the same input, waiting to be printed
+        self.batched_events = []
+        # with an async app, file prompts and printed events waiting to be awaited
+        # by turnMainAsync
+        self.pending_prompts = []
+        self.pending_output = []
 
         self.turn_event_style = None
         self.command_event_style = None
         self.echo_on = getattr(self.app, "echo_on", True)
 
         self.recfile = None
+        # set to a serializer.AutoSave to save at the end of every turn
+        self.autosave = None
+        # preset dictionary for compressed saves, built on first use
+        self.save_dictionary = None
+        # ix -> {attribute: text}, recorded when the game starts
+        self.save_defaults = {}
+        # where the state of the game's objects is kept (see storage.py)
+        self.storage = MemoryEngine()
         self.turn_list = []
         self.back = 0
 
         self.score = AbstractScore(self)
         self.hints = HintSystem(self)
 
-    def runTurnEvents(self):
+    # attributes that belong to the running session, and are not part of the world
+    TRANSIENT_ATTRIBUTES = (
+        "app",
+        "_main",
+        "parser",
+        "next_events",
+        "batched_events",
+        "pending_prompts",
+        "pending_output",
+        "autosave",
+        "storage",
+    )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attr in self.TRANSIENT_ATTRIBUTES:
+            state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.app = None
+        self._main = None
+        self.parser = Parser(self)
+        self.next_events = {}
+        self.batched_events = []
+        self.pending_prompts = []
+        self.pending_output = []
+        self.autosave = None
+        self.storage = MemoryEngine()
+
+    @property
+    def main(self):
+        """
+        The game's main module, used for <<main_module.attribute>> string replacements
+        Imported on first use
+        """
+        if self._main is None:
+            self._main = __import__(self.main_name)
+        return self._main
+
+    def _takeTurnEvents(self):
+        """
+        Remove the current turn's events
+        Returns a list of the events to print, in order of priority
+        """
         events = sorted(
             [
                 event
@@ -136,15 +217,48 @@ class IFPGame:
             ],
             key=lambda x: x.priority,
         )
-        for event in events:
-            self.app.printEventText(event)
         self.next_events.clear()
+        return events
+
+    def runTurnEvents(self):
+        events = self.batched_events + self._takeTurnEvents()
+        self.batched_events = []
+        for event in events:
+            printed = self.app.printEventText(event)
+            if hasattr(printed, "__await__"):
+                # an async app; awaited by turnMainAsync
+                self.pending_output.append(printed)
+        self.addEvent("turn", 5, style=self.turn_event_style)
+
+    def batchTurnEvents(self):
+        """
+        Hold back the current turn's events, to be printed along with the next
+        turn's, and start the next turn
+        """
+        self.batched_events += self._takeTurnEvents()
         self.addEvent("turn", 5, style=self.turn_event_style)
 
     @staticmethod
     def gameOpening(game):
         pass
 
+    def recordSaveDefaults(self):
+        """
+        Record the text attributes of every object, as the world is built, so saves
+        can leave out the text that has not changed since
+        The strings are shared with the objects, not copied.
+        """
+        defaults = {}
+        for ix, obj in self.ifp_objects.items():
+            text = {
+                attr: value
+                for attr, value in obj.__dict__.items()
+                if type(value) is str or type(value) is StoryText
+            }
+            if text:
+                defaults[ix] = text
+        self.save_defaults = defaults
+
     def initGame(self):
         from .things import Abstract
 
@@ -156,10 +270,13 @@ class IFPGame:
         self.reflexive.addSynonym("themselves")
         self.reflexive.makeKnown(self.me)
 
+        if self.omit_unchanged_text:
+            self.recordSaveDefaults()
+
         self.addEvent("turn", 5, style=self.turn_event_style)
         self.gameOpening(self)
         self.parser.roomDescribe()
-        self.daemons.runAll(self)
+        self.runDaemons()
         self.runTurnEvents()
 
     def turnMain(self, input_string):
@@ -168,13 +285,125 @@ class IFPGame:
         Runs daemons
         Runs turn events
         Takes argument input_string, the cleaned user input string
+
+        Input with several commands, such as "take lamp. n. open door then e", is
+        run one command per turn, with the daemons run after each. Running stops
+        early if a command fails, needs disambiguation, or ends the game. The text
+        of every turn is printed together at the end.
         """
         if len(input_string) == 0:
             return 0
-        # parse string
-        self.parser.parseInput(input_string)
-        self.daemons.runAll(self)
+        for i, command in enumerate(self._splitInput(input_string)):
+            if i:
+                self.batchTurnEvents()
+            # parse string
+            self.parser.parseInput(command)
+            self.runDaemons()
+            if self._stopAfterCommand():
+                break
+        self.runTurnEvents()
+        self._endTurn()
+
+    async def turnMainAsync(self, input_string):
+        """
+        Run a turn, as turnMain does, for an app whose printEventText,
+        saveFilePrompt and openFilePrompt are coroutine functions
+        The app's file prompts are awaited after the command that asked for them,
+        before the daemons run, and the turn's text is awaited once the turn is
+        over. Nothing blocks, so one event loop can run many games at once.
+        """
+        if len(input_string) == 0:
+            return 0
+        for i, command in enumerate(self._splitInput(input_string)):
+            if i:
+                self.batchTurnEvents()
+            self.parser.parseInput(command)
+            await self.awaitPrompts()
+            self.runDaemons()
+            if self._stopAfterCommand():
+                break
         self.runTurnEvents()
+        await self.flushOutput()
+        self._endTurn()
+
+    async def initGameAsync(self):
+        """
+        Start the game, as initGame does, awaiting the opening text for an async app
+        """
+        self.initGame()
+        await self.flushOutput()
+
+    def _splitInput(self, input_string):
+        if self.split_commands:
+            return splitCommands(input_string) or [input_string]
+        return [input_string]
+
+    def _stopAfterCommand(self):
+        command = self.parser.command
+        return self.ended or command.err or command.ambiguous
+
+    def _endTurn(self):
+        self.storage.end_turn()
+        if self.autosave:
+            self.autosave.end_turn()
+
+    def requestFile(self, prompt, extension, filetype_desc, msg, callback):
+        """
+        Ask the app for a file name, and pass the answer to a callback, as
+        callback(game, filename)
+        If the app's prompt is a coroutine function, the callback is called once
+        turnMainAsync has awaited the answer, after the current command.
+
+        :param prompt: "save" to ask for a file to write, or "open" for a file
+            to read
+        :type prompt: str
+        :param extension: the file extension, such as ".sav"
+        :type extension: str
+        :param filetype_desc: a description of the type of file
+        :type filetype_desc: str
+        :param msg: the message to show the player
+        :type msg: str
+        :param callback: the function to call with the game and the file name (or
+            None if no file was chosen)
+        :type callback: function
+        Returns the callback's return value, or None if the answer is awaited later
+        """
+        if prompt == "save":
+            ask = self.app.saveFilePrompt
+        else:
+            ask = self.app.openFilePrompt
+        filename = ask(extension, filetype_desc, msg)
+        if hasattr(filename, "__await__"):
+            self.pending_prompts.append((filename, callback))
+            return None
+        return callback(self, filename)
+
+    async def awaitPrompts(self):
+        """
+        Await the app's answers to any file prompts, and call their callbacks
+        """
+        while self.pending_prompts:
+            prompt, callback = self.pending_prompts.pop(0)
+            callback(self, await prompt)
+
+    async def flushOutput(self):
+        """
+        Await the app's printing of every event printed since the last flush
+        """
+        while self.pending_output:
+            output = self.pending_output
+            self.pending_output = []
+            for printed in output:
+                await printed
+
+    def runDaemons(self):
+        """
+        Deliver the deferred events from the player's command, and run the daemons
+        Events published by the daemons are delivered before the turn ends
+        """
+        self.event_bus.flush()
+        self.daemons.runAll(self)
+        self.event_bus.flush()
 
     def addEvent(self, name, priority, text=None, style=None):
         """
@@ -222,6 +451,8 @@ class IFPGame:
         Raises KeyError if the specified event name is not defined for this
         turn
         """
+        if isinstance(text, StoryText):
+            text = str(text)
         text = self.parser.replace_string_vars(text)
         if not name in self.next_events:
             raise KeyError(
@@ -280,8 +511,7 @@ class IFPGame:
         self.me.setPlayer()
 
     def addVerb(self, verb):
-        for key in [verb.word, *verb.synonyms]:
-            if key in self.verbs:
-                self.verbs[key].append(verb)
-            else:
-                self.verbs[key] = [verb]
+        self.verbs.register(verb)
+
+    def removeVerb(self, verb):
+        self.verbs.unregister(verb)
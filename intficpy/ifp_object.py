@@ -1,11 +1,140 @@
-class IFPObject:
+from .exceptions import IFPError
+
+
+class IFPObjectMeta(type):
+    """
+    Accepts an optional `key` keyword argument when any IFPObject is created, so
+    every subclass supports explicit keys without passing them through __init__
+    """
+
+    def __call__(cls, *args, key=None, **kwargs):
+        if key is None:
+            return super().__call__(*args, **kwargs)
+        obj = cls.__new__(cls)
+        # read by registerNewIndex
+        obj._key = key
+        obj.__init__(*args, **kwargs)
+        return obj
+
+
+class IFPObject(metaclass=IFPObjectMeta):
+    """
+    Base class for every object whose state is saved with the game
+
+    Each IFPObject is registered in game.ifp_objects under its index (`ix`), which
+    is how save files refer to it. By default, the index is generated from the
+    number of objects created before it, so objects must be created in the same
+    order every time the game runs for saves to load.
+
+    Passing `key` when creating any IFPObject uses the key as its index instead, as
+    in `Thing(game, "lamp", key="lamp")`. Objects with a key do not affect the
+    indexes generated for other objects, so they can be created in any order,
+    including in functions, loops and conditionals, as long as they exist before a
+    saved game is loaded.
+    Keys must be unique strings, and cannot take the form of a generated index
+    ("Thing__12").
+
+    Every subclass is registered in IFPObject.registry under its type tag, which is
+    recorded in save files, so the loader can recreate objects that do not exist in
+    the game. The tag is the module and qualified name of the class, as in
+    "my_game.Lamp", or just the class name for the classes built into IntFicPy,
+    unless the class sets its own, as in `class Lamp(Thing, type_tag="Lamp")`.
+    Tags should not change once saves exist, so a class that is moved or renamed
+    should set its old tag. Defining a class with the same module and qualified
+    name as a registered class, as when a script is run again, replaces it. Setting
+    a tag that a different class already uses raises IFPError.
+    """
+
+    # type tag -> class, for IFPObject and every subclass
+    registry = {}
+    type_tag = "IFPObject"
+
+    def __init_subclass__(cls, type_tag=None, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.type_tag = type_tag or _defaultTypeTag(cls)
+        existing = IFPObject.registry.get(cls.type_tag)
+        if existing is not None and _qualifiedName(existing) != _qualifiedName(cls):
+            raise IFPError(
+                f"Type tag {cls.type_tag!r} of {_qualifiedName(cls)} is already used "
+                f"by {_qualifiedName(existing)}. Pass a unique type_tag when defining "
+                "the class."
+            )
+        IFPObject.registry[cls.type_tag] = cls
+
+    @classmethod
+    def reconstruct(cls, game, ix):
+        """
+        Create an object of this class for the loader, without calling __init__
+        The loader sets the rest of its attributes from the saved game.
+        """
+        obj = cls.__new__(cls)
+        obj.game = game
+        obj.ix = ix
+        obj.is_top_level_location = False
+        return obj
+
     def __init__(self, game):
         self.game = game
         self.registerNewIndex()
         self.is_top_level_location = False
 
     def registerNewIndex(self):
+        key = self.__dict__.pop("_key", None)
+        if key is not None:
+            self.registerKey(key)
+            return
         ix = f"{type(self).__name__}__{self.game.next_obj_ix}"
         self.ix = ix
         self.game.next_obj_ix += 1
         self.game.ifp_objects[ix] = self
+
+    def registerKey(self, key):
+        """
+        Register the object under an author defined key
+        Raises IFPError if the key is not a string, is already in use, or could be
+        mistaken for a generated index
+        """
+        if not isinstance(key, str) or not key:
+            raise IFPError(f"Object key must be a non-empty string, not {key!r}")
+        if isGeneratedIndex(key):
+            raise IFPError(
+                f"Object key {key!r} has the form of a generated index. Choose a key "
+                "without a double underscore followed by a number."
+            )
+        if key in self.game.ifp_objects:
+            raise IFPError(
+                f"Object key {key!r} is already used by "
+                f"{self.game.ifp_objects[key].__class__.__name__}"
+            )
+        self.ix = key
+        self.game.ifp_objects[key] = self
+
+
+IFPObject.registry[IFPObject.type_tag] = IFPObject
+
+
+def _qualifiedName(cls):
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _defaultTypeTag(cls):
+    if cls.__module__.split(".")[0] == "intficpy":
+        return cls.__name__
+    return _qualifiedName(cls)
+
+
+def isGeneratedIndex(ix):
+    """
+    Check whether an index could have been generated by registerNewIndex
+    """
+    name, sep, number = ix.rpartition("__")
+    return bool(sep and name and number.isdigit())
+
+
+def generatedIndexNumber(ix):
+    """
+    Get the number of a generated index, or None if the index is an author key
+    """
+    if not isGeneratedIndex(ix):
+        return None
+    return int(ix.rpartition("__")[2])
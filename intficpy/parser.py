@@ -1,9 +1,14 @@
-import importlib
-import string
-import re
-
-from .vocab import english
-from .grammar import Command, GrammarObject
+from collections import OrderedDict
+
+from .grammar import (
+    Command,
+    GrammarObject,
+    TokenRoles,
+    PREPOSITION,
+    KEYWORD,
+    NOUN,
+    DIRECTION,
+)
 from .verb import (
     ScoreVerb,
     FullScoreVerb,
@@ -17,7 +22,7 @@ from .thing_base import Thing
 from .things import Container, Surface, UnderSpace, Liquid
 from .room import Room
 from .travel import directionDict
-from .tokenizer import cleanInput, tokenize, removeArticles
+from .tokenizer import cleanInput, phraseMatches
 from .exceptions import (
     NoMatchingSuggestion,
     VerbDefinitionError,
@@ -35,6 +40,57 @@ from .exceptions import (
 ##############################################################
 
 
+class SyntaxCache:
+    """
+    A bounded, least recently used cache of the syntax analyses of player commands,
+    so commands the player repeats, such as "look" or "take coin", skip verb
+    matching
+
+    An analysis is a tuple of (verb, verb_form, dobj tokens, iobj tokens). Only the
+    syntax is cached. The objects the tokens refer to are still found every turn.
+    Each lookup is made with a stamp of the game's vocabulary. When the stamp
+    changes, the cache is cleared.
+
+    :param size: the maximum number of commands to remember
+    :type size: int
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.stamp = None
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, tokens, stamp):
+        """
+        Find the cached analysis of a command
+        Returns the analysis, or None if the command has not been analyzed with the
+        current vocabulary
+        """
+        if stamp != self.stamp:
+            self.clear()
+            self.stamp = stamp
+            return None
+        key = tuple(tokens)
+        analysis = self.entries.get(key)
+        if analysis is not None:
+            self.entries.move_to_end(key)
+        return analysis
+
+    def put(self, tokens, stamp, analysis):
+        if stamp != self.stamp:
+            self.clear()
+            self.stamp = stamp
+        self.entries[tuple(tokens)] = analysis
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
 class Parser:
     def __init__(self, game):
         self.game = game
@@ -43,6 +99,7 @@ class Parser:
         self.previous_command.dobj = GrammarObject()
         self.previous_command.iobj = GrammarObject()
         self.turns = 0
+        self.syntax_cache = SyntaxCache()
 
     def recordInput(self, input_string):
         self.game.turn_list.append(input_string)
@@ -69,6 +126,8 @@ class Parser:
         """
         if not ("<<" in text and ">>" in text):
             return text
+        import re
+
         tokens = re.split(r"(<<[a-zA-Z0-9\.\(\)_]+>>)", text)
         text = ""
         for tok in tokens:
@@ -90,6 +149,16 @@ class Parser:
 
         return text
 
+    def annotateCommand(self):
+        """
+        Find the roles each token of the command can play (preposition, keyword,
+        known noun, known adjective, direction, number) for the later stages of the
+        parser
+        """
+        self.command.roles = TokenRoles(
+            self.command.tokens, self.game.nouns, directionDict
+        )
+
     def getDirection(self):
         """
         Check for direction statement as in "west" or "ne"
@@ -103,6 +172,8 @@ class Parser:
                 for obj in self.previous_command.things:
                     if d in obj.adjectives:
                         return False
+            # a direction statement is a valid command, not a failed verb match
+            self.command.err = False
             directionDict[d]["func"](self.game)
 
             raise AbortTurn("Executed direction statement")
@@ -118,12 +189,29 @@ class Parser:
         """
         # look up first word in verb dictionary
         if self.command.primary_verb_token in self.game.verbs:
+            stamp = self.vocabularyStamp()
+            analysis = self.syntax_cache.get(self.command.tokens, stamp)
+            if analysis:
+                # the previous turn's suggestions take precedence, as in verbByObjects
+                self.checkForConvCommand()
+                self._useSyntaxAnalysis(analysis)
+                return
             self.command.verb_matches = list(
                 self.game.verbs[self.command.primary_verb_token]
             )
             self.matchPrepKeywords()
             self.verbByObjects()
             if self.command.verb:
+                self.syntax_cache.put(
+                    self.command.tokens,
+                    stamp,
+                    (
+                        self.command.verb,
+                        self.command.verb_form,
+                        _freeze(self.command.dobj.tokens),
+                        _freeze(self.command.iobj.tokens),
+                    ),
+                )
                 return
         self.checkForConvCommand()
 
@@ -146,6 +234,25 @@ class Parser:
             f"I don't understand the verb: {self.command.primary_verb_token}"
         )
 
+    def vocabularyStamp(self):
+        """
+        Identify the current state of the game's verbs, nouns and adjectives
+        Syntax analyses are reused only while the stamp is unchanged
+        """
+        return (
+            id(self.game.verbs),
+            self.game.verbs.generation,
+            self.game.lexicon_generation,
+        )
+
+    def _useSyntaxAnalysis(self, analysis):
+        verb, verb_form, dobj, iobj = analysis
+        self.command.verb_matches = [verb]
+        self.command.verb = verb
+        self.command.verb_form = verb_form
+        self.command.dobj = GrammarObject(_thaw(dobj))
+        self.command.iobj = GrammarObject(_thaw(iobj))
+
     def checkForConvCommand(self):
         self.sendTokensToCurrentSequence()
         if self.previous_command.specialTopics and self.getConvCommand():
@@ -165,7 +272,7 @@ class Parser:
                 i = len(verb_form)
                 for word in verb_form:
                     if word[0] != "<":
-                        if word not in self.command.tokens:
+                        if word not in self.command.roles.token_set:
                             break
                         else:
                             i = i - 1
@@ -239,9 +346,10 @@ class Parser:
 
         accounted = []
         extra = list(self.command.tokens)
+        roles = self.command.roles
 
         for word in extra:
-            if word in english.prepositions or word in english.keywords:
+            if roles.has(word, PREPOSITION) or roles.has(word, KEYWORD):
 
                 if word in verb_form:
                     accounted.append(word)
@@ -250,17 +358,13 @@ class Parser:
                 for obj in [dobj, iobj]:
                     if not obj:
                         break
-                    noun = obj[-1]
-                    if noun in self.game.nouns:
-                        for item in self.game.nouns[noun]:
-                            if word in item.adjectives:
-                                accounted.append(word)
-                                break
-                        if word in accounted:
-                            break
+                    if roles.describes(word, obj[-1]):
+                        accounted.append(word)
+                        break
 
                 if (
-                    word in ("up", "down", "in", "out")
+                    roles.has(word, DIRECTION)
+                    and word in ("up", "down", "in", "out")
                     and verb.iscope == "direction"
                     and (
                         (iobj and len(iobj) == 1 and word in iobj)
@@ -285,56 +389,45 @@ class Parser:
 
     def matchPrepKeywords(self):
         """
-        Check for prepositions in the self.tokenized player command, and remove any candidate
-        verbs whose preposition does not match
-        Returns a list of Verb objects or an empty list
-        """
-        remove_verb = []
-        for p in english.prepositions:
-            if p in self.command.tokens and len(self.command.tokens) > 1:
-                exempt = False
-                for verb in self.command.verb_matches:
-                    ix = self.command.tokens.index(p) + 1
-                    if ix < len(self.command.tokens):
-                        noun = self.command.tokens[ix]
-                        while not noun in self.game.nouns:
-                            ix = ix + 1
-                            if ix >= len(self.command.tokens):
-                                break
-                            noun = self.command.tokens[ix]
-                        if noun in self.game.nouns:
-                            for item in self.game.nouns[noun]:
-                                if p in item.adjectives:
-                                    exempt = True
-                    if p in ["up", "down", "in", "out"]:
-                        if verb.iscope == "direction" or verb.dscope == "direction":
-                            exempt = True
-                    if (
-                        not (verb.preposition or not p in verb.preposition)
-                        and not exempt
-                    ):
-                        remove_verb.append(verb)
-        for p in english.keywords:
-            if p in self.command.tokens and len(self.command.tokens) > 1:
-                exempt = False
-                for verb in self.command.verb_matches:
-                    ix = self.command.tokens.index(p) + 1
-                    if ix < len(self.command.tokens):
-                        noun = self.command.tokens[ix]
-                        while not noun in self.game.nouns:
-                            ix = ix + 1
-                            if ix >= len(self.command.tokens):
-                                break
-                            noun = self.command.tokens[ix]
-                        if noun in self.game.nouns:
-                            for item in self.game.nouns[noun]:
-                                if p in item.adjectives:
-                                    exempt = True
-                    if not (verb.keywords or not p in verb.keywords) and not exempt:
-                        remove_verb.append(verb)
-        for verb in remove_verb:
-            if verb in self.command.verb_matches:
-                self.command.verb_matches.remove(verb)
+        Check for prepositions and keywords in the tokenized player command, and
+        remove any candidate verbs that cannot account for them
+
+        Verbs with no grammatical objects can only account for a preposition or
+        keyword by declaring it. Verbs that take objects may find the word among
+        their objects' adjectives, so they are left for verbByObjects to check.
+        """
+        if len(self.command.tokens) < 2:
+            return
+        roles = self.command.roles
+        prepositions = roles.tokens(PREPOSITION)
+        keywords = roles.tokens(KEYWORD)
+        words = [
+            word
+            for word in prepositions + keywords
+            if word != self.command.primary_verb_token
+        ]
+        if not words:
+            return
+
+        verbs = self.game.verbs
+        keep = (
+            verbs.with_arity(True, False)
+            | verbs.with_arity(False, True)
+            | verbs.with_arity(True, True)
+        )
+        accounting = None
+        for word in words:
+            declaring = set()
+            if word in prepositions:
+                declaring |= verbs.with_preposition(word)
+            if word in keywords:
+                declaring |= verbs.with_keyword(word)
+            accounting = declaring if accounting is None else accounting & declaring
+        keep |= accounting
+
+        self.command.verb_matches = [
+            verb for verb in self.command.verb_matches if verb in keep
+        ]
 
     def getGrammarObj(self):
         """
@@ -388,12 +481,12 @@ class Parser:
         else:
             before = verb_form[dobj_ix - 1]
             after = verb_form[iobj_ix + 1]
-        b_ix = self.command.tokens.index(before) + 1
+        b_ix = self.command.roles.index(before) + 1
         if not after:
             a_ix = None
             objs = self.command.tokens[b_ix:]
         else:
-            a_ix = self.command.tokens.index(after)
+            a_ix = self.command.roles.index(after)
             objs = self.command.tokens[b_ix:a_ix]
 
         thing_follows_string = True
@@ -403,7 +496,7 @@ class Parser:
             thing_follows_string = False
 
         if thing_follows_string:
-            if not objs[-1] in self.game.nouns or len(objs) < 2:
+            if not self.command.roles.has(objs[-1], NOUN) or len(objs) < 2:
                 return None
             things = self.game.nouns[objs[-1]]
             end_str = len(objs) - 1
@@ -424,7 +517,7 @@ class Parser:
         else:  # string follows thing
             noun = None
             for word in objs:
-                if word in self.game.nouns:
+                if self.command.roles.has(word, NOUN):
                     noun = word
                     break
             if not noun:
@@ -504,24 +597,7 @@ class Parser:
         Returns an array of strings or None
         """
         if before[0] == "<":
-            # find the index of the first noun in the noun dict.
-            # if there is more than one, reject any that double as adjectives
-            nounlist = []
-            for word in self.command.tokens:
-                if word in self.game.nouns:
-                    nounlist.append(word)
-            if len(nounlist) > 2:
-                i = 0
-                delnoun = []
-                while i < (len(nounlist) - 1):
-                    for item in self.game.nouns[nounlist[i]]:
-                        if (
-                            nounlist[i] in item.adjectives
-                            and not nounlist[i] in delnoun
-                        ):
-                            delnoun.append(nounlist[i])
-                for noun in delnoun:
-                    nounlist.remove(delnoun)
+            nounlist = self._objectNouns()
             if len(nounlist) < 2:
                 # we have eliminated all adjectives
                 # if there are at least 2 words, we can assume that the first
@@ -531,35 +607,18 @@ class Parser:
             before = nounlist[0]
         if after:
             if after[0] == "<":
-                # find the index of the first noun in the noun dict.
-                # if there is more than one, reject any that double as adjectives
-                nounlist = []
-                for word in self.command.tokens:
-                    if word in self.game.nouns:
-                        nounlist.append(word)
-                if len(nounlist) > 2:
-                    i = 0
-                    delnoun = []
-                    while i < (len(nounlist) - 1):
-                        for item in self.game.nouns[nounlist[i]]:
-                            if (
-                                nounlist[i] in item.adjectives
-                                and not nounlist[i] in delnoun
-                            ):
-                                delnoun.append(nounlist[i])
-                    for noun in delnoun:
-                        nounlist.remove(delnoun)
+                nounlist = self._objectNouns()
                 if len(nounlist) < 2:
                     return None
                 # set after to directly after the first noun
-                after_index = self.command.tokens.index(nounlist[0]) + 1
+                after_index = self.command.roles.index(nounlist[0]) + 1
                 after = self.command.tokens[after_index]
 
-        low_bound = self.command.tokens.index(before)
+        low_bound = self.command.roles.index(before)
         # add 1 for non-inclusive indexing
         low_bound = low_bound + 1
         if after:
-            high_bound = self.command.tokens.index(after)
+            high_bound = self.command.roles.index(after)
             obj_words = self.command.tokens[low_bound:high_bound]
         else:
             obj_words = self.command.tokens[low_bound:]
@@ -567,6 +626,23 @@ class Parser:
             return None
         return obj_words
 
+    def _objectNouns(self):
+        """
+        Find the nouns in the command, for adjacent grammatical objects
+        If there are more than two, reject any but the last that double as
+        adjectives
+        Returns a list of strings
+        """
+        nounlist = list(self.command.roles.tokens(NOUN))
+        if len(nounlist) > 2:
+            delnoun = []
+            for noun in nounlist[:-1]:
+                if self.command.roles.describes(noun, noun) and noun not in delnoun:
+                    delnoun.append(noun)
+            for noun in delnoun:
+                nounlist.remove(noun)
+        return nounlist
+
     def wearRangeCheck(self, thing):
         """
         Check if the Thing is being worn
@@ -1382,39 +1458,37 @@ class Parser:
         out_loc.describe(self.game)
 
     def getConvCommand(self):
-        possible_topics = list(self.previous_command.specialTopics.keys())
-        for key in self.previous_command.specialTopics:
-            tokens = cleanInput(key, False)
-            tokens = tokenize(tokens)
-            tokens = removeArticles(tokens)
-            for tok in self.command.tokens:
-                if tok not in tokens and tok == "i" and "you" in tokens:
-                    pass
-                elif tok not in tokens and tok == "you" and "i" in tokens:
-                    pass
-                elif tok not in tokens:
-                    possible_topics.remove(key)
-                    break
-        revised_possible_topics = list(possible_topics)
-        if len(possible_topics) > 1:
-            for topicA in possible_topics:
-                for topicB in possible_topics:
-                    if (
-                        topicA != topicB
-                        and topicB in revised_possible_topics
-                        and topicA in revised_possible_topics
-                    ):
-                        if (
-                            self.previous_command.specialTopics[topicA]
-                            == self.previous_command.specialTopics[topicB]
-                        ):
-                            revised_possible_topics.remove(topicB)
-        if len(revised_possible_topics) != 1:
+        """
+        Try to match the player's input to one of the SpecialTopics suggested on the
+        previous turn, and run it if exactly one matches
+        Returns True if a SpecialTopic was run, False otherwise
+        """
+        special_topics = self.previous_command.specialTopics
+        indexes = {}
+        for topic in special_topics.values():
+            if topic.owner and not id(topic.owner) in indexes:
+                indexes[id(topic.owner)] = topic.owner.special_topic_index
+        indexes = list(indexes.values())
+
+        matches = set()
+        for index in indexes:
+            matches.update(
+                key for key in index.match(self.command.tokens) if key in special_topics
+            )
+        for key in special_topics:
+            # suggestions not added through Actor.addSpecialTopic
+            if not any(key in index for index in indexes) and phraseMatches(
+                key, self.command.tokens
+            ):
+                matches.add(key)
+
+        # different phrasings of the same topic are not ambiguous
+        topics = {id(special_topics[key]): special_topics[key] for key in matches}
+        if len(topics) != 1:
             return False
-        else:
-            x = revised_possible_topics[0]
-            self.previous_command.specialTopics[x].func(self.game)
-            return True
+        (topic,) = topics.values()
+        topic.func(self.game)
+        return True
 
     def sendTokensToCurrentSequence(self):
         """
@@ -1475,6 +1549,7 @@ class Parser:
         self.recordInput(input_string)
 
         self.command = Command(input_string)
+        self.annotateCommand()
         if self.previous_command.has_sticky_sequence:
             self.command.sequence = self.previous_command.sequence
 
@@ -1482,6 +1557,7 @@ class Parser:
             try:
                 self.runTurnCommand()
             except ParserError as e:
+                self.command.err = True
                 self.game.addTextToEvent(
                     "turn", e.__str__(),
                 )
@@ -1503,3 +1579,16 @@ class Parser:
             self.game.addTextToEvent(
                 "turn", "The game has ended. Commands are SCORE, FULLSCORE, and ABOUT.",
             )
+
+
+def _freeze(tokens):
+    # cached token lists must not be shared with the commands that use them
+    if isinstance(tokens, list):
+        return tuple(tokens)
+    return tokens
+
+
+def _thaw(tokens):
+    if isinstance(tokens, tuple):
+        return list(tokens)
+    return tokens
@@ -11,6 +11,14 @@ class PhysicalEntity(IFPObject):
         self.contains = {}
         self.revealed = True
 
+    @classmethod
+    def reconstruct(cls, game, ix):
+        obj = super().reconstruct(game, ix)
+        # contents are not saved with the object, but placed by the loader
+        obj.location = None
+        obj.contains = {}
+        return obj
+
     def containsItem(self, item):
         """Returns True if item is in the contains or sub_contains dictionary """
         return self.topLevelContainsItem(item) or self.subLevelContainsItem(item)
@@ -46,6 +54,7 @@ class PhysicalEntity(IFPObject):
         else:
             self.contains[item.ix] = [item]
         item.location = self
+        self.game.event_bus.publish("contains_added", container=self, item=item)
 
     def removeThing(self, item):
         if not self.containsItem(item):
@@ -73,6 +82,7 @@ class PhysicalEntity(IFPObject):
             if not self.contains[item.ix]:
                 del self.contains[item.ix]
             item.location = None
+            self.game.event_bus.publish("contains_removed", container=self, item=item)
             return True
 
         if self.subLevelContainsItem(item):
@@ -349,6 +349,7 @@ class Room(PhysicalEntity):
         if not self.discovered:
             self.onDiscover(game)
             self.discovered = True
+            game.event_bus.publish("discovered", room=self)
 
     def onDiscover(self, game):
         """Override this to trigger custom behaviour when the player "discovers" this
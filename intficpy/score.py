@@ -28,6 +28,8 @@ class Achievement(IFPObject):
             )
             self.game.score.achievements.append(self)
             self.game.score.total += self.points
+            game.event_bus.publish("achievement", achievement=self)
+            game.hints.onPrerequisite(game, self)
 
 
 class AbstractScore(IFPObject):
@@ -81,29 +83,53 @@ class HintSystem(IFPObject):
         self.cur_node = None
         self.stack = []
         self.pending = []
+        # ix of an unmet prerequisite (HintNode or Achievement) -> pending nodes to
+        # check when it is met
+        self.waiting_on = {}
+        # pending nodes are checked when their prerequisites are met, rather than
+        # by a daemon. the daemon is still created, so that the indeces of the
+        # game's objects, and therefore save files, are unchanged
         self.has_pending_daemon = False
         self.pending_daemon = Daemon(self.game, self.checkPending)
 
     def addPending(self, game, node):
         if node not in self.pending:
             self.pending.append(node)
-        if self.pending and not self.has_pending_daemon:
+        self._waitForPrerequisites(node)
 
-            self.has_pending_daemon = True
-            if not self.pending_daemon in game.daemons.active:
-                game.daemons.add(self.pending_daemon)
+    def _waitForPrerequisites(self, node):
+        for prerequisite in node.unmetPrerequisites() + list(
+            node.open_require_nodes_incomplete
+        ):
+            if prerequisite.ix in self.waiting_on:
+                if node not in self.waiting_on[prerequisite.ix]:
+                    self.waiting_on[prerequisite.ix].append(node)
+            else:
+                self.waiting_on[prerequisite.ix] = [node]
+
+    def onPrerequisite(self, game, prerequisite):
+        """
+        Called when a HintNode is completed, or an Achievement is awarded
+        Checks the pending nodes that were waiting on it
+        """
+        for node in self.waiting_on.pop(prerequisite.ix, []):
+            if node in self.pending:
+                self._checkPendingNode(game, node)
 
     def checkPending(self, game):
-        if self.pending:
-            remove_nodes = []
-            for node in self.pending:
-                if not node.checkRequiredIncomplete():
-                    remove_nodes.append(node)
-                    node.complete = True  # not sure about this
-                elif self.setNode(node):
-                    remove_nodes.append(node)
-            for node in remove_nodes:
-                self.pending.remove(node)
+        for node in list(self.pending):
+            if node in self.pending:
+                self._checkPendingNode(game, node)
+
+    def _checkPendingNode(self, game, node):
+        if not node.checkRequiredIncomplete():
+            self.pending.remove(node)
+            node.complete = True  # not sure about this
+        elif node.checkRequiredComplete():
+            self.pending.remove(node)
+            self.setNode(game, node)
+        else:
+            self._waitForPrerequisites(node)
 
     def setNextNodeFrom(self, game, node):
         x = node
@@ -177,7 +203,7 @@ class HintNode(IFPObject):
         self.cur_hint = 0
         self.hints = []
         self.next_node = None
-        self.complete = False
+        self._complete = False
         for x in hints:
             if not isinstance(x, Hint):
                 raise ValueError(f"{x} is not a HintNode - cannot add to HintNode")
@@ -185,19 +211,40 @@ class HintNode(IFPObject):
         # nodes that must be complete/incomplete in order to open node
         self.open_require_nodes_complete = []
         self.open_require_nodes_incomplete = []
+        # achievements that must be awarded in order to open node
+        self.open_require_achievements = []
+
+    @property
+    def complete(self):
+        return self._complete
+
+    @complete.setter
+    def complete(self, value):
+        was_complete = self.__dict__.get("_complete")
+        self._complete = value
+        if value and not was_complete:
+            self.game.hints.onPrerequisite(self.game, self)
+
+    def unmetPrerequisites(self):
+        """
+        Get the nodes that must be completed, and the achievements that must be
+        awarded, before this node can open
+        """
+        return [
+            item for item in self.open_require_nodes_complete if not item.complete
+        ] + [
+            achievement
+            for achievement in self.open_require_achievements
+            if achievement not in self.game.score.achievements
+        ]
 
     def checkRequiredComplete(self):
-        if self.open_require_nodes_complete:
-            nodes_complete = [
-                item.complete for item in self.open_require_nodes_complete
-            ]
-            return all(nodes_complete)
-        return True
+        return not self.unmetPrerequisites()
 
     def checkRequiredIncomplete(self):
         if self.open_require_nodes_incomplete:
             nodes_incomplete = [
-                (not item.complete) for item in self.open_require_nodes_complete
+                (not item.complete) for item in self.open_require_nodes_incomplete
             ]
             return all(nodes_incomplete)
         return True
@@ -23,10 +23,12 @@ TODO:
 
 """
 from inspect import signature
+from weakref import WeakKeyDictionary, WeakValueDictionary
 
 from .exceptions import IFPError, NoMatchingSuggestion
 from .ifp_object import IFPObject
-from .tokenizer import cleanInput, tokenize
+from .text_store import StoryText
+from .tokenizer import PhraseIndex
 from .vocab import english
 
 
@@ -129,14 +131,60 @@ class Sequence(IFPObject):
         def read(self, game, event):
             self.sequence.jump_to(self.nav_func(self.sequence))
 
+    class _Program:
+        """
+        A Sequence template, compiled to flat instruction arrays
+        Each instruction (pc) is one item in the template. Instructions store the
+        node (list) containing the item and the item's index, rather than the item
+        itself, so that items replaced in place are still read.
+        """
+
+        END = -1
+
+        def __init__(self, template):
+            self.template = template
+            self.locations = []
+            self.nodes = []
+            self.indexes = []
+            self.next_pc = []
+            # pc of an option menu (dict) item -> {option name: pc of first item}
+            self.branches = {}
+            # pc of an option menu (dict) item -> PhraseIndex of the option names
+            self.option_indexes = {}
+            self.by_location = {}
+            self.labels = {}
+
+        def add(self, node, i, location):
+            pc = len(self.locations)
+            self.locations.append(location)
+            self.nodes.append(node)
+            self.indexes.append(i)
+            self.next_pc.append(self.END)
+            self.by_location[location] = pc
+            return pc
+
+    # compiled programs, by the id of their template, shared by every Sequence with
+    # the same template
+    # Each program keeps its template, so the id cannot be reused while the program
+    # exists, and programs are dropped once no Sequence uses them
+    _programs = WeakValueDictionary()
+    # the program each Sequence is reading
+    # Programs are kept outside of the Sequence, so they are never saved
+    _sequence_programs = WeakKeyDictionary()
+
+    # when the player's input does not exactly match a menu option, accept an
+    # option that the input matches with incomplete words, or with up to
+    # max_typos typos per word
+    match_prefixes = False
+    max_typos = 0
+
     def __init__(self, game, template, data=None, sticky=False):
         super().__init__(game)
-        self.labels = {}
-        self._parse_template_node(template)
         self.template = template
+        self.labels = dict(self._program.labels)
         self.sticky = sticky
 
-        self.position = [0]
+        self.pc = 0
         self.options = []
         self.data = data or {}
         self.data["game"] = game
@@ -144,19 +192,63 @@ class Sequence(IFPObject):
 
         self.next_sequence = None
 
+    @property
+    def _program(self):
+        current = self._sequence_programs.get(self)
+        program = self._programs.get(id(self.template))
+        if program is None or program.template is not self.template:
+            program = self._compile(self.template)
+            self._programs[id(self.template)] = program
+        if program is not current:
+            self._sequence_programs[self] = program
+            if current is not None and current.template is program.template:
+                # the template was recompiled, so keep the current position
+                self.labels.update(program.labels)
+                if self.pc != self._Program.END:
+                    location = current.locations[self.pc]
+                    self.pc = program.by_location.get(location, self._Program.END)
+        return program
+
+    def recompile(self):
+        """
+        Compile the template again, after items or options have been added to it
+        or removed from it in place
+        Every Sequence with the same template reads from the new template, keeping
+        its current position.
+        """
+        self._programs[id(self.template)] = self._compile(self.template)
+
+    @property
+    def position(self):
+        """
+        The location of the current item in the template, as a list of indeces
+        and option names
+        """
+        if self.pc == self._Program.END:
+            return []
+        return list(self._program.locations[self.pc])
+
+    @position.setter
+    def position(self, value):
+        try:
+            self.pc = self._program.by_location[tuple(value)]
+        except KeyError as e:
+            raise IFPError(
+                f"{value} is not a valid location in Sequence {self}."
+            ) from e
+
     @property
     def current_item(self):
-        return self._get_section_by_location(self.position)
+        program = self._program
+        return program.nodes[self.pc][program.indexes[self.pc]]
 
     @property
     def current_node(self):
-        if len(self.position) < 2:
-            return self.template
-        return self._get_section_by_location(self.position[:-1])
+        return self._program.nodes[self.pc]
 
     def start(self):
         self.active = True
-        self.position = [0]
+        self.pc = 0 if self._program.locations else self._Program.END
         self.play()
 
     def next(self, event):
@@ -168,17 +260,15 @@ class Sequence(IFPObject):
     def play(self, event="turn"):
         self.game.parser.command.sequence = self
         while True:
+            if self.pc == self._Program.END:
+                self.on_complete()
+                return
             ret = self.next(event)
             if isinstance(ret, self._PauseEvent):
                 return
-            while isinstance(ret, self._NodeComplete):
-                if len(self.position) == 1:
-                    self.on_complete()
-                    return
-                self.position = self.position[
-                    :-2
-                ]  # pop out of the list and its parent dict
-                ret = self._iterate()
+            if isinstance(ret, self._NodeComplete):
+                self.on_complete()
+                return
 
     def jump_to(self, value):
         """
@@ -215,37 +305,38 @@ class Sequence(IFPObject):
             except ValueError:
                 pass
         if ix is not None and ix < len(self.options):
-            self.position += [self.options[ix], 0]
+            answer = self.options[ix]
         else:
             answer = self._match_text_to_suggestion(tokens)
-            self.position += [answer, 0]
+        self.pc = self._program.branches[self.pc][answer]
         self.play()
 
     def _match_text_to_suggestion(self, query_tokens):
         """
         Try to match tokens to a single suggestion from the current options
+        If no option contains all of the tokens, and match_prefixes or max_typos
+        is set, accept the single best inexact match
         Raises NoMatchingSuggestion on failure
         """
-        tokenized_options = [tokenize(cleanInput(option)) for option in self.options]
-        match_indeces = []
-
-        for i in range(len(self.options)):
-            option = tokenized_options[i]
-            if not [word for word in query_tokens if not word in option]:
-                match_indeces.append(i)
-
-        if len(match_indeces) != 1:
-            raise NoMatchingSuggestion(
-                query_tokens, self.options, [self.options[ix] for ix in match_indeces]
+        index = self._program.option_indexes.get(self.pc)
+        if index is None:
+            raise NoMatchingSuggestion(query_tokens, self.options, [])
+
+        matches = index.match(query_tokens)
+        if len(matches) == 1:
+            return matches.pop()
+        matches = [option for option in self.options if option in matches]
+
+        if not matches and (self.match_prefixes or self.max_typos):
+            ranked = index.rank(
+                query_tokens, prefixes=self.match_prefixes, max_typos=self.max_typos
             )
+            best = [option for option, cost in ranked if cost == ranked[0][1]]
+            if len(best) == 1:
+                return best[0]
+            matches = [option for option, cost in ranked]
 
-        return self.options[match_indeces[0]]
-
-    def _get_section_by_location(self, location):
-        section = self.template
-        for ix in location:
-            section = section[ix]
-        return section
+        raise NoMatchingSuggestion(query_tokens, self.options, matches)
 
     def _normalize_location(self, value):
         if type(value) is str:
@@ -262,7 +353,7 @@ class Sequence(IFPObject):
 
     def _read_item(self, item, event):
         self.options = []
-        if type(item) is str:
+        if type(item) is str or isinstance(item, StoryText):
             self.game.addTextToEvent(event, item.format(**self.data))
 
         elif callable(item):
@@ -283,36 +374,76 @@ class Sequence(IFPObject):
             return self._PauseEvent()
 
     def _iterate(self):
-        if self.position[-1] >= len(self.current_node) - 1:
+        """
+        Move to the next item, stepping out of any option branches that are complete
+        Returns _NodeComplete when the whole template has been read
+        """
+        next_pc = self._program.next_pc[self.pc]
+        if next_pc == self._Program.END:
             return self._NodeComplete()
-        self.position[-1] += 1
+        self.pc = next_pc
 
-    def _parse_template_node(self, node, stack=None):
+    @classmethod
+    def _compile(cls, template):
+        """
+        Validate the template, and compile it to a _Program
+        """
+        program = cls._Program(template)
+        # for each instruction, the next item in the same node, and the option menu
+        # item that contains the node
+        siblings = {}
+        parents = {}
+        cls._parse_template_node(program, template, [], None, siblings, parents)
+
+        # instructions are added depth first, so an option menu is always resolved
+        # before the items in its branches
+        for pc in range(len(program.locations)):
+            if pc in siblings:
+                program.next_pc[pc] = siblings[pc]
+            elif parents[pc] is not None:
+                program.next_pc[pc] = program.next_pc[parents[pc]]
+        for pc, branches in program.branches.items():
+            for key, start in branches.items():
+                if start is None:  # empty branch
+                    branches[key] = program.next_pc[pc]
+        return program
+
+    @classmethod
+    def _parse_template_node(cls, program, node, stack, parent, siblings, parents):
         """
         Parse, validate, and prepare the template for reading
+        Adds the items of the node to the program, and returns the pc of the first
+        item, or None if the node is empty
         """
-        stack = stack or []
-
         if not type(node) is list:
             raise IFPError(
                 "Expected Sequence node (list); found {node}" f"\nLocation: {stack}"
             )
+        previous = None
+        first = None
         for i in range(0, len(node)):
             stack.append(i)
             item = node[i]
+            pc = program.add(node, i, tuple(stack))
+            parents[pc] = parent
+            if previous is None:
+                first = pc
+            else:
+                siblings[previous] = pc
+            previous = pc
 
-            if isinstance(item, self.Label):
-                if item.name in self.labels:
+            if isinstance(item, cls.Label):
+                if item.name in program.labels:
                     raise IFPError(
                         "Sequence Labels must be uniquely named within the Sequence. "
                         f'Label "{item.name}" at location {stack} was previously defined '
                         "for this Sequence."
                     )
-                self.labels[item.name] = list(stack)
+                program.labels[item.name] = list(stack)
                 stack.pop()
                 continue
 
-            if type(item) is str or isinstance(item, self.ControlItem):
+            if type(item) is str or isinstance(item, (StoryText, cls.ControlItem)):
                 stack.pop()
                 continue
 
@@ -328,14 +459,21 @@ class Sequence(IFPObject):
                 stack.pop()
                 continue
             try:
+                program.branches[pc] = {}
+                program.option_indexes[pc] = PhraseIndex(
+                    remove_articles=False, interchangeable={}
+                )
                 for key, sub_node in item.items():
                     if type(key) is not str:
                         raise IFPError(
                             "Only strings can be used as option names (dict keys) in Sequences. "
                             f"Found {key} ({type(key)})\nLocation: {stack}"
                         )
+                    program.option_indexes[pc].add(key)
                     stack.append(key)
-                    self._parse_template_node(sub_node, stack=stack)
+                    program.branches[pc][key] = cls._parse_template_node(
+                        program, sub_node, stack, pc, siblings, parents
+                    )
                     stack.pop()
             except AttributeError:
                 raise IFPError(
@@ -344,3 +482,4 @@ class Sequence(IFPObject):
                     f"\nLocation: {stack}"
                 )
             stack.pop()
+        return first
@@ -1,46 +1,605 @@
+import io
+import json
 import os
 import pickle
+import struct
+import threading
 import types
+import zlib
 
-from .ifp_object import IFPObject
-from .exceptions import DeserializationError, Unserializable
+from .ifp_object import IFPObject, generatedIndexNumber
+from .text_store import StoryText
+from .exceptions import DeserializationError, IFPError, Unserializable
 
 ##############################################################
 # SERIALIZER.PY - the save/load system for IntFicPy
 # Defines the SaveState class, with methods for saving and loading games
 ##############################################################
-# TODO: do not load bad save files. create a back up of game state before attempting to load, and restore in the event of an error AT ANY POINT during loading
+
+# save files can be written as a single pickle, or as a stream of records, one per
+# object and location, in JSON Lines or MessagePack
+SAVE_FORMAT = "ifp-save"
+SAVE_VERSION = 1
+
+
+def save_records(data):
+    """
+    Split saved data into records, for formats that write one record at a time
+    The first record is a header, followed by one record for each object, and one
+    for each top level location. Objects refer to each other by "<IFP>ix", as in
+    the saved data.
+    Yields dictionaries
+    """
+    yield {
+        "record": "header",
+        "format": SAVE_FORMAT,
+        "version": SAVE_VERSION,
+        "active_sequence": data.get("active_sequence"),
+        "omitted_text": data.get("omitted_text", []),
+    }
+    types = data.get("types", {})
+    for ix, attrs in data.get("ifp_objects", {}).items():
+        yield {"record": "object", "ix": ix, "type": types.get(ix), "attrs": attrs}
+    for ix, location in data.get("locations", {}).items():
+        yield {"record": "location", "ix": ix, "contains": location["contains"]}
+
+
+def data_from_records(records):
+    """
+    Rebuild saved data from the records written by save_records
+    Raises DeserializationError if the records are not a saved game
+    """
+    data = {"ifp_objects": {}, "types": {}, "locations": {}}
+    records = iter(records)
+    header = next(records, None)
+    if (
+        not isinstance(header, dict)
+        or header.get("record") != "header"
+        or header.get("format") != SAVE_FORMAT
+    ):
+        raise DeserializationError("Not an IntFicPy save file")
+    if header.get("version") != SAVE_VERSION:
+        raise DeserializationError(
+            f"Unsupported save file version {header.get('version')}"
+        )
+    data["active_sequence"] = header.get("active_sequence")
+    data["omitted_text"] = header.get("omitted_text", [])
+    for record in records:
+        kind = record.get("record")
+        if kind == "object":
+            data["ifp_objects"][record["ix"]] = record["attrs"]
+            if record.get("type") is not None:
+                data["types"][record["ix"]] = record["type"]
+        elif kind == "location":
+            data["locations"][record["ix"]] = {
+                "ix": record["ix"],
+                "contains": record["contains"],
+            }
+        else:
+            raise DeserializationError(f"Unknown save record {kind!r}")
+    return data
+
+
+class PickleEncoder:
+    """
+    Writes the saved data as a single pickle
+    """
+
+    def dump(self, data, file):
+        pickle.dump(data, file, 0)
+
+    def records(self, file):
+        return save_records(self.load(file))
+
+    def load(self, file):
+        return pickle.load(file)
+
+
+class RecordEncoder:
+    """
+    Base class for the formats that write the saved data one record at a time
+    These formats cannot represent every value exactly, so saving raises
+    Unserializable for values they would restore as something else, such as
+    tuples, which are restored as lists.
+    """
+
+    # the name of the format, for error messages
+    format_name = None
+    # the types allowed as dictionary keys
+    key_types = (str,)
+    # the types allowed as values, other than dictionaries, lists and None
+    value_types = (str, int, float, bool)
+
+    def check(self, value, where):
+        """
+        Check that a value is restored exactly from the format
+        Raises Unserializable if it is not
+        """
+        if type(value) is dict:
+            for key, item in value.items():
+                if type(key) not in self.key_types:
+                    raise Unserializable(
+                        f"{self.format_name} saves cannot use {key!r} "
+                        f"({type(key).__name__}) as a dictionary key in {where}."
+                    )
+                self.check(item, where)
+        elif type(value) is list:
+            for item in value:
+                self.check(item, where)
+        elif value is not None and type(value) not in self.value_types:
+            raise Unserializable(
+                f"{self.format_name} saves cannot store {value!r} "
+                f"({type(value).__name__}) in {where}."
+            )
+
+
+class JSONLinesEncoder(RecordEncoder):
+    """
+    Writes the saved data as JSON Lines: one JSON record per line, so the file can
+    be read one record at a time by other tools
+    Saving raises Unserializable for dictionaries with keys other than strings,
+    tuples, and values other than strings, numbers, booleans and None.
+    """
+
+    format_name = "JSON Lines"
+
+    def dump(self, data, file):
+        for record in save_records(data):
+            self.check(record, record.get("ix", record["record"]))
+            file.write(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+            file.write(b"\n")
+
+    def records(self, file):
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+    def load(self, file):
+        return data_from_records(self.records(file))
+
+
+class MessagePackEncoder(RecordEncoder):
+    """
+    Writes the saved data as a stream of MessagePack records
+    Needs the msgpack package, which is not installed with IntFicPy.
+    Saving raises Unserializable for dictionaries with keys other than strings and
+    numbers, tuples, and values other than strings, numbers, booleans, bytes and
+    None.
+    """
+
+    format_name = "MessagePack"
+    key_types = (str, int, float, bool)
+    value_types = (str, int, float, bool, bytes)
+
+    def _msgpack(self):
+        try:
+            import msgpack
+        except ImportError:
+            raise IFPError(
+                "Saving and loading MessagePack files needs the msgpack package"
+            )
+        return msgpack
+
+    def dump(self, data, file):
+        packer = self._msgpack().Packer()
+        for record in save_records(data):
+            self.check(record, record.get("ix", record["record"]))
+            file.write(packer.pack(record))
+
+    def records(self, file):
+        return self._msgpack().Unpacker(file, raw=False, strict_map_key=False)
+
+    def load(self, file):
+        return data_from_records(self.records(file))
+
+
+# save format name -> encoder
+SAVE_ENCODERS = {
+    "pickle": PickleEncoder(),
+    "jsonl": JSONLinesEncoder(),
+    "msgpack": MessagePackEncoder(),
+}
+
+
+def get_encoder(save_format):
+    try:
+        return SAVE_ENCODERS[save_format]
+    except KeyError:
+        raise IFPError(
+            f"Unknown save format {save_format!r}. Choose from "
+            f"{', '.join(SAVE_ENCODERS)}."
+        )
+
+
+def detect_save_format(file):
+    """
+    Guess the format of an open save file from its first byte, without moving
+    through the file
+    """
+    first = file.peek(1)[:1] if hasattr(file, "peek") else b""
+    if first == b"{":
+        return "jsonl"
+    if first and (0x80 <= first[0] <= 0x8F or first[0] in (0xDE, 0xDF)):
+        # a MessagePack map
+        return "msgpack"
+    return "pickle"
+
+
+# compressed saves start with the magic bytes, followed by the Adler-32 checksum of
+# the preset dictionary, and a zlib stream compressed with the dictionary
+COMPRESSED_MAGIC = b"IFPZ"
+DICTIONARY_ID = struct.Struct(">I")
+# zlib only uses the last 32KB of a preset dictionary
+MAX_DICTIONARY_SIZE = 32 * 1024
+# changing how the dictionary is built must change this, so saves compressed with an
+# older dictionary are recognized
+SAVE_DICTIONARY_VERSION = 1
+# words written by the save system itself
+SAVE_DICTIONARY_WORDS = [
+    SAVE_FORMAT,
+    "record",
+    "header",
+    "format",
+    "version",
+    "object",
+    "location",
+    "attrs",
+    "type",
+    "contains",
+    "ix",
+    "ifp_objects",
+    "types",
+    "locations",
+    "active_sequence",
+    "omitted_text",
+    "<TXT>",
+    "<IFP>",
+]
+
+
+def build_save_dictionary():
+    """
+    Build the preset dictionary for compressing save files
+    The dictionary is built only from the code of the game, and never from its
+    state: the type tags of every IFPObject class, and the names of the attributes
+    the classes define. Any game with the same classes builds the same dictionary,
+    so it can load saves compressed by any other run of the game.
+    Returns bytes
+    """
+    words = [f"v{SAVE_DICTIONARY_VERSION}"] + SAVE_DICTIONARY_WORDS
+    tags = sorted(IFPObject.registry)
+    attrs = set()
+    for tag in tags:
+        for attr, value in vars(IFPObject.registry[tag]).items():
+            if not attr.startswith("_") and not callable(value):
+                attrs.add(attr)
+    # zlib finds matches closest to the end of the dictionary most cheaply, so the
+    # attribute names, which are used most, go last
+    words += tags + sorted(attrs)
+    dictionary = "\0".join(words).encode("utf-8")
+    return dictionary[-MAX_DICTIONARY_SIZE:]
+
+
+class CompressedWriter:
+    """
+    File-like wrapper that compresses everything written to it with a preset
+    dictionary, and writes it to the underlying file
+    """
+
+    def __init__(self, file, dictionary):
+        self.file = file
+        self.file.write(COMPRESSED_MAGIC)
+        self.file.write(DICTIONARY_ID.pack(zlib.adler32(dictionary)))
+        self.compressor = zlib.compressobj(9, zdict=dictionary)
+
+    def write(self, data):
+        self.file.write(self.compressor.compress(data))
+        return len(data)
+
+    def finish(self):
+        self.file.write(self.compressor.flush())
+
+
+class CompressedReader(io.RawIOBase):
+    """
+    Readable stream that decompresses a compressed save file as it is read
+    The dictionary is chosen by the checksum in the file: the given dictionary if it
+    matches, or else the one built by build_save_dictionary.
+    Raises DeserializationError if the file was compressed with neither
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, file, dictionary=None):
+        super().__init__()
+        if file.read(len(COMPRESSED_MAGIC)) != COMPRESSED_MAGIC:
+            raise DeserializationError("Not a compressed save file")
+        header = file.read(DICTIONARY_ID.size)
+        if len(header) != DICTIONARY_ID.size:
+            raise DeserializationError("Corrupt compressed save file")
+        (dictionary_id,) = DICTIONARY_ID.unpack(header)
+        if dictionary is None or dictionary_id != zlib.adler32(dictionary):
+            dictionary = build_save_dictionary()
+        if dictionary_id != zlib.adler32(dictionary):
+            raise DeserializationError(
+                "The save file was compressed with a different dictionary, by a "
+                "different version of the game."
+            )
+        self.file = file
+        self.decompressor = zlib.decompressobj(zdict=dictionary)
+        self.buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, out):
+        while not self.buffer:
+            if self.decompressor.eof:
+                return 0
+            chunk = self.file.read(self.CHUNK_SIZE)
+            if not chunk:
+                self.buffer = self.decompressor.flush()
+                if not self.buffer:
+                    return 0
+                break
+            try:
+                self.buffer = self.decompressor.decompress(chunk)
+            except zlib.error as e:
+                raise DeserializationError(f"Corrupt compressed save file: {e}")
+        n = min(len(out), len(self.buffer))
+        out[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+
+def open_save_data(file, dictionary=None):
+    """
+    Get a readable stream of the encoded save data in an open save file,
+    decompressing it if needed
+    """
+    if file.peek(len(COMPRESSED_MAGIC))[: len(COMPRESSED_MAGIC)] == COMPRESSED_MAGIC:
+        return io.BufferedReader(CompressedReader(file, dictionary))
+    return file
+
+
+def iter_save_records(filename, save_format=None, dictionary=None):
+    """
+    Read the records of a save file one at a time, without loading the whole file,
+    for tools that inspect or convert saves
+    Pickle files cannot be read incrementally, so they are loaded first.
+    Compressed saves are read with the given preset dictionary, if it is the one
+    they were compressed with, or else the one built by build_save_dictionary.
+    Yields dictionaries, as written by save_records
+    """
+    with open(filename, "rb") as f:
+        data = open_save_data(f, dictionary)
+        if save_format is None:
+            save_format = detect_save_format(data)
+        yield from get_encoder(save_format).records(data)
+
+
+# used for objects with no recorded defaults
+EMPTY_DEFAULTS = {}
+
+
+def is_default(value, default):
+    """
+    Check whether a text attribute still has its default value
+    StoryText is compared by position in the TextStore, without decoding it
+    """
+    if value is default:
+        return True
+    if type(value) is not type(default):
+        return False
+    if type(value) is StoryText:
+        return value.offset == default.offset and value.length == default.length
+    return value == default
+
+
+# types of attribute values copied when the game's state is captured
+CONTAINER_TYPES = (dict, list, tuple, set)
+CONTENTS_ATTRS = ("contains", "sub_contains")
+
+
+class GameState:
+    """
+    The state of a game, captured for saving by capture_game_state
+    """
+
+    def __init__(self):
+        # ix -> type tag
+        self.types = {}
+        # ix -> copy of the object's attributes, for objects in memory
+        self.attrs = {}
+        # ix -> attributes encoded by the storage engine, for objects in storage
+        self.stored = {}
+        # ix -> serialized contents, for each top level location
+        self.locations = {}
+        self.active_sequence = None
+
+
+def capture_game_state(game, copy=True):
+    """
+    Capture everything SaveGame needs from the game, doing as little work as
+    possible, so a save can be serialized later, or in another thread, without
+    seeing any changes made to the game in the meantime
+    Each object's attributes are copied, along with any dictionaries, lists, tuples
+    and sets they contain; all other values are immutable, or are IFPObjects, which
+    are saved by index. The contents of locations are serialized straight away.
+
+    :param copy: whether to copy the attributes; if False, the state refers to the
+        objects' own attributes, and must be saved before the game changes
+    :type copy: bool
+    Returns a GameState
+    """
+    state = GameState()
+    top_level_locations = []
+    for ix, obj in game.ifp_objects.items():
+        # __class__, rather than type, sees through objects in storage
+        state.types[ix] = obj.__class__.type_tag
+        stored = game.storage.stored_state(obj)
+        if stored is not None:
+            state.stored[ix] = stored
+        elif not copy:
+            state.attrs[ix] = obj.__dict__
+        else:
+            attrs = obj.__dict__.copy()
+            for attr, value in attrs.items():
+                # contents are serialized with the locations
+                if isinstance(value, CONTAINER_TYPES) and attr not in CONTENTS_ATTRS:
+                    attrs[attr] = _copy_containers(value)
+            state.attrs[ix] = attrs
+        if obj.is_top_level_location:
+            top_level_locations.append(obj)
+    for obj in top_level_locations:
+        state.locations[obj.ix] = _serialize_contains(game, obj)
+    state.active_sequence = game.parser.previous_command.sequence
+    return state
+
+
+def _copy_containers(value):
+    if isinstance(value, dict):
+        out = dict(value)
+        items = out.items()
+    elif isinstance(value, tuple):
+        return tuple(_copy_containers(list(value)))
+    else:
+        out = list(value)
+        items = enumerate(out)
+    for key, item in items:
+        if isinstance(item, CONTAINER_TYPES):
+            out[key] = _copy_containers(item)
+    return out
+
+
+def _serialize_contains(game, obj):
+    serialized_contents = {}
+
+    stored = game.storage.stored_state(obj)
+    if stored is None:
+        contains = obj.contains
+    else:
+        contains = {
+            key: [game.ifp_objects[item[5:]] for item in sublist]
+            for key, sublist in stored.get("contains", {}).items()
+        }
+    for key, sublist in contains.items():
+        serialized_contents[key] = []
+        for item in sublist:
+            serialized_contents[key].append(_serialize_contains(game, item))
+
+    return {"ix": obj.ix, "contains": serialized_contents, "placed": False}
 
 
 class SaveGame:
-    def __init__(self, game, filename):
+    """
+    Saves the state of the game
+
+    The state is captured as plain data (see `data`) as soon as the SaveGame is
+    created, so it is not affected by later changes to the game. If a filename is
+    given, the data is written to the file straight away.
+
+    To serialize the save somewhere else, such as in a background thread, capture
+    the state first with capture_game_state, and pass it as `state`.
+
+    :param game: the game to save
+    :type game: IFPGame
+    :param filename: optional, the file to save to
+    :type filename: str
+    :param save_format: the format to write, one of SAVE_ENCODERS ("pickle",
+        "jsonl" or "msgpack")
+    :type save_format: str
+    :param compress: whether to compress the file, with the game's preset
+        dictionary (see IFPGame.compress_saves); defaults to the game's setting
+    :type compress: bool
+    :param state: optional, the state to save, from capture_game_state; defaults to
+        the current state of the game
+    :type state: GameState
+    """
+
+    def __init__(
+        self, game, filename=None, save_format="pickle", compress=None, state=None
+    ):
         self.game = game
-        self.filename = self.create_save_file_path(filename)
+        if state is None:
+            # serialized straight away, so nothing needs copying
+            state = capture_game_state(game, copy=False)
+        self.state = state
+        # objects with text left out of the save
+        self.omitted_text = set()
         self.data = {
             "ifp_objects": self.save_ifp_objects(),
-            "locations": self.save_locations(),
-            "active_sequence": self.serialize_attribute(
-                game.parser.previous_command.sequence
-            ),
+            "types": dict(self.state.types),
+            "locations": self.state.locations,
+            "active_sequence": self.serialize_attribute(self.state.active_sequence),
+            "omitted_text": sorted(self.omitted_text),
         }
-        self.file = open(self.filename, "wb+")
-        pickle.dump(self.data, self.file, 0)
-        self.file.close()
+        self.save_format = save_format
+        if compress is None:
+            compress = game.compress_saves
+        self.dictionary = save_dictionary(game) if compress else None
+        get_encoder(save_format)
+        self.filename = None
+        if filename is not None:
+            self.filename = self.create_save_file_path(filename)
+            # write to a temporary file, so a save that fails part way through does
+            # not replace the existing file
+            temp = self.filename + ".tmp"
+            try:
+                with open(temp, "wb+") as self.file:
+                    dump_save(self.data, self.file, save_format, self.dictionary)
+            except BaseException:
+                os.remove(temp)
+                raise
+            os.replace(temp, self.filename)
+
+    def encode(self):
+        """
+        Encode the saved data for writing to a save file
+        Returns bytes
+        """
+        return encode_save(self.data, self.save_format, self.dictionary)
 
     def save_ifp_objects(self):
         out = {}
-        for ix, obj in self.game.ifp_objects.items():
-            out[ix] = self.serialize_ifp_object(obj)
+        for ix in self.state.types:
+            out[ix] = self.serialize_ifp_object(ix)
         return out
 
-    def serialize_ifp_object(self, obj):
+    def serialize_ifp_object(self, ix):
+        """
+        Serialize the captured attributes of an object
+        Text attributes that still have the value they had when the game started
+        (see IFPGame.recordSaveDefaults) are left out, and restored by the loader.
+        Objects with text left out are listed in the save, so the loader does not
+        recreate them without their text.
+        """
         out = {}
+        defaults = self.game.save_defaults.get(ix, EMPTY_DEFAULTS)
 
-        for attr, value in obj.__dict__.items():
+        stored = self.state.stored.get(ix)
+        if stored is not None:
+            # already encoded by the storage engine
+            for attr, value in stored.items():
+                if attr in ["contains", "sub_contains"]:
+                    continue
+                if attr in defaults and value == self.serialize_attribute(
+                    defaults[attr]
+                ):
+                    self.omitted_text.add(ix)
+                    continue
+                out[attr] = value
+            return out
+
+        for attr, value in self.state.attrs[ix].items():
             if attr in ["contains", "sub_contains"]:
                 # contains is handled in the location section
                 continue
 
+            if attr in defaults and is_default(value, defaults[attr]):
+                self.omitted_text.add(ix)
+                continue
+
             try:
                 out[attr] = self.serialize_attribute(value)
             except Unserializable:
@@ -56,9 +615,15 @@ class SaveGame:
         if isinstance(value, IFPObject):
             return f"<IFP>{value.ix}"
 
+        if isinstance(value, StoryText):
+            return f"<TXT>{value.offset}:{value.length}"
+
         if isinstance(value, str):
             return value
 
+        if isinstance(value, tuple):
+            return tuple(self.serialize_attribute(sub_value) for sub_value in value)
+
         try:
             out = {}
             for sub_attr, sub_value in value.items():
@@ -86,27 +651,6 @@ class SaveGame:
 
         return value
 
-    def save_locations(self):
-        top_level_locations = [
-            obj
-            for key, obj in self.game.ifp_objects.items()
-            if obj.is_top_level_location
-        ]
-        out = {}
-        for obj in top_level_locations:
-            out[obj.ix] = self.serialize_contains(obj)
-        return out
-
-    def serialize_contains(self, obj):
-        serialized_contents = {}
-
-        for key, sublist in obj.contains.items():
-            serialized_contents[key] = []
-            for item in sublist:
-                serialized_contents[key].append(self.serialize_contains(item))
-
-        return {"ix": obj.ix, "contains": serialized_contents, "placed": False}
-
     def create_save_file_path(self, filename):
         # check if we have a full path
         directory = os.path.join(*os.path.split(filename)[:-1])
@@ -125,117 +669,470 @@ class SaveGame:
         return filename
 
 
+class AutoSave:
+    """
+    Saves the game automatically at the end of every turn (or every few turns),
+    rotating through a number of save files, or slots
+
+    The state of the game is captured at the end of the turn (see
+    capture_game_state). Serializing it, encoding it, and writing it to disk,
+    happen in a background thread, so the next turn is never kept waiting. If turns end while the previous autosave is still being written,
+    only the most recent state is written next, to the next slot.
+
+    Each slot is written to a temporary file that replaces the slot once it is
+    safely on disk, so a slot is never left half written.
+
+    To turn on autosaving, set the game's `autosave` attribute to an AutoSave.
+
+    :param game: the game to save
+    :type game: IFPGame
+    :param directory: the directory to save to
+    :type directory: str
+    :param slots: the number of save files to rotate through
+    :type slots: int
+    :param name: the name of the save files, which are numbered by slot
+    :type name: str
+    :param every: how often to save, in turns
+    :type every: int
+    :param save_format: the format to write, as for SaveGame
+    :type save_format: str
+    """
+
+    def __init__(
+        self, game, directory, slots=3, name="autosave", every=1, save_format="pickle"
+    ):
+        if slots < 1 or every < 1:
+            raise ValueError(
+                "AutoSave needs at least one slot, and a positive interval"
+            )
+        self.game = game
+        self.directory = directory
+        self.slots = slots
+        self.name = name
+        self.every = every
+        self.save_format = save_format
+        # fail now, rather than in the writer thread, if the format is unknown
+        get_encoder(save_format)
+        self.turns = 0
+        # the number of autosaves written
+        self.saves = 0
+        # the path of the most recent complete autosave
+        self.latest = None
+        # the most recent exception raised while writing, if any
+        self.error = None
+        self._lock = threading.Lock()
+        self._pending = None
+        self._writing = False
+        self._thread = None
+
+    def slot_path(self, slot):
+        return os.path.join(self.directory, f"{self.name}_{slot}.sav")
+
+    def end_turn(self):
+        """
+        Called by the game at the end of each turn
+        """
+        self.turns += 1
+        if self.turns % self.every == 0:
+            self.save()
+
+    def save(self):
+        """
+        Capture the state of the game now, and write it to the next slot in the
+        background
+        """
+        state = capture_game_state(self.game)
+        dictionary = save_dictionary(self.game) if self.game.compress_saves else None
+        with self._lock:
+            self._pending = (state, dictionary)
+            if self._writing:
+                # the writer thread will pick up the pending save when it is done
+                return
+            self._writing = True
+        self._thread = threading.Thread(
+            target=self._write_pending, name="ifp-autosave", daemon=True
+        )
+        self._thread.start()
+
+    def _write_pending(self):
+        while True:
+            with self._lock:
+                pending = self._pending
+                self._pending = None
+                if pending is None:
+                    self._writing = False
+                    return
+            state, dictionary = pending
+            path = self.slot_path(self.saves % self.slots)
+            try:
+                data = SaveGame(self.game, state=state).data
+                write_save_file(path, encode_save(data, self.save_format, dictionary))
+            except Exception as e:
+                self.error = e
+                continue
+            self.saves += 1
+            self.latest = path
+
+    def wait(self):
+        """
+        Block until all autosaves have been written, for instance before the game
+        closes
+        """
+        thread = self._thread
+        while thread is not None:
+            thread.join()
+            with self._lock:
+                if not self._writing:
+                    return
+            thread = self._thread
+
+
+def save_dictionary(game):
+    """
+    Get the game's preset dictionary for compressing saves, building it on first
+    use
+    """
+    if game.save_dictionary is None:
+        game.save_dictionary = build_save_dictionary()
+    return game.save_dictionary
+
+
+def encode_save(data, save_format="pickle", dictionary=None):
+    """
+    Encode saved data in the given format, compressing it if a preset dictionary is
+    given
+    Returns bytes
+    """
+    out = io.BytesIO()
+    dump_save(data, out, save_format, dictionary)
+    return out.getvalue()
+
+
+def dump_save(data, file, save_format="pickle", dictionary=None):
+    """
+    Write saved data to an open file in the given format, compressing it if a
+    preset dictionary is given
+    """
+    encoder = get_encoder(save_format)
+    if dictionary is None:
+        encoder.dump(data, file)
+        return
+    writer = CompressedWriter(file, dictionary)
+    encoder.dump(data, writer)
+    writer.finish()
+
+
+def write_save_file(filename, encoded):
+    """
+    Write encoded save data to a file, replacing the file only once the data is
+    safely on disk
+    """
+    temp = filename + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(encoded)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, filename)
+
+
 class LoadGame:
+    """
+    Loads a saved game
+
+    Reading the file raises DeserializationError if it is not a save file that this
+    game can read, or IFPError if its format is unknown or unavailable.
+    """
+
     single_object_keys = ["active_sequence"]
-    allowed_keys = ["ifp_objects", "locations", "active_sequence"]
+    allowed_keys = [
+        "ifp_objects",
+        "types",
+        "locations",
+        "active_sequence",
+        "omitted_text",
+    ]
 
-    def __init__(self, game, filename):
+    def __init__(self, game, filename, save_format=None):
         self.game = game
         self.filename = filename
         self.file = open(self.filename, "rb")
-        self.data = pickle.load(self.file)
-        self.file.close()
+        try:
+            data = open_save_data(self.file, game.save_dictionary)
+            if save_format is None:
+                save_format = detect_save_format(data)
+            self.save_format = save_format
+            self.data = get_encoder(save_format).load(data)
+        except (pickle.UnpicklingError, EOFError, ValueError) as e:
+            # ValueError includes malformed JSON, text that is not UTF-8, and
+            # malformed MessagePack
+            raise DeserializationError(f"Cannot read save file: {e}") from e
+        finally:
+            self.file.close()
+        # objects recreated from the save, staged by is_valid
+        self.staged_new = {}
 
     def is_valid(self):
         """
-        Try deserializing the data.
+        Try deserializing the data, in a single pass, into a staging area, without
+        changing the game
         On success, return True, and set load_file.validated_data
-        On failure, delete the temporary objects, and return False
-        """
-        for key, subdict in self.data.items():
-            if not key in self.allowed_keys:
-                return False
-            if key in self.single_object_keys:
-                try:
-                    self.deserialize_attribute(value)
-                except DeserializationError:
+        On failure, discard the staged data, and return False
+
+        Objects in the save that do not exist in the game are recreated from their
+        type tags, without running their setup code, and added to the game when it
+        is loaded. An object whose text was left out of the save cannot be recreated,
+        as this game has no defaults to restore its text from.
+        """
+        staged_objects = {}
+        self.staged_new = {}
+        try:
+            for key in self.data:
+                if not key in self.allowed_keys:
                     return False
-                continue
 
-            for ix, obj in subdict.items():
-                if not ix in self.game.ifp_objects:
+            types = self.data.get("types", {})
+            omitted_text = set(self.data.get("omitted_text", []))
+            for ix in self.data.get("ifp_objects", {}):
+                if ix in self.game.ifp_objects:
+                    continue
+                cls = IFPObject.registry.get(types.get(ix))
+                if cls is None or ix in omitted_text:
+                    return False
+                self.staged_new[ix] = cls.reconstruct(self.game, ix)
+
+            for ix, obj_data in self.data.get("ifp_objects", {}).items():
+                staged_objects[ix] = {
+                    attr: self.deserialize_attribute(value)
+                    for attr, value in obj_data.items()
+                }
+
+            for ix, obj_data in self.data.get("locations", {}).items():
+                if self.lookup(ix) is None:
                     return False
+                self.validate_contains(obj_data["contains"])
 
-                for attr, value in obj.items():
-                    try:
-                        self.deserialize_attribute(value)
-                    except DeserializationError:
-                        return False
+            staged_sequence = self.deserialize_attribute(
+                self.data.get("active_sequence")
+            )
+        except (DeserializationError, KeyError, TypeError, AttributeError):
+            self.staged_new = {}
+            return False
 
+        self.staged_objects = staged_objects
+        self.staged_sequence = staged_sequence
         self.validated_data = self.data
         return True
 
+    def validate_contains(self, dict_in):
+        """
+        Check that every Thing placed in a location exists in the game
+        Raises DeserializationError if a Thing does not exist
+        """
+        for ix, sublist in dict_in.items():
+            if self.lookup(ix) is None:
+                raise DeserializationError(f"No object with index {ix}")
+            for obj_data in sublist:
+                self.validate_contains(obj_data["contains"])
+
+    def lookup(self, ix):
+        """
+        Find an object in the game, or recreated from the save
+        Returns the object, or None if there is no object with the index
+        """
+        obj = self.game.ifp_objects.get(ix)
+        if obj is None:
+            obj = self.staged_new.get(ix)
+        return obj
+
     def load(self):
+        """
+        Replace the state of the game with the validated data
+        If anything goes wrong, the game is restored to its state before loading,
+        and DeserializationError is raised
+        """
         if not hasattr(self, "validated_data"):
             raise DeserializationError("Call is_valid before loading game.")
-        self.load_ifp_objects()
-        self.load_locations()
-        self.game.parser.previous_command.sequence = self.deserialize_attribute(
-            self.validated_data["active_sequence"]
-        )
+        # loading replaces the state of every object, so none can stay in storage
+        self.game.storage.restore_all()
+        backup = self.back_up_game()
+        try:
+            # the world is being restored, not changed by the player
+            with self.game.event_bus.pause():
+                self.add_new_objects()
+                self.load_ifp_objects()
+                self.load_locations()
+            self.game.parser.previous_command.sequence = self.staged_sequence
+        except Exception as e:
+            self.restore_game(backup)
+            raise DeserializationError(f"Failed to load game: {e}") from e
+        finally:
+            self.game.lexicon_generation += 1
         return True
 
+    def back_up_game(self):
+        """
+        Record the state of every object that loading can change, so a failed load
+        can be undone
+        Loading replaces attributes, and moves Things around in place, so the
+        contents of each location are copied
+        """
+        objects = {}
+        unvisited = list(self.game.ifp_objects.values())
+        while unvisited:
+            obj = unvisited.pop()
+            if id(obj) in objects:
+                continue
+            state = dict(obj.__dict__)
+            if "contains" in state:
+                state["contains"] = {
+                    ix: list(sublist) for ix, sublist in state["contains"].items()
+                }
+                # include copies of Things, which are not in game.ifp_objects
+                for sublist in state["contains"].values():
+                    unvisited.extend(sublist)
+            objects[id(obj)] = (obj, state)
+
+        return {
+            "objects": list(objects.values()),
+            "ixs": set(self.game.ifp_objects),
+            "next_obj_ix": self.game.next_obj_ix,
+            "nouns": {word: list(things) for word, things in self.game.nouns.items()},
+            "sequence": self.game.parser.previous_command.sequence,
+        }
+
+    def restore_game(self, backup):
+        for ix in set(self.game.ifp_objects) - backup["ixs"]:
+            del self.game.ifp_objects[ix]
+        self.game.next_obj_ix = backup["next_obj_ix"]
+        for obj, state in backup["objects"]:
+            obj.__dict__.clear()
+            obj.__dict__.update(state)
+        self.game.nouns.clear()
+        self.game.nouns.update(backup["nouns"])
+        self.game.parser.previous_command.sequence = backup["sequence"]
+
+    def add_new_objects(self):
+        """
+        Add the objects recreated from the save to the game
+        """
+        for ix, obj in self.staged_new.items():
+            self.game.ifp_objects[ix] = obj
+            # objects created after this must not reuse the index
+            number = generatedIndexNumber(ix)
+            if number is not None and number >= self.game.next_obj_ix:
+                self.game.next_obj_ix = number + 1
+
     def load_ifp_objects(self):
         if not hasattr(self, "validated_data"):
             raise DeserializationError("Call is_valid before loading game.")
 
-        for ix, obj_data in self.validated_data["ifp_objects"].items():
+        for ix, attrs in self.staged_objects.items():
             obj = self.game.ifp_objects[ix]
 
-            for attr, value in obj_data.items():
-                setattr(obj, attr, self.deserialize_attribute(value))
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
 
-    def load_locations(self):
-        self.placed_things = []
+            # text attributes left out of the save still have their default values
+            for attr, value in self.game.save_defaults.get(ix, EMPTY_DEFAULTS).items():
+                if attr not in attrs:
+                    setattr(obj, attr, value)
 
+    def load_locations(self):
+        """
+        Rebuild the contents of every saved location
+        The current contents are detached, then every saved Thing is placed, in a
+        single pass over the saved containment tree. Where a Thing's index appears
+        more than once, the first is the original Thing, and the rest are copies.
+        """
         if not hasattr(self, "validated_data"):
             raise DeserializationError("Call is_valid before loading game.")
 
-        for ix, obj_data in self.validated_data["locations"].items():
-            obj = self.game.ifp_objects[ix]
-            self.empty_contains(obj)
-            self.populate_contains(obj, obj_data["contains"])
+        locations = self.validated_data.get("locations", {})
+        roots = [self.game.ifp_objects[ix] for ix in locations]
+        discarded = self.detach_contents(roots)
 
-        del self.placed_things
+        placed = set()
+        stack = [
+            (self.game.ifp_objects[ix], obj_data["contains"])
+            for ix, obj_data in reversed(list(locations.items()))
+        ]
+        while stack:
+            destination, dict_in = stack.pop()
+            children = []
+            for ix, sublist in dict_in.items():
+                for obj_data in sublist:
+                    item = self.place_thing_by_ix(destination, ix, placed, discarded)
+                    children.append((item, obj_data["contains"]))
+            # depth first, in saved order
+            stack.extend(reversed(children))
 
-    def empty_contains(self, obj):
-        contains = [item for ix, sublist in obj.contains.items() for item in sublist]
-        for item in contains:
-            if obj.containsItem(item):
-                self.empty_contains(item)
-                obj.removeThing(item)
+        self.forget_copies(discarded)
 
-    def add_thing_by_ix(self, destination, ix):
+    def detach_contents(self, roots):
+        """
+        Empty the given locations, and everything inside them
+        Returns the set of ids of the detached copies of Things, which will be
+        discarded unless they are placed again
+        """
+        discarded = set()
+        stack = list(roots)
+        while stack:
+            obj = stack.pop()
+            for sublist in obj.contains.values():
+                for item in sublist:
+                    item.location = None
+                    if item is not self.game.ifp_objects.get(item.ix):
+                        discarded.add(id(item))
+                    stack.append(item)
+            obj.contains = {}
+        return discarded
+
+    def place_thing_by_ix(self, destination, ix, placed, discarded):
         """
         Adds a Thing to a location (Room/Thing) by index. Makes a copy if a Thing of
         the specified index has already been placed.
         destination is a PhysicalEntity subclass instance
+        Returns the Thing placed
         """
-        if ix in self.placed_things:
+        if ix in placed:
             item = self.game.ifp_objects[ix].copyThing()
         else:
-            self.placed_things.append(ix)
+            placed.add(ix)
             item = self.game.ifp_objects[ix]
-        for word in item.synonyms:
-            if not word in self.game.nouns:
-                self.game.nouns[word] = [item]
-            elif not item in self.game.nouns[word]:
-                self.game.nouns[word].append(item)
-        destination.addThing(item)
+            if item.location:
+                # the Thing was somewhere that is not being restored
+                item.location.removeContains(item)
+            if item.contains:
+                discarded.update(self.detach_contents([item]))
+            for word in [item.name] + item.synonyms:
+                if not word in self.game.nouns:
+                    self.game.nouns[word] = [item]
+                elif not item in self.game.nouns[word]:
+                    self.game.nouns[word].append(item)
+        if ix in destination.contains:
+            destination.contains[ix].append(item)
+        else:
+            destination.contains[ix] = [item]
+        item.location = destination
         return item
 
-    def populate_contains(self, root_obj, dict_in):
+    def forget_copies(self, discarded):
         """
-        Uses a recursive depth first search to place all items in the correct location
-        root_obj is the object to populate, dict_in is the dictionary to read from
+        Remove the detached copies of Things that were not placed again from the
+        game's nouns
         """
-        for key in dict_in:
-            for obj_data in dict_in[key]:
-                if not obj_data["placed"]:
-                    found_obj = self.add_thing_by_ix(root_obj, key)
-                    self.empty_contains(found_obj)
-                    obj_data["placed"] = True
-                    self.populate_contains(found_obj, obj_data["contains"])
+        if not discarded:
+            return
+        for word in list(self.game.nouns):
+            things = [
+                item
+                for item in self.game.nouns[word]
+                if id(item) not in discarded or item.location is not None
+            ]
+            if things:
+                self.game.nouns[word] = things
+            else:
+                del self.game.nouns[word]
 
     def deserialize_attribute(self, value):
         """
@@ -244,14 +1141,23 @@ class LoadGame:
         that cannot be deseriliazed
         """
         if isinstance(value, str) and value[:5] == "<IFP>":
-            ix = value[5:]
-            if not ix in self.game.ifp_objects:
+            obj = self.lookup(value[5:])
+            if obj is None:
                 raise DeserializationError
-            return self.game.ifp_objects[ix]
+            return obj
+
+        elif isinstance(value, str) and value[:5] == "<TXT>":
+            if not self.game.text_store:
+                raise DeserializationError
+            offset, length = value[5:].split(":")
+            return StoryText(self.game.text_store, int(offset), int(length))
 
         elif isinstance(value, str):
             return value
 
+        elif isinstance(value, tuple):
+            return tuple(self.deserialize_attribute(sub_value) for sub_value in value)
+
         try:
             out = {}
             for sub_attr, sub_value in value.items():
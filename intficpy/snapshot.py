@@ -0,0 +1,156 @@
+import os
+import pickle
+import sys
+import types
+
+from .exceptions import IFPError
+
+##############################################################
+# SNAPSHOT.PY - ahead-of-time world compilation for IntFicPy
+# Defines build_snapshot and load_snapshot
+##############################################################
+# A snapshot stores the whole world as the author's setup code left it - every
+# IFPObject, with its class, attributes and contents, and the game's nouns and
+# verbs - so that a game can start without running the setup code again.
+#
+# Classes, functions and methods are stored by reference. Those defined at the top
+# level of the game's main module (the script being run, or the module named by
+# IFPGame's `main` argument) are looked up in the module that loads the snapshot,
+# which is never imported again, so a game script can define its callbacks, and load
+# the snapshot instead of running its setup code:
+#
+#     def takeOpalFunc(game):
+#         ...
+#
+#     def build_world(app):
+#         game = IFPGame(app)
+#         ...  # every object created here
+#         return game
+#
+#     if __name__ == "__main__":
+#         app = TerminalApp()
+#         if os.path.exists("world.snap"):
+#             game = load_snapshot(app, "world.snap")
+#         else:
+#             game = build_world(app)
+#             build_snapshot(game, "world.snap")
+#         app.runGame()
+#
+# Any other classes and functions are imported from their modules as usual.
+
+SNAPSHOT_FORMAT = "ifp-snapshot"
+SNAPSHOT_VERSION = 1
+
+
+def build_snapshot(game, filename):
+    """
+    Write a snapshot of a fully set up game, before initGame is called
+
+    Raises IFPError if part of the world cannot be stored by reference, such as a
+    lambda or a function defined inside another function.
+
+    :param game: the game to snapshot
+    :type game: IFPGame
+    :param filename: the path of the snapshot file to write
+    :type filename: str
+    """
+    # the storage engine is not part of the snapshot
+    game.storage.restore_all()
+    data = {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, "game": game}
+    main_names = {"__main__", game.main_name}
+    tmp_filename = filename + ".tmp"
+    try:
+        with open(tmp_filename, "wb") as f:
+            _SnapshotPickler(f, main_names).dump(data)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        os.remove(tmp_filename)
+        raise IFPError(
+            f"Cannot build a snapshot of this game: {e}\n"
+            "Make sure any functions and classes used by the game's objects are "
+            "defined at the top level of an importable module."
+        ) from e
+    os.replace(tmp_filename, filename)
+
+
+def load_snapshot(app, filename, main=None):
+    """
+    Reconstruct a game from a snapshot, without running the game's setup code
+    The loaded game is ready for initGame.
+
+    Raises IFPError if a class or function from the game's main module is not
+    defined in `main`.
+
+    :param app: the app that will run the game
+    :param filename: the path of the snapshot file to load
+    :type filename: str
+    :param main: the module (or any object) defining the classes and functions that
+        were defined in the game's main module when the snapshot was built;
+        defaults to the script being run
+    :rtype: IFPGame
+    """
+    if main is None:
+        main = sys.modules["__main__"]
+    with open(filename, "rb") as f:
+        data = _SnapshotUnpickler(f, main).load()
+
+    if not (
+        isinstance(data, dict)
+        and data.get("format") == SNAPSHOT_FORMAT
+        and data.get("version") == SNAPSHOT_VERSION
+    ):
+        raise IFPError(f"{filename} is not a compatible IntFicPy world snapshot.")
+
+    game = data["game"]
+    game.app = app
+    app.game = game
+    game.echo_on = getattr(app, "echo_on", True)
+    return game
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """
+    Stores classes and functions from the game's main module as references to be
+    looked up in the module that loads the snapshot
+    """
+
+    def __init__(self, file, main_names):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.main_names = main_names
+
+    def reducer_override(self, obj):
+        if (
+            isinstance(obj, (types.FunctionType, type))
+            and getattr(obj, "__module__", None) in self.main_names
+            and "<" not in obj.__qualname__
+        ):
+            return _main_attribute, (obj.__qualname__,)
+        return NotImplemented
+
+
+def _main_attribute(qualname):
+    # replaced by _SnapshotUnpickler.main_attribute when loading
+    raise IFPError("Snapshots must be loaded with load_snapshot.")
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, main):
+        super().__init__(file)
+        self.main = main
+
+    def find_class(self, module, name):
+        if module == __name__ and name == "_main_attribute":
+            return self.main_attribute
+        return super().find_class(module, name)
+
+    def main_attribute(self, qualname):
+        obj = self.main
+        try:
+            for name in qualname.split("."):
+                obj = getattr(obj, name)
+        except AttributeError as e:
+            raise IFPError(
+                f"The snapshot uses {qualname} from the game's main module, which is "
+                f"not defined in {getattr(self.main, '__name__', self.main)}. Define "
+                "it at the top level of the module that loads the snapshot."
+            ) from e
+        return obj
@@ -0,0 +1,295 @@
+from collections import OrderedDict
+
+from .exceptions import IFPError, Unserializable
+from .ifp_object import IFPObject
+from .text_store import StoryText
+
+##############################################################
+# STORAGE.PY - state storage engines for IntFicPy
+# Defines the MemoryEngine and SQLiteEngine classes
+##############################################################
+# A storage engine decides where the state of the game's IFPObjects is kept
+# between turns. By default (MemoryEngine), every IFPObject keeps its state in its
+# own attributes for the whole game.
+#
+# SQLiteEngine moves the state of IFPObjects into an SQLite database, leaving only a
+# small placeholder object in its place, with the same identity. The first time an
+# attribute of a placeholder is used, the object's state is loaded back from the
+# database, so the rest of IntFicPy never needs to know where the state is kept.
+
+# attributes kept on an IFPObject while its state is in storage
+STUB_ATTRIBUTES = ("ix", "game", "is_top_level_location")
+
+_set_class = object.__dict__["__class__"].__set__
+
+
+class _StoredObject:
+    """
+    Placeholder for an IFPObject whose state is in a storage engine
+    Using any attribute other than those in STUB_ATTRIBUTES loads the object's
+    state, and turns the placeholder back into the original object. isinstance
+    checks against the original class without loading it.
+    """
+
+    def __getattr__(self, attr):
+        _restore(self)
+        return getattr(self, attr)
+
+    def __setattr__(self, attr, value):
+        _restore(self)
+        setattr(self, attr, value)
+
+    def __delattr__(self, attr):
+        _restore(self)
+        delattr(self, attr)
+
+    @property
+    def __class__(self):
+        # isinstance falls back on __class__, so type checks see the original
+        # class, without loading the object
+        stub_dict = object.__getattribute__(self, "__dict__")
+        return stub_dict["game"].storage.classes[stub_dict["ix"]]
+
+
+def _restore(stub):
+    stub_dict = object.__getattribute__(stub, "__dict__")
+    stub_dict["game"].storage.restore(stub)
+
+
+def stored_ix(value):
+    """
+    Get the index of an IFPObject whose state is in storage, without loading it
+    Returns the index, or None if the value is not a stored IFPObject
+    """
+    if type(value) is _StoredObject:
+        return object.__getattribute__(value, "__dict__")["ix"]
+    return None
+
+
+class MemoryEngine:
+    """
+    The default storage engine: every IFPObject keeps its state in its own
+    attributes for the whole game
+    """
+
+    def is_stored(self, obj):
+        """
+        Check whether the object's state is currently in storage
+        """
+        return False
+
+    def stored_state(self, obj):
+        """
+        Get the stored state of an object, encoded as in a save file, without
+        loading it
+        Returns a dictionary of attribute names to encoded values, or None if the
+        object's state is not in storage
+        """
+        return None
+
+    def restore(self, obj):
+        """
+        Load an object's state from storage, if it is stored
+        """
+        pass
+
+    def restore_all(self):
+        """
+        Load the state of every stored object
+        """
+        pass
+
+    def end_turn(self):
+        """
+        Called by the game at the end of each turn
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteEngine(MemoryEngine):
+    """
+    Keeps the state of IFPObjects in an SQLite database, loading each object's
+    state on demand, the first time one of its attributes is used
+
+    Call `store_all` once the world is built to move every IFPObject that can be
+    stored into the database. At the end of each turn, the state of every loaded
+    object is written in a single transaction, and the objects that were
+    loaded longest ago are stored again, so at most `cache_size` of them stay loaded
+    between turns.
+
+    An object stays in memory if any of its attributes cannot be stored, such as a
+    function, or an object that is not an IFPObject, or if it refers to a copy of a
+    Thing. Stored values must be strings, numbers, booleans, None, lists, dicts,
+    IFPObjects or StoryText.
+
+    :param game: the game whose objects to store
+    :type game: IFPGame
+    :param path: the database file, or ":memory:" for a temporary database
+    :type path: str
+    :param cache_size: the number of loaded objects to keep between turns
+    :type cache_size: int
+    """
+
+    def __init__(self, game, path=":memory:", cache_size=64):
+        import sqlite3
+
+        self.game = game
+        self.path = path
+        self.cache_size = cache_size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS objects (ix TEXT PRIMARY KEY, state BLOB)"
+        )
+        self.connection.commit()
+        # ix -> original class, for every object whose state is stored
+        self.classes = {}
+        # ix -> object, for objects loaded from storage, least recently loaded first
+        self.loaded = OrderedDict()
+        # indexes of objects that cannot be stored
+        self.pinned = set()
+
+    def is_stored(self, obj):
+        return type(obj) is _StoredObject
+
+    def stored_state(self, obj):
+        ix = stored_ix(obj)
+        if ix is None:
+            return None
+        state = self._read(ix)
+        stub_dict = object.__getattribute__(obj, "__dict__")
+        for attr in STUB_ATTRIBUTES:
+            if attr != "game" and attr in stub_dict:
+                state[attr] = stub_dict[attr]
+        return state
+
+    def store_all(self):
+        """
+        Move the state of every IFPObject that can be stored into the database
+        """
+        objects = [
+            obj
+            for obj in self.game.ifp_objects.values()
+            if not self.is_stored(obj) and obj.ix not in self.pinned
+        ]
+        encoded = self._write(objects)
+        for obj in objects:
+            if obj.ix in encoded:
+                self._stub(obj)
+
+    def restore(self, obj):
+        ix = stored_ix(obj)
+        if ix is None:
+            return
+        state = {attr: self._decode(value) for attr, value in self._read(ix).items()}
+        _set_class(obj, self.classes.pop(ix))
+        obj.__dict__.update(state)
+        self.loaded[ix] = obj
+
+    def restore_all(self):
+        for ix in list(self.classes):
+            self.restore(self.game.ifp_objects[ix])
+
+    def end_turn(self):
+        objects = list(self.loaded.values())
+        if not objects:
+            return
+        encoded = self._write(objects)
+        # objects that could not be written stay loaded for good
+        for obj in objects:
+            if obj.ix not in encoded:
+                del self.loaded[obj.ix]
+        while len(self.loaded) > self.cache_size:
+            ix, obj = self.loaded.popitem(last=False)
+            self._stub(obj)
+
+    def close(self):
+        self.restore_all()
+        self.connection.close()
+
+    def _stub(self, obj):
+        self.loaded.pop(obj.ix, None)
+        self.classes[obj.ix] = type(obj)
+        keep = {
+            attr: obj.__dict__[attr] for attr in STUB_ATTRIBUTES if attr in obj.__dict__
+        }
+        obj.__dict__.clear()
+        obj.__dict__.update(keep)
+        _set_class(obj, _StoredObject)
+
+    def _read(self, ix):
+        import pickle
+
+        row = self.connection.execute(
+            "SELECT state FROM objects WHERE ix = ?", (ix,)
+        ).fetchone()
+        if row is None:
+            raise IFPError(f"No stored state for {ix}")
+        return pickle.loads(row[0])
+
+    def _write(self, objects):
+        """
+        Encode and write the state of the objects in a single transaction
+        Objects that cannot be encoded are pinned in memory
+        Returns the set of indexes written
+        """
+        import pickle
+
+        rows = []
+        for obj in objects:
+            try:
+                state = {
+                    attr: self._encode(value)
+                    for attr, value in obj.__dict__.items()
+                    if attr not in STUB_ATTRIBUTES
+                }
+            except Unserializable:
+                self.pinned.add(obj.ix)
+                continue
+            if self.game.ifp_objects.get(obj.ix) is not obj:
+                # a copy of a Thing, sharing its original's index
+                continue
+            rows.append((obj.ix, pickle.dumps(state, pickle.HIGHEST_PROTOCOL)))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO objects (ix, state) VALUES (?, ?)", rows
+            )
+        return {row[0] for row in rows}
+
+    def _encode(self, value):
+        """
+        Encode a value in the format used by save files
+        Raises Unserializable if the value cannot be stored exactly
+        """
+        ix = stored_ix(value)
+        if ix is not None:
+            return f"<IFP>{ix}"
+        if isinstance(value, IFPObject):
+            if self.game.ifp_objects.get(value.ix) is not value:
+                raise Unserializable("Cannot store a reference to a copy of a Thing")
+            return f"<IFP>{value.ix}"
+        if isinstance(value, StoryText):
+            return f"<TXT>{value.offset}:{value.length}"
+        if value is None or type(value) in (str, int, float, bool):
+            return value
+        if type(value) is list:
+            return [self._encode(item) for item in value]
+        if type(value) is dict:
+            return {key: self._encode(item) for key, item in value.items()}
+        raise Unserializable(f"Cannot store value {value!r}")
+
+    def _decode(self, value):
+        if isinstance(value, str):
+            if value[:5] == "<IFP>":
+                return self.game.ifp_objects[value[5:]]
+            if value[:5] == "<TXT>":
+                offset, length = value[5:].split(":")
+                return StoryText(self.game.text_store, int(offset), int(length))
+            return value
+        if type(value) is list:
+            return [self._decode(item) for item in value]
+        if type(value) is dict:
+            return {key: self._decode(item) for key, item in value.items()}
+        return value
@@ -0,0 +1,231 @@
+import mmap
+import os
+import struct
+
+from .exceptions import IFPError
+
+##############################################################
+# TEXT_STORE.PY - read-only story text storage for IntFicPy
+# Defines the TextStore class, and the StoryText class
+##############################################################
+
+# attributes of IFPObjects that hold story text, and can be moved into a TextStore
+STORED_TEXT_ATTRIBUTES = (
+    "description",
+    "x_description",
+    "desc",
+    "text",
+    "read_desc",
+    "template",
+)
+
+
+class StoryText:
+    """
+    A reference to a string held in a TextStore.
+
+    The text is decoded from the store every time it is needed, so the string itself
+    is never kept alive on the object that refers to it. StoryText supports the
+    string operations IntFicPy uses on story text (concatenation, formatting,
+    membership tests, comparison), and converts to a plain string with `str()`.
+    """
+
+    __slots__ = ("store", "offset", "length")
+
+    def __init__(self, store, offset, length):
+        self.store = store
+        self.offset = offset
+        self.length = length
+
+    def __str__(self):
+        return self.store.read(self.offset, self.length)
+
+    def __repr__(self):
+        return f"<StoryText {self.offset}:{self.length}>"
+
+    def __reduce__(self):
+        return (StoryText, (self.store, self.offset, self.length))
+
+    def __getattr__(self, attr):
+        # str methods (format, startswith, split...) act on the decoded text
+        return getattr(str(self), attr)
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+    def __add__(self, other):
+        return str(self) + str(other)
+
+    def __radd__(self, other):
+        return str(other) + str(self)
+
+    def __mul__(self, n):
+        return str(self) * n
+
+    def __contains__(self, sub):
+        return str(sub) in str(self)
+
+    def __getitem__(self, ix):
+        return str(self)[ix]
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __len__(self):
+        return len(str(self))
+
+    def __bool__(self):
+        return self.length > 0
+
+    def __eq__(self, other):
+        if isinstance(other, StoryText):
+            other = str(other)
+        return str(self) == other
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+class TextStore:
+    """
+    A read-only, memory-mapped file of story text.
+
+    Build the file once from a fully set up game with `TextStore.build`. At startup,
+    open it with `TextStore(filename)`, and call `attach(game)` to replace the
+    stored strings on the game's IFPObjects with StoryText references. The file is
+    mapped read-only, so every game process on a host shares the same pages.
+
+    The data file must be rebuilt whenever the game's story text changes.
+    """
+
+    MAGIC = b"IFPTXT1\n"
+    HEADER_LENGTH = struct.Struct("<Q")
+
+    def __init__(self, filename):
+        import json
+
+        self.filename = filename
+        with open(filename, "rb") as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise IFPError(f"{filename} is not an IntFicPy text store.")
+            (header_length,) = self.HEADER_LENGTH.unpack(
+                f.read(self.HEADER_LENGTH.size)
+            )
+            self.entries = json.loads(f.read(header_length).decode("utf-8"))
+            self.data_start = len(self.MAGIC) + self.HEADER_LENGTH.size + header_length
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __reduce__(self):
+        return (TextStore, (self.filename,))
+
+    def read(self, offset, length):
+        """
+        Decode the text at the given offset from the start of the text data
+
+        :rtype: str
+        """
+        start = self.data_start + offset
+        return self._map[start : start + length].decode("utf-8")
+
+    def close(self):
+        self._map.close()
+
+    def attach(self, game):
+        """
+        Replace the story text on the game's IFPObjects with references into this
+        store.
+
+        Raises IFPError if the store was built from a different version of the game.
+        """
+        for ix, path, offset, length, n_chars in self.entries:
+            if not ix in game.ifp_objects:
+                raise IFPError(
+                    f"Text store {self.filename} refers to unknown object {ix}. "
+                    "Rebuild the text store for the current game."
+                )
+            container, key = _resolve_path(game.ifp_objects[ix], path)
+            value = container[key]
+            if isinstance(value, StoryText):
+                if value.store is self:
+                    continue
+                value = str(value)
+            if not isinstance(value, str) or len(value) != n_chars:
+                raise IFPError(
+                    f"Text store {self.filename} does not match {ix}.{path[0]}. "
+                    "Rebuild the text store for the current game."
+                )
+            container[key] = StoryText(self, offset, length)
+        game.text_store = self
+
+    @staticmethod
+    def build(game, filename, min_length=32):
+        """
+        Write the story text of a fully set up game to a text store file.
+
+        Strings shorter than min_length are left on the objects, since a reference
+        would save nothing. Identical strings are stored once.
+
+        :param game: the game to collect text from
+        :type game: IFPGame
+        :param filename: the path of the data file to write
+        :type filename: str
+        :param min_length: the minimum length of string to store
+        :type min_length: int
+        """
+        import json
+
+        entries = []
+        offsets = {}
+        data = bytearray()
+
+        for ix, obj in game.ifp_objects.items():
+            for attr in STORED_TEXT_ATTRIBUTES:
+                if not attr in obj.__dict__:
+                    continue
+                for path, text in _iter_text(obj.__dict__[attr], [attr]):
+                    if len(text) < min_length:
+                        continue
+                    encoded = text.encode("utf-8")
+                    if encoded not in offsets:
+                        offsets[encoded] = len(data)
+                        data += encoded
+                    entries.append(
+                        [ix, path, offsets[encoded], len(encoded), len(text)]
+                    )
+
+        header = json.dumps(entries).encode("utf-8")
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "wb") as f:
+            f.write(TextStore.MAGIC)
+            f.write(TextStore.HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            f.write(data)
+        os.replace(tmp_filename, filename)
+        return len(entries)
+
+
+def _iter_text(value, path):
+    """
+    Find the strings in an attribute value, descending into lists and dicts
+    (such as Sequence templates)
+    Yields pairs of (path, string)
+    """
+    if type(value) is str or isinstance(value, StoryText):
+        yield path, str(value)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from _iter_text(item, path + [i])
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if type(key) is str:
+                yield from _iter_text(item, path + [key])
+
+
+def _resolve_path(obj, path):
+    """
+    Find the container (object dict, list, or dict) and key for a stored text path
+    """
+    container = obj.__dict__
+    for key in path[:-1]:
+        container = container[key]
+    return container, path[-1]
@@ -127,6 +127,7 @@ class Thing(PhysicalEntity):
             self.game.nouns[name].append(self)
         else:
             self.game.nouns[name] = [self]
+        self.game.lexicon_generation += 1
 
     @property
     def verb_to_be(self):
@@ -296,6 +297,7 @@ class Thing(PhysicalEntity):
                 self.game.nouns[word].append(self)
         else:
             self.game.nouns[word] = [self]
+        self.game.lexicon_generation += 1
 
     def removeSynonym(self, word):
         """Adds a synonym (noun) that can be used to refer to a Thing
@@ -307,12 +309,14 @@ class Thing(PhysicalEntity):
                 self.game.nouns[word].remove(self)
             if self.game.nouns[word] == []:
                 del self.game.nouns[word]
+        self.game.lexicon_generation += 1
 
     def setAdjectives(self, adj_list):
         """Sets adjectives for a Thing
         Takes arguments adj_list, a list of one word strings (adjectives), and update_desc, a Boolean defaulting to True
         Game creators should set update_desc to False if using a custom desc or xdesc for a Thing """
         self.adjectives = adj_list
+        self.game.lexicon_generation += 1
 
     def capNameArticle(self, definite=False):
         out = self.getArticle(definite) + self.verbose_name
@@ -418,6 +422,7 @@ class Thing(PhysicalEntity):
                     self.game.nouns[synonym].append(self)
                 else:
                     self.game.nouns[synonym] = [self]
+            self.game.lexicon_generation += 1
             return True
 
     def describeThing(self, description):
@@ -106,9 +106,11 @@ class Openable(Thing):
 
     def makeOpen(self):
         self.is_open = True
+        self.game.event_bus.publish("opened", item=self)
 
     def makeClosed(self):
         self.is_open = False
+        self.game.event_bus.publish("closed", item=self)
 
 
 class Unremarkable(Thing):
@@ -512,6 +514,7 @@ class Lock(Thing):
 
     def makeUnlocked(self):
         self.is_locked = False
+        self.game.event_bus.publish("unlocked", item=self)
 
         if self.twin:
             if self.twin.is_locked:
@@ -519,6 +522,7 @@ class Lock(Thing):
 
     def makeLocked(self):
         self.is_locked = True
+        self.game.event_bus.publish("locked", item=self)
 
         if self.twin:
             if not self.twin.is_locked:
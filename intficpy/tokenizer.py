@@ -1,4 +1,4 @@
-import string
+from bisect import bisect_left
 
 from .vocab import english
 
@@ -6,6 +6,44 @@ from .vocab import english
 # TOKENIZER.PY - tokenizing and cleaning functions for IntFicPy
 ##############################################################
 
+# the same characters as string.punctuation, defined here because importing the
+# string module also imports re, which is slow to import
+PUNCTUATION = "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"
+
+# translation table for str.translate, deleting all punctuation
+CLEAN_TABLE = str.maketrans("", "", PUNCTUATION)
+
+EMPTY = frozenset()
+
+# the maximum number of author defined strings to keep tokenized
+TOKENIZED_CACHE_SIZE = 2048
+_tokenized_cache = {}
+
+
+class TokenizedString:
+    """
+    A cleaned and tokenized author defined string, such as a SpecialTopic key,
+    or a Sequence option
+
+    :param source: the original string
+    :param tokens: the cleaned tokens (tuple of str)
+    :param words: the tokens, with articles removed (tuple of str)
+    :param token_set: frozenset of tokens
+    :param word_set: frozenset of words
+    """
+
+    __slots__ = ("source", "tokens", "words", "token_set", "word_set")
+
+    def __init__(self, source):
+        self.source = source
+        self.tokens = tuple(tokenize(cleanInput(source, False)))
+        self.words = tuple(tok for tok in self.tokens if tok not in english.articles)
+        self.token_set = frozenset(self.tokens)
+        self.word_set = frozenset(self.words)
+
+    def __repr__(self):
+        return f"<TokenizedString {self.tokens}>"
+
 
 def cleanInput(input_string, record=True):
     """
@@ -13,9 +51,7 @@ def cleanInput(input_string, record=True):
     Takes the raw user input (string)
     Returns a string
     """
-    input_string = input_string.lower()
-    exclude = set(string.punctuation)
-    return "".join(ch for ch in input_string if ch not in exclude)
+    return input_string.lower().translate(CLEAN_TABLE)
 
 
 def tokenize(input_string):
@@ -26,8 +62,287 @@ def tokenize(input_string):
     return tokens
 
 
+# characters that end one command and start the next, as in "take lamp. n"
+COMMAND_SEPARATORS = ".;!?"
+# words that join two commands, as in "open door then e"
+COMMAND_JOINERS = ("then",)
+
+
+def splitCommands(input_string):
+    """
+    Split the player's input into separate commands, at sentence punctuation, and
+    at "then" wherever it has a command on either side of it
+    A full stop between two digits is not a separator
+    Takes the raw user input (string)
+    Returns a list of strings, one for each non-empty command
+    """
+    if not any(char in input_string for char in COMMAND_SEPARATORS) and not any(
+        joiner in input_string.lower() for joiner in COMMAND_JOINERS
+    ):
+        return [input_string] if input_string.strip() else []
+
+    sentences = []
+    start = 0
+    last = len(input_string) - 1
+    for i, char in enumerate(input_string):
+        if char not in COMMAND_SEPARATORS:
+            continue
+        if (
+            char == "."
+            and 0 < i < last
+            and input_string[i - 1].isdigit()
+            and input_string[i + 1].isdigit()
+        ):
+            continue
+        sentences.append(input_string[start:i])
+        start = i + 1
+    sentences.append(input_string[start:])
+
+    commands = []
+    for sentence in sentences:
+        words = sentence.split()
+        current = []
+        for word in words:
+            if word.lower().strip(PUNCTUATION) in COMMAND_JOINERS and current:
+                commands.append(" ".join(current))
+                current = []
+            else:
+                current.append(word)
+        if current:
+            commands.append(" ".join(current))
+        elif words and commands:
+            # a trailing "then" belongs to the command before it
+            commands[-1] += " " + words[-1]
+    return commands
+
+
 def removeArticles(tokens):
-    for article in english.articles:
-        while article in tokens:
-            tokens.remove(article)
+    tokens[:] = [tok for tok in tokens if tok not in english.articles]
     return tokens
+
+
+def tokenizeText(text):
+    """
+    Clean and tokenize an author defined string, reusing the result for every
+    later call with the same string
+    Player input should use cleanInput and tokenize instead, as it is rarely
+    repeated
+    Returns a TokenizedString
+    """
+    text = str(text)
+    try:
+        return _tokenized_cache[text]
+    except KeyError:
+        pass
+    if len(_tokenized_cache) >= TOKENIZED_CACHE_SIZE:
+        _tokenized_cache.clear()
+    tokenized = _tokenized_cache[text] = TokenizedString(text)
+    return tokenized
+
+
+def phraseMatches(phrase, tokens):
+    """
+    Check whether every one of the player's tokens appears in an author defined
+    phrase, ignoring articles in the phrase
+    "i" and "you" are accepted in place of each other, so the player can respond to
+    "ask if you can help" with "can i help"
+    """
+    words = tokenizeText(phrase).word_set
+    for tok in tokens:
+        if tok in words:
+            continue
+        alternate = PhraseIndex.INTERCHANGEABLE.get(tok)
+        if alternate and alternate in words:
+            continue
+        return False
+    return True
+
+
+class PhraseIndex:
+    """
+    An inverted index from token to author defined phrase, used to match player
+    input against conversation suggestions and Sequence menu options without
+    re-tokenizing every phrase
+
+    A phrase matches the player's tokens under the same rules as phraseMatches.
+    Phrases may be added more than once, and stay in the index until they have been
+    removed as many times as they were added.
+
+    rank can also match tokens by prefix ("lig" for "lighthouse"), and tolerate
+    typos up to a maximum edit distance, returning candidates best match first.
+
+    :param source: optional, the object the index was built from, so the owner of
+        the index can tell if it is out of date
+    :param remove_articles: if False, articles in the phrase must be matched too
+    :type remove_articles: bool
+    :param interchangeable: tokens the player may use in place of each other
+    :type interchangeable: dict
+    """
+
+    # tokens the player may use in place of each other
+    INTERCHANGEABLE = {"i": "you", "you": "i"}
+    # the shortest token to match with typos
+    MIN_FUZZY_LENGTH = 3
+
+    def __init__(self, source=None, remove_articles=True, interchangeable=None):
+        self.source = source
+        self.remove_articles = remove_articles
+        if interchangeable is None:
+            interchangeable = self.INTERCHANGEABLE
+        self.interchangeable = interchangeable
+        self.phrases = {}
+        self.by_token = {}
+        self._sorted_tokens = None
+
+    def __contains__(self, phrase):
+        return phrase in self.phrases
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def _phrase_tokens(self, phrase):
+        tokenized = tokenizeText(phrase)
+        if self.remove_articles:
+            return tokenized.word_set
+        return tokenized.token_set
+
+    def add(self, phrase):
+        if phrase in self.phrases:
+            self.phrases[phrase] += 1
+            return
+        self.phrases[phrase] = 1
+        for word in self._phrase_tokens(phrase):
+            if word in self.by_token:
+                self.by_token[word].add(phrase)
+            else:
+                self.by_token[word] = {phrase}
+                self._sorted_tokens = None
+
+    def remove(self, phrase):
+        if phrase not in self.phrases:
+            return
+        self.phrases[phrase] -= 1
+        if self.phrases[phrase]:
+            return
+        del self.phrases[phrase]
+        for word in self._phrase_tokens(phrase):
+            self.by_token[word].discard(phrase)
+            if not self.by_token[word]:
+                del self.by_token[word]
+                self._sorted_tokens = None
+
+    def match(self, tokens):
+        """
+        Find the phrases that contain all of the given tokens
+        Returns a set of phrases
+        """
+        matches = None
+        for tok in set(tokens):
+            found = self.by_token.get(tok, EMPTY)
+            if tok in self.interchangeable:
+                found = found | self.by_token.get(self.interchangeable[tok], EMPTY)
+            if matches is None:
+                matches = set(found)
+            else:
+                matches &= found
+            if not matches:
+                break
+        if matches is None:
+            return set(self.phrases)
+        return matches
+
+    def rank(self, tokens, prefixes=False, max_typos=0):
+        """
+        Find the phrases that contain a match for all of the given tokens, allowing
+        for incomplete words and typos
+        Each token costs nothing for an exact match, 1 for a prefix match, and the
+        number of edits for a match with typos.
+        Returns a list of (phrase, cost) pairs, ordered from lowest cost, and then by
+        the order the phrases were added
+
+        :param tokens: the player's tokens
+        :type tokens: list of str
+        :param prefixes: whether to accept a token as the start of a longer word
+        :type prefixes: bool
+        :param max_typos: the maximum number of edits (insertions, deletions or
+            substitutions) to accept between a token and a word
+        :type max_typos: int
+        """
+        costs = None
+        for tok in set(tokens):
+            found = {}
+            for word, cost in self._expand(tok, prefixes, max_typos):
+                for phrase in self.by_token[word]:
+                    if phrase not in found or cost < found[phrase]:
+                        found[phrase] = cost
+            if costs is None:
+                costs = found
+            else:
+                costs = {
+                    phrase: cost + found[phrase]
+                    for phrase, cost in costs.items()
+                    if phrase in found
+                }
+            if not costs:
+                return []
+        if costs is None:
+            costs = dict.fromkeys(self.phrases, 0)
+        order = {phrase: i for i, phrase in enumerate(self.phrases)}
+        return sorted(costs.items(), key=lambda item: (item[1], order[item[0]]))
+
+    def _expand(self, tok, prefixes, max_typos):
+        """
+        Find the indexed words a token can match
+        Yields pairs of (word, cost)
+        """
+        if tok in self.by_token:
+            yield tok, 0
+        if tok in self.interchangeable and self.interchangeable[tok] in self.by_token:
+            yield self.interchangeable[tok], 0
+        if prefixes:
+            if self._sorted_tokens is None:
+                self._sorted_tokens = sorted(self.by_token)
+            i = bisect_left(self._sorted_tokens, tok)
+            while i < len(self._sorted_tokens) and self._sorted_tokens[i].startswith(
+                tok
+            ):
+                if self._sorted_tokens[i] != tok:
+                    yield self._sorted_tokens[i], 1
+                i += 1
+        if max_typos and len(tok) >= self.MIN_FUZZY_LENGTH:
+            for word in self.by_token:
+                if word == tok or abs(len(word) - len(tok)) > max_typos:
+                    continue
+                distance = editDistance(tok, word, max_typos)
+                if distance is not None:
+                    yield word, distance
+
+
+def editDistance(a, b, limit):
+    """
+    Find the Levenshtein distance between two strings, giving up as soon as it must
+    be greater than limit
+    Only the band of the table within limit of the diagonal is computed
+    Returns the distance, or None if it is greater than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    too_far = limit + 1
+    previous = [i if i <= limit else too_far for i in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        start = max(1, i - limit)
+        end = min(len(b), i + limit)
+        for j in range(start, end + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost, too_far
+            )
+        if min(current[start - 1 : end + 1]) > limit:
+            return None
+        previous = current
+    if previous[len(b)] > limit:
+        return None
+    return previous[len(b)]
@@ -1,50 +1,32 @@
 # TOOLS.PY
 # A collection of miscellaneous functions to simplify common tasks in IntFicPy
 
-from .thing_base import Thing
-from .actor import Actor
-from .travel import travel, room
-import intficpy.score as score
+import re
+
+from .ifp_object import IFPObject
+
+# a `key` keyword argument, as in Thing(game, "lamp", key="lamp")
+KEY_ARGUMENT = re.compile(r"\bkey\s*=")
 
 
 def isSerializableClassInstance(obj):
+    """Checks if an object is an IFPObject that the loader can recreate from its type
+    tag """
     return (
-        isinstance(obj, Thing)
-        or isinstance(obj, Actor)
-        or isinstance(obj, score.Achievement)
-        or isinstance(obj, score.Ending)
-        or isinstance(obj, thing.Abstract)
-        or isinstance(obj, actor.Topic)
-        or isinstance(obj, travel.TravelConnector)
-        or isinstance(obj, room.Room)
-        or isinstance(obj, actor.SpecialTopic)
-        or isinstance(obj, actor.SaleItem)
-        or isinstance(obj, score.HintNode)
-        or isinstance(obj, room.RoomGroup)
-        or isinstance(obj, score.Hint)
+        isinstance(obj, IFPObject)
+        and IFPObject.registry.get(obj.__class__.type_tag) is obj.__class__
     )
 
 
 def isIFPClassInstance(obj):
-    return (
-        isinstance(obj, Thing)
-        or isinstance(obj, Actor)
-        or isinstance(obj, score.Achievement)
-        or isinstance(obj, score.Ending)
-        or isinstance(obj, thing.Abstract)
-        or isinstance(obj, actor.Topic)
-        or isinstance(obj, travel.TravelConnector)
-        or isinstance(obj, room.Room)
-        or isinstance(obj, actor.SpecialTopic)
-        or isinstance(obj, actor.SaleItem)
-        or isinstance(obj, score.HintNode)
-        or isinstance(obj, room.RoomGroup)
-        or isinstance(obj, score.Hint)
-    )
+    return isinstance(obj, IFPObject)
 
 
 def lineDefinesNewIx(line):
-    """Checks if a line of code in the game file defines an IFP object with a new index """
+    """Checks if a line of code in the game file defines an IFP object with a new index
+    Objects created with an explicit key do not take a new index """
+    if KEY_ARGUMENT.search(line):
+        return False
     return (
         " Thing(" in line
         or " Surface(" in line
@@ -2,7 +2,6 @@ from .exceptions import IFPError
 from .ifp_object import IFPObject
 from .thing_base import Thing
 from .things import Door, Lock, AbstractClimbable, Surface
-from .verb import OpenVerb, StandUpVerb
 from .room import Room
 
 ##############################################################
@@ -131,6 +130,7 @@ class TravelConnector(IFPObject):
                 else:
                     self.game.nouns[noun] = [self.interactables[x]]
             x = x + 1
+        self.game.lexicon_generation += 1
 
     def _prepareToCross(self, entrance):
         return True
@@ -216,6 +216,8 @@ class DoorConnector(TravelConnector):
     entrance_name = "door"
 
     def _prepareToCross(self, entrance):
+        from .verb import OpenVerb
+
         if not entrance.is_open:
             opened = OpenVerb().verbFunc(self.game, entrance)
             if not opened:
@@ -354,6 +356,8 @@ def travelDirection(game, direction):
 
     loc = game.me.getOutermostLocation()
     if game.me.position != "standing":
+        from .verb import StandUpVerb
+
         StandUpVerb().verbFunc(game)
     if not loc.resolveDarkness(game) and (short not in loc.dark_visible_exits):
         game.addTextToEvent("turn", loc.dark_msg)
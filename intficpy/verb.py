@@ -19,7 +19,7 @@ from .things import (
     Pressable,
 )
 from .room import Room
-from .serializer import SaveGame, LoadGame
+from .verb_registry import VerbRegistry
 
 ##############################################################
 # VERB.PY - verbs for IntFicPy
@@ -27,6 +27,8 @@ from .serializer import SaveGame, LoadGame
 ##############################################################
 # TODO: sort out circular imports for travel.travel, parser.parser
 # currently importing from travel inside functions as a workaround
+# serializer is also imported inside the save/load verbs, so that importing the
+# verbs does not pull in pickle for games that never save
 # move the most common implicit verbs into their own module?
 
 
@@ -3129,7 +3131,11 @@ class RecordOnVerb(Verb):
     preposition = ["on"]
 
     def verbFunc(self, game):
-        f = game.app.saveFilePrompt(".txt", "Text files", "Enter a file to record to")
+        return game.requestFile(
+            "save", ".txt", "Text files", "Enter a file to record to", self.recordTo
+        )
+
+    def recordTo(self, game, f):
         success = game.recordOn(f)
         if success:
             game.addTextToEvent("turn", "**RECORDING ON**")
@@ -3159,9 +3165,15 @@ class PlayBackVerb(Verb):
     syntax = [["playback"]]
 
     def verbFunc(self, game):
-        f = game.app.openFilePrompt(
-            ".txt", "Text files", "Enter a filename for the new recording"
+        return game.requestFile(
+            "open",
+            ".txt",
+            "Text files",
+            "Enter a filename for the new recording",
+            self.playBack,
         )
+
+    def playBack(self, game, f):
         if not f:
             game.addTextToEvent("turn", "No file selected. ")
             return False
@@ -3234,7 +3246,12 @@ class SaveVerb(Verb):
     allow_in_sequence = True
 
     def verbFunc(self, game):
-        f = game.app.saveFilePrompt(".sav", "Save files", "Enter a file to save to")
+        return game.requestFile(
+            "save", ".sav", "Save files", "Enter a file to save to", self.saveTo
+        )
+
+    def saveTo(self, game, f):
+        from .serializer import SaveGame
 
         if f:
             SaveGame(game, f)
@@ -3252,7 +3269,13 @@ class LoadVerb(Verb):
     allow_in_sequence = True
 
     def verbFunc(self, game):
-        f = game.app.openFilePrompt(".sav", "Save files", "Enter a file to load")
+        return game.requestFile(
+            "open", ".sav", "Save files", "Enter a file to load", self.loadFrom
+        )
+
+    def loadFrom(self, game, f):
+        from .serializer import LoadGame
+        from .exceptions import DeserializationError, IFPError
 
         if not f:
             game.addTextToEvent("turn", "Choose a valid save file to load a game.")
@@ -3263,12 +3286,19 @@ class LoadVerb(Verb):
         except FileNotFoundError:
             game.addTextToEvent("turn", f"File {f} does not exist.")
             return False
+        except (DeserializationError, IFPError):
+            game.addTextToEvent("turn", "Cannot load game file.")
+            return False
 
         if not l.is_valid():
             game.addTextToEvent("turn", "Cannot load game file.")
             return False
 
-        l.load()
+        try:
+            l.load()
+        except DeserializationError:
+            game.addTextToEvent("turn", "Cannot load game file.")
+            return False
         game.addTextToEvent("turn", "Game loaded.")
         return True
 
@@ -3730,6 +3760,9 @@ class FillFromVerb(IndirectObjectVerb):
 
 
 def get_base_verbset():
+    """
+    Create a VerbRegistry of the base verbs, for a new game
+    """
     verbs = [
         v
         for v in (
@@ -3739,12 +3772,4 @@ def get_base_verbset():
         )
         if v.word
     ]
-
-    verb_map = {}
-    for v in verbs:
-        for key in [v.word, *v.synonyms]:
-            if key in verb_map:
-                verb_map[key].append(v)
-            else:
-                verb_map[key] = [v]
-    return verb_map
+    return VerbRegistry(verbs)
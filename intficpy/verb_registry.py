@@ -0,0 +1,159 @@
+from collections.abc import Mapping
+
+##############################################################
+# VERB_REGISTRY.PY - the verb lookup table for IntFicPy
+# Defines the VerbRegistry class
+##############################################################
+
+EMPTY = frozenset()
+
+
+class VerbRegistry(Mapping):
+    """
+    The game's verbs, looked up by word
+
+    A VerbRegistry behaves as a read only dictionary of words (the verb's word, and
+    its synonyms) to lists of verb classes, in the order they were registered.
+    Use register and unregister to change the verbs available in the game.
+
+    The registry also keeps secondary indexes of verbs by preposition, keyword,
+    the words used in the verb's syntax, arity (whether the verb takes a direct
+    and/or indirect object), and scope, so the parser can narrow down its candidate
+    verbs with set operations. The sets returned by the index lookups belong to the
+    registry, and must not be modified.
+    """
+
+    def __init__(self, verbs=()):
+        self._by_word = {}
+        self._registered = {}
+        self._by_preposition = {}
+        self._by_keyword = {}
+        self._by_syntax_word = {}
+        self._by_arity = {}
+        self._by_scope = {}
+        # incremented every time the set of verbs changes
+        self.generation = 0
+        for verb in verbs:
+            self.register(verb)
+
+    def __getitem__(self, word):
+        return self._by_word[word]
+
+    def __contains__(self, word):
+        return word in self._by_word
+
+    def __iter__(self):
+        return iter(self._by_word)
+
+    def __len__(self):
+        return len(self._by_word)
+
+    def __repr__(self):
+        return f"<VerbRegistry: {len(self._registered)} verbs>"
+
+    @property
+    def verbs(self):
+        """
+        All registered verb classes, in the order they were registered
+        """
+        return list(self._registered)
+
+    def register(self, verb):
+        """
+        Add a verb to the game, under its word and each of its synonyms
+
+        :param verb: the verb to add
+        :type verb: Verb subclass
+        """
+        words = [verb.word, *verb.synonyms]
+        for key in words:
+            if key in self._by_word:
+                self._by_word[key].append(verb)
+            else:
+                self._by_word[key] = [verb]
+
+        if verb in self._registered:
+            self._registered[verb][0].extend(words)
+        else:
+            # record the index keys, so the verb can be unregistered even if its
+            # attributes change
+            index_keys = list(self._index_keys(verb))
+            self._registered[verb] = (words, index_keys)
+            for key, index in index_keys:
+                index.setdefault(key, set()).add(verb)
+        self.generation += 1
+
+    def unregister(self, verb):
+        """
+        Remove a verb from the game entirely
+
+        :param verb: the verb to remove
+        :type verb: Verb subclass
+        """
+        if verb not in self._registered:
+            return
+        words, index_keys = self._registered.pop(verb)
+        for key in words:
+            verbs = self._by_word.get(key)
+            if not verbs:
+                continue
+            verbs[:] = [v for v in verbs if v is not verb]
+            if not verbs:
+                del self._by_word[key]
+        for key, index in index_keys:
+            index[key].discard(verb)
+            if not index[key]:
+                del index[key]
+        self.generation += 1
+
+    def with_preposition(self, preposition):
+        """
+        The set of verbs that declare the given preposition
+        """
+        return self._by_preposition.get(preposition, EMPTY)
+
+    def with_keyword(self, keyword):
+        """
+        The set of verbs that declare the given keyword
+        """
+        return self._by_keyword.get(keyword, EMPTY)
+
+    def with_syntax_word(self, word):
+        """
+        The set of verbs with the given word in at least one of their syntax forms
+        Look up "<dobj>" or "<iobj>" to find verbs whose syntax includes an object
+        """
+        return self._by_syntax_word.get(word, EMPTY)
+
+    def with_arity(self, has_dobj, has_iobj):
+        """
+        The set of verbs that do, or do not, take direct and indirect objects
+        """
+        return self._by_arity.get((bool(has_dobj), bool(has_iobj)), EMPTY)
+
+    def with_scope(self, scope):
+        """
+        The set of verbs with a direct or indirect object of the given scope
+        ("room", "near", "knows", "inv", "wearing", "text", "direction"...)
+        """
+        return self._by_scope.get(scope, EMPTY)
+
+    def _index_keys(self, verb):
+        """
+        Yield pairs of (key, index) for every secondary index the verb belongs in
+        """
+        for preposition in verb.preposition:
+            yield preposition, self._by_preposition
+        for keyword in verb.keywords:
+            yield keyword, self._by_keyword
+        for word in {word for form in verb.syntax for word in form}:
+            if word:
+                yield word, self._by_syntax_word
+        yield (bool(verb.hasDobj), bool(verb.hasIobj)), self._by_arity
+        scopes = set()
+        if verb.hasDobj:
+            scopes.add(verb.dscope)
+        if verb.hasIobj:
+            scopes.add(verb.iscope)
+        for scope in scopes:
+            yield scope, self._by_scope
@@ -0,0 +1,63 @@
+# script to measure the cost of importing IntFicPy
+# each import is timed in a fresh interpreter, using python's -X importtime option
+# usage: python scripts/import_benchmark.py [module] [runs]
+# module defaults to intficpy.ifp_game, which pulls in the parser and all base verbs
+
+import os
+import statistics
+import subprocess
+import sys
+
+module = sys.argv[1] if len(sys.argv) > 1 else "intficpy.ifp_game"
+runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+env = dict(os.environ)
+env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+# allow bytecode caching, so we measure imports the way players experience them
+env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+
+def time_import():
+    """
+    Import the module in a new interpreter
+    Returns a dictionary of module name to (self, cumulative) import time in us
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+# the first run writes the bytecode cache
+time_import()
+
+samples = [time_import() for i in range(runs)]
+
+totals = [sample[module][1] for sample in samples]
+print(f"import {module}: {runs} runs")
+print(f"  median {statistics.median(totals) / 1000:.1f} ms")
+print(f"  min    {min(totals) / 1000:.1f} ms")
+print(f"  max    {max(totals) / 1000:.1f} ms")
+
+print("\nslowest intficpy modules (median self time):")
+names = [name for name in samples[0] if name.startswith("intficpy")]
+self_times = {
+    name: statistics.median(sample[name][0] for sample in samples if name in sample)
+    for name in names
+}
+for name in sorted(self_times, key=self_times.get, reverse=True)[:10]:
+    print(f"  {self_times[name] / 1000:6.1f} ms  {name}")
+
+stdlib = sorted(name for name in samples[0] if not name.startswith("intficpy"))
+print(f"\n{len(names)} intficpy modules, {len(stdlib)} other modules imported")
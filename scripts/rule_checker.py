@@ -2,6 +2,7 @@
 # because IFP saving/loading uses a dictionary of indeces generated at runtime, order must be preserved in object definitions
 # this script checks for IFP objects defined, or copied with a unique index, in loops, methods, or functions
 
+import re
 import sys
 
 cur_indent = 0
@@ -39,6 +40,9 @@ for line in file:
             stack.append("x")
     cur_indent = next_indent
     last_line = line.split()
+    if re.search(r"\bkey\s*=", line):
+        # objects created with an explicit key can be created anywhere
+        continue
     if "con" in stack or "def" in stack:
         if (
             " Thing(" in line
@@ -1,5 +1,7 @@
 from unittest import TestCase
+import os
 import random
+import uuid
 
 from intficpy.actor import Player
 from intficpy.room import Room
@@ -15,6 +17,14 @@ class TestApp:
             self.print_stack.append(t)
 
 
+TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def _remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
 class IFPTestCase(TestCase):
     def setUp(self):
         self.app = TestApp()
@@ -25,6 +35,16 @@ class IFPTestCase(TestCase):
         self.game.setPlayer(self.me)
         self.game.initGame()
 
+    def make_save_path(self, extension=".sav"):
+        """
+        Get a unique path in the tests directory for a file written by the test
+        The file is removed when the test ends, even if setUp fails.
+        """
+        filename = f"_ifp_tests_saveload__{uuid.uuid4()}{extension}"
+        path = os.path.join(TESTS_DIR, filename)
+        self.addCleanup(_remove_file, path)
+        return path
+
     def _insert_dobj_into_phrase(self, phrase, dobj):
         ix = phrase.index("<dobj>")
         phrase = phrase[:ix] + dobj + phrase[ix + 1 :]
@@ -0,0 +1,149 @@
+import os
+import time
+import uuid
+import warnings
+
+from intficpy.daemons import Daemon
+from intficpy.exceptions import DaemonBudgetWarning
+from intficpy.score import Achievement
+from intficpy.serializer import SaveGame, LoadGame
+
+from .helpers import IFPTestCase
+
+
+class TestDaemonScheduling(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.runs = []
+        self.daemon = Daemon(self.game, self._daemon_func)
+
+    def _daemon_func(self, game):
+        self.runs.append(game.daemons.turn)
+
+    def test_daemon_runs_every_turn_while_active(self):
+        self.game.daemons.add(self.daemon)
+        self.game.turnMain("l")
+        self.game.turnMain("l")
+        self.assertEqual(len(self.runs), 2)
+
+    def test_wake_in_runs_once_after_given_turns(self):
+        self.daemon.wakeIn(2)
+        self.game.turnMain("l")
+        self.game.turnMain("l")
+        self.assertEqual(self.runs, [])
+        self.game.turnMain("l")
+        self.assertEqual(len(self.runs), 1)
+        self.game.turnMain("l")
+        self.assertEqual(len(self.runs), 1)
+
+    def test_daemon_can_reschedule_itself(self):
+        def every_other_turn(game):
+            self.runs.append(game.daemons.turn)
+            daemon.wakeIn(2)
+
+        daemon = Daemon(self.game, every_other_turn)
+        daemon.wakeIn(0)
+        for i in range(5):
+            self.game.turnMain("l")
+        self.assertEqual(self.runs, [2, 4, 6])
+
+    def test_wake_on_event(self):
+        achievement = Achievement(self.game, 2, "getting here")
+        self.daemon.wakeOn("achievement")
+        self.game.turnMain("l")
+        self.assertEqual(self.runs, [])
+
+        achievement.award(self.game)
+        self.game.turnMain("l")
+        self.assertEqual(len(self.runs), 1)
+        self.assertFalse(self.game.daemons.isScheduled(self.daemon))
+
+    def test_remove_cancels_scheduled_runs(self):
+        self.daemon.wakeIn(1)
+        self.daemon.wakeOn("achievement")
+        self.game.daemons.remove(self.daemon)
+        self.assertFalse(self.game.daemons.isScheduled(self.daemon))
+
+    def test_save_and_load_scheduled_daemon(self):
+        path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            f"_ifp_tests_daemons__{uuid.uuid4()}.sav",
+        )
+        self.daemon.wakeIn(1)
+        SaveGame(self.game, path)
+        self.game.daemons.cancel(self.daemon)
+
+        l = LoadGame(self.game, path)
+        self.assertTrue(l.is_valid())
+        l.load()
+        os.remove(path)
+
+        self.game.turnMain("l")
+        self.game.turnMain("l")
+        self.assertEqual(len(self.runs), 1)
+
+
+class TestDaemonExecution(IFPTestCase):
+    def test_daemons_run_in_priority_order(self):
+        order = []
+        late = Daemon(self.game, lambda game: order.append("late"), priority=10)
+        early = Daemon(self.game, lambda game: order.append("early"), priority=-1)
+        self.game.daemons.add(late)
+        self.game.daemons.add(early)
+        self.game.turnMain("l")
+        self.assertEqual(order, ["early", "late"])
+
+    def test_slow_daemon_warns_and_is_timed(self):
+        daemon = Daemon(self.game, lambda game: time.sleep(0.002), time_budget=0.001)
+        self.game.daemons.add(daemon)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.game.turnMain("l")
+        self.assertTrue(
+            any(issubclass(w.category, DaemonBudgetWarning) for w in caught)
+        )
+        ix, runs, total, longest = self.game.daemons.timer.report()[0]
+        self.assertEqual(ix, daemon.ix)
+        self.assertEqual(runs, 1)
+        self.assertGreaterEqual(longest, 0.002)
+
+    def test_pure_daemons_effects_applied_from_threads(self):
+        self.game.daemons.use_threads = True
+        self.game.score.total = 0
+
+        def add_points(game):
+            game.score.total += 3
+
+        text_daemon = Daemon(self.game, lambda game: "The wind howls.", pure=True)
+        effect_daemon = Daemon(self.game, lambda game: [add_points], pure=True)
+        self.game.daemons.add(text_daemon)
+        self.game.daemons.add(effect_daemon)
+
+        self.game.turnMain("l")
+        self.game.daemons.shutdown()
+
+        self.assertIn("The wind howls.", self.app.print_stack)
+        self.assertEqual(self.game.score.total, 3)
+
+    def test_pure_daemons_see_game_before_other_daemons_run(self):
+        self.game.daemons.use_threads = True
+        self.game.counter = 0
+        order = []
+
+        def bump(game):
+            game.counter += 1
+            order.append("bump")
+
+        def read_counter(game):
+            seen = game.counter
+            return lambda game: order.append(f"pure saw {seen}")
+
+        self.game.daemons.add(Daemon(self.game, bump, priority=0))
+        self.game.daemons.add(Daemon(self.game, read_counter, priority=1, pure=True))
+        self.game.daemons.add(Daemon(self.game, bump, priority=2))
+        self.game.daemons.add(Daemon(self.game, read_counter, priority=3, pure=True))
+
+        self.game.turnMain("l")
+        self.game.daemons.shutdown()
+
+        self.assertEqual(order, ["bump", "pure saw 0", "bump", "pure saw 0"])
@@ -0,0 +1,167 @@
+import os
+import uuid
+
+from intficpy.daemons import Daemon
+from intficpy.room import Room
+from intficpy.score import Achievement
+from intficpy.serializer import SaveGame, LoadGame
+from intficpy.things import Container, Lock
+from intficpy.thing_base import Thing
+
+from .helpers import IFPTestCase
+
+
+class TestEventBus(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.received = []
+
+    def _record(self, game, **data):
+        self.received.append(data)
+
+    def test_synchronous_subscriber_called_on_publish(self):
+        self.game.event_bus.subscribe("custom", self._record)
+        self.game.event_bus.publish("custom", value=1)
+        self.assertEqual(self.received, [{"value": 1}])
+
+    def test_deferred_subscriber_called_on_flush(self):
+        self.game.event_bus.subscribe("custom", self._record, deferred=True)
+        self.game.event_bus.publish("custom", value=1)
+        self.game.event_bus.publish("custom", value=2)
+        self.assertEqual(self.received, [])
+
+        self.game.event_bus.flush()
+        self.assertEqual(self.received, [{"value": 1}, {"value": 2}])
+        self.game.event_bus.flush()
+        self.assertEqual(len(self.received), 2)
+
+    def test_unsubscribe(self):
+        self.game.event_bus.subscribe("custom", self._record)
+        self.game.event_bus.unsubscribe("custom", self._record)
+        self.game.event_bus.publish("custom", value=1)
+        self.assertEqual(self.received, [])
+        self.assertNotIn("custom", self.game.event_bus.subscribers)
+
+    def test_nothing_published_while_paused(self):
+        self.game.event_bus.subscribe("custom", self._record)
+        with self.game.event_bus.pause():
+            self.assertTrue(self.game.event_bus.paused)
+            self.game.event_bus.publish("custom", value=1)
+        self.assertFalse(self.game.event_bus.paused)
+        self.assertEqual(self.received, [])
+
+    def test_publish_wakes_waiting_daemon(self):
+        runs = []
+        daemon = Daemon(self.game, lambda game: runs.append(game.daemons.turn))
+        daemon.wakeOn("custom")
+        self.game.event_bus.publish("custom")
+        self.game.turnMain("l")
+        self.assertEqual(len(runs), 1)
+
+
+class TestWorldEvents(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.received = []
+
+    def _subscribe(self, event, deferred=False):
+        def record(game, **data):
+            self.received.append((event, data))
+
+        self.game.event_bus.subscribe(event, record, deferred=deferred)
+
+    def test_taking_item_publishes_contains_events(self):
+        item = Thing(self.game, "bead")
+        self.start_room.addThing(item)
+        self._subscribe("contains_added")
+        self._subscribe("contains_removed")
+
+        self.game.turnMain("take bead")
+
+        self.assertIn(
+            ("contains_removed", {"container": self.start_room, "item": item}),
+            self.received,
+        )
+        self.assertIn(
+            ("contains_added", {"container": self.me, "item": item}), self.received
+        )
+
+    def test_open_and_close_publish_events(self):
+        box = Container(self.game, "box")
+        box.has_lid = True
+        box.is_open = False
+        self.start_room.addThing(box)
+        self._subscribe("opened")
+        self._subscribe("closed")
+
+        self.game.turnMain("open box")
+        self.game.turnMain("close box")
+
+        self.assertEqual(
+            self.received, [("opened", {"item": box}), ("closed", {"item": box})]
+        )
+
+    def test_lock_and_unlock_publish_events(self):
+        lock = Lock(self.game, True, None)
+        self._subscribe("locked")
+        self._subscribe("unlocked")
+
+        lock.makeUnlocked()
+        lock.makeLocked()
+
+        self.assertEqual(
+            self.received, [("unlocked", {"item": lock}), ("locked", {"item": lock})]
+        )
+
+    def test_discovering_room_publishes_event_once(self):
+        room = Room(self.game, "cellar", "A cellar. ")
+        self.start_room.down = room
+        self._subscribe("discovered")
+
+        self.game.turnMain("d")
+        self.game.turnMain("u")
+        self.game.turnMain("d")
+
+        self.assertEqual(self.received, [("discovered", {"room": room})])
+
+    def test_achievement_publishes_deferred_event_before_daemons(self):
+        achievement = Achievement(self.game, 2, "getting here")
+        order = []
+        self.game.event_bus.subscribe(
+            "achievement", lambda game, **data: order.append("event"), deferred=True
+        )
+        self.game.daemons.add(Daemon(self.game, lambda game: order.append("daemon")))
+
+        achievement.award(self.game)
+        self.assertEqual(order, [])
+        self.game.turnMain("l")
+
+        self.assertEqual(order, ["event", "daemon"])
+
+
+class TestEventsOnLoad(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        path = os.path.dirname(os.path.realpath(__file__))
+        self.path = os.path.join(path, f"_ifp_tests_saveload__{uuid.uuid4()}.sav")
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self.path)
+
+    def test_loading_game_does_not_publish_events(self):
+        item = Thing(self.game, "bead")
+        self.start_room.addThing(item)
+        SaveGame(self.game, self.path)
+        self.me.addThing(item)
+
+        received = []
+        self.game.event_bus.subscribe(
+            "contains_added", lambda game, **data: received.append(data)
+        )
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        self.assertIn(item.ix, self.start_room.contains)
+        self.assertEqual(received, [])
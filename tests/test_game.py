@@ -1,5 +1,16 @@
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+
 from .helpers import IFPTestCase
 
+from intficpy.actor import Player
+from intficpy.daemons import Daemon
+from intficpy.ifp_game import IFPGame
+from intficpy.room import Room
+from intficpy.thing_base import Thing
+
 
 class TestAddText(IFPTestCase):
     def test_add_text_with_no_turn_raises(self):
@@ -15,3 +26,152 @@ class TestAddText(IFPTestCase):
         self.game.turnMain("l")
 
         self.assertIn(text, self.app.print_stack)
+
+
+class TestMultipleCommands(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lamp = Thing(self.game, "lamp")
+        self.start_room.addThing(self.lamp)
+        self.north_room = Room(self.game, "Hall", "A hall. ")
+        self.start_room.north = self.north_room
+        self.north_room.south = self.start_room
+        self.daemon_runs = 0
+        self.game.daemons.add(Daemon(self.game, self._count_daemon_runs))
+
+    def _count_daemon_runs(self, game):
+        self.daemon_runs += 1
+
+    def test_each_command_is_run_as_a_turn(self):
+        self.app.print_stack = []
+        printed = []
+        self.app.printEventText = lambda event: printed.append(event.text)
+
+        self.game.turnMain("take lamp. n then s")
+
+        self.assertIs(self.lamp.location, self.me)
+        self.assertIs(self.me.location, self.start_room)
+        self.assertEqual(self.daemon_runs, 3)
+        self.assertEqual(self.game.turn_list[-3:], ["take lamp", "n", "s"])
+        commands = [text for text in printed if text in (["take lamp"], ["n"], ["s"])]
+        self.assertEqual(commands, [["take lamp"], ["n"], ["s"]])
+
+    def test_output_printed_once_at_end(self):
+        printed = []
+        self.app.printEventText = lambda event: printed.append(self.game.daemons.turn)
+
+        self.game.turnMain("take lamp. n")
+
+        self.assertTrue(printed)
+        self.assertEqual(set(printed), {self.game.daemons.turn})
+
+    def test_failed_command_stops_remaining_commands(self):
+        self.game.turnMain("frobnicate. n")
+
+        self.assertIs(self.me.location, self.start_room)
+        self.assertEqual(self.daemon_runs, 1)
+
+    def test_split_commands_can_be_turned_off(self):
+        self.game.split_commands = False
+        self.game.turnMain("take lamp. n")
+
+        self.assertIs(self.me.location, self.start_room)
+
+
+class AsyncApp:
+    def __init__(self, save_path=None):
+        self.print_stack = []
+        self.save_path = save_path
+        self.prompts = []
+
+    async def printEventText(self, event):
+        await asyncio.sleep(0)
+        self.print_stack.extend(event.text)
+
+    async def saveFilePrompt(self, extension, filetype_desc, msg):
+        await asyncio.sleep(0)
+        self.prompts.append(msg)
+        return self.save_path
+
+    async def openFilePrompt(self, extension, filetype_desc, msg):
+        await asyncio.sleep(0)
+        self.prompts.append(msg)
+        return self.save_path
+
+
+def _build_game(app):
+    game = IFPGame(app, main=__name__)
+    me = Player(game)
+    room = Room(game, "room", "desc")
+    room.addThing(me)
+    game.setPlayer(me)
+    return game
+
+
+class TestAsyncGame(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "async.sav")
+        self.app = AsyncApp(self.path)
+        self.game = _build_game(self.app)
+        asyncio.run(self.game.initGameAsync())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_turn_text_awaited(self):
+        self.app.print_stack = []
+        asyncio.run(self.game.turnMainAsync("l"))
+        self.assertIn("desc", "".join(self.app.print_stack))
+        self.assertEqual(self.game.pending_output, [])
+
+    def test_save_prompt_awaited(self):
+        asyncio.run(self.game.turnMainAsync("save"))
+
+        self.assertEqual(self.app.prompts, ["Enter a file to save to"])
+        self.assertTrue(os.path.exists(self.path))
+        self.assertIn("Game saved.", self.app.print_stack)
+
+    def test_prompt_answered_before_next_command(self):
+        lamp = Thing(self.game, "lamp")
+        self.game.me.location.addThing(lamp)
+        asyncio.run(self.game.turnMainAsync("save. take lamp"))
+        self.assertIn(lamp.ix, self.game.me.contains)
+
+        # the save was written before the lamp was taken
+        asyncio.run(self.game.turnMainAsync("load"))
+
+        self.assertIn("Game loaded.", self.app.print_stack)
+        self.assertNotIn(lamp.ix, self.game.me.contains)
+
+    def test_games_share_one_event_loop(self):
+        apps = [AsyncApp() for i in range(3)]
+        games = [_build_game(app) for app in apps]
+
+        async def play(game):
+            await game.initGameAsync()
+            await game.turnMainAsync("l")
+            await game.turnMainAsync("jump")
+
+        async def play_all():
+            await asyncio.gather(*[play(game) for game in games])
+
+        asyncio.run(play_all())
+        for app in apps:
+            self.assertIn("desc", "".join(app.print_stack))
+
+
+class TestSyncFilePrompt(IFPTestCase):
+    def test_sync_prompt_answered_immediately(self):
+        answers = []
+        self.app.saveFilePrompt = lambda extension, filetype_desc, msg: None
+        self.game.requestFile(
+            "save", ".sav", "Save files", "Save", lambda game, f: answers.append(f)
+        )
+        self.assertEqual(answers, [None])
+        self.assertEqual(self.game.pending_prompts, [])
+
+    def test_save_verb_without_file(self):
+        self.app.saveFilePrompt = lambda extension, filetype_desc, msg: None
+        self.game.turnMain("save")
+        self.assertIn("Could not save game.", self.app.print_stack)
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class TestImportCost(TestCase):
+    def test_importing_game_does_not_import_unused_standard_modules(self):
+        # pickle, json and re are slow to import, and only needed for saving, text
+        # stores, and string replacements
+        root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        code = (
+            "import sys\n"
+            "import intficpy.ifp_game\n"
+            "for name in ('pickle', 'json', 're', 'intficpy.serializer'):\n"
+            "    if name in sys.modules:\n"
+            "        print(name)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-S", "-c", code],
+            cwd=root,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.split(), [])
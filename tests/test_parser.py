@@ -16,6 +16,8 @@ from intficpy.verb import (
     GetAllVerb,
 )
 from intficpy.exceptions import ObjectMatchError
+from intficpy.grammar import TokenRoles, PREPOSITION, NOUN, ADJECTIVE, DIRECTION, NUMBER
+from intficpy.travel import directionDict
 
 
 class TestParser(IFPTestCase):
@@ -117,6 +119,49 @@ class TestAdjacentStrObj(IFPTestCase):
         )
 
 
+class TestTokenRoles(IFPTestCase):
+    def test_roles_are_annotated_once_per_command(self):
+        ladder = Thing(self.game, "ladder")
+        ladder.setAdjectives(["up", "long"])
+        self.start_room.addThing(ladder)
+
+        self.game.turnMain("x up long ladder")
+
+        roles = self.game.parser.command.roles
+        self.assertTrue(roles.has("up", PREPOSITION))
+        self.assertTrue(roles.has("up", DIRECTION))
+        self.assertTrue(roles.has("up", ADJECTIVE))
+        self.assertTrue(roles.has("long", ADJECTIVE))
+        self.assertTrue(roles.has("ladder", NOUN))
+        self.assertFalse(roles.has("ladder", ADJECTIVE))
+        self.assertTrue(roles.describes("long", "ladder"))
+        self.assertEqual(roles.tokens(NOUN), ["ladder"])
+        self.assertEqual(roles.index("long"), 2)
+
+    def test_numbers_and_repeated_tokens(self):
+        roles = TokenRoles(["dial", "7", "to", "7"], self.game.nouns, directionDict)
+
+        self.assertEqual(roles.tokens(NUMBER), ["7", "7"])
+        self.assertEqual(roles.index("7"), 1)
+        with self.assertRaises(ValueError):
+            roles.index("8")
+
+    def test_adjacent_objects_with_more_than_two_nouns(self):
+        girl = Actor(self.game, "girl")
+        ball = Thing(self.game, "ball")
+        ball.setAdjectives(["glass"])
+        glass = Thing(self.game, "glass")
+        self.start_room.addThing(girl)
+        self.start_room.addThing(glass)
+        self.me.addThing(ball)
+
+        self.game.turnMain("give girl glass ball")
+
+        self.assertIs(self.game.parser.command.verb, GiveVerb)
+        self.assertIs(self.game.parser.command.dobj.target, girl)
+        self.assertIs(self.game.parser.command.iobj.target, ball)
+
+
 class TestGetThing(IFPTestCase):
     def test_get_thing(self):
         noun = self._get_unique_noun()
@@ -349,6 +394,65 @@ class TestPrepositions(IFPTestCase):
         )
 
 
+class TestSyntaxCache(IFPTestCase):
+    def test_repeated_command_uses_cached_analysis(self):
+        coin = Thing(self.game, "coin")
+        self.start_room.addThing(coin)
+
+        self.game.turnMain("x coin")
+        cached = len(self.game.parser.syntax_cache)
+        self.game.turnMain("x coin")
+
+        self.assertEqual(len(self.game.parser.syntax_cache), cached)
+        self.assertIs(self.game.parser.command.verb, ExamineVerb)
+        self.assertEqual(self.game.parser.command.dobj.tokens, ["coin"])
+        self.assertIs(self.game.parser.command.dobj.target, coin)
+
+    def test_objects_are_found_again_for_cached_analysis(self):
+        coin = Thing(self.game, "coin")
+        self.start_room.addThing(coin)
+        self.game.turnMain("get coin")
+        self.assertIs(self.game.parser.command.dobj.target, coin)
+
+        other_coin = Thing(self.game, "coin")
+        self.start_room.addThing(other_coin)
+        self.game.turnMain("get coin")
+
+        self.assertIs(self.game.parser.command.verb, GetVerb)
+        self.assertIs(self.game.parser.command.dobj.target, other_coin)
+        self.assertIs(other_coin.location, self.me)
+
+    def test_changing_adjectives_invalidates_cached_analysis(self):
+        ladder = Thing(self.game, self._get_unique_noun())
+        ladder.setAdjectives(["high", "up"])
+        self.start_room.addThing(ladder)
+
+        self.game.turnMain(f"x up high {ladder.name}")
+        self.assertIs(self.game.parser.command.verb, ExamineVerb)
+
+        ladder.setAdjectives(["high"])
+        self.game.turnMain(f"x up high {ladder.name}")
+        self.assertIsNot(self.game.parser.command.verb, ExamineVerb)
+
+    def test_vocabulary_stamp_changes_with_verbs_and_synonyms(self):
+        stamp = self.game.parser.vocabularyStamp()
+        self.game.removeVerb(ExamineVerb)
+        self.assertNotEqual(self.game.parser.vocabularyStamp(), stamp)
+
+        stamp = self.game.parser.vocabularyStamp()
+        self.me.addSynonym("self")
+        self.assertNotEqual(self.game.parser.vocabularyStamp(), stamp)
+
+    def test_cache_is_bounded(self):
+        self.game.parser.syntax_cache.size = 2
+        for command in ("look", "i", "score"):
+            self.game.turnMain(command)
+
+        self.assertEqual(len(self.game.parser.syntax_cache), 2)
+        stamp = self.game.parser.vocabularyStamp()
+        self.assertIsNone(self.game.parser.syntax_cache.get(["look"], stamp))
+
+
 class TestKeywords(IFPTestCase):
     def test_keyword_adjectives(self):
         everything_box = Thing(self.game, self._get_unique_noun())
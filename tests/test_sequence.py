@@ -317,3 +317,108 @@ class TestValidateSequenceTemplate(IFPTestCase):
         L = "label"
         with self.assertRaises(IFPError):
             Sequence(self.game, [Sequence.Label(L), Sequence.Label(L)])
+
+
+class TestCompiledSequence(IFPTestCase):
+    def test_template_compiled_once(self):
+        sequence = Sequence(self.game, ["Hello.", {"wave": ["You wave."]}])
+        program = sequence._program
+        sequence.start()
+        self.assertIs(sequence._program, program)
+
+    def test_sequences_share_compiled_template(self):
+        template = ["Hello.", {"wave": ["You wave."]}]
+        sequence1 = Sequence(self.game, template)
+        sequence2 = Sequence(self.game, template)
+        self.assertIs(sequence1._program, sequence2._program)
+
+    def test_equal_templates_not_shared(self):
+        sequence1 = Sequence(self.game, ["Hello."])
+        sequence2 = Sequence(self.game, ["Hello."])
+        self.assertIsNot(sequence1._program, sequence2._program)
+
+    def test_items_added_after_creation_are_read(self):
+        template = ["Hello."]
+        sequence = Sequence(self.game, template)
+        template.append("Goodbye.")
+        sequence.recompile()
+        sequence.start()
+        self.game.runTurnEvents()
+        self.assertIn("Hello.", self.app.print_stack)
+        self.assertIn("Goodbye.", self.app.print_stack)
+
+    def test_options_added_after_creation_can_be_chosen(self):
+        template = [{"wave": ["You wave."]}]
+        sequence = Sequence(self.game, template)
+        sequence.start()
+        template[0]["bow"] = ["You bow."]
+        sequence.recompile()
+        self.game.turnMain("bow")
+        self.assertIn("You bow.", self.app.print_stack)
+
+    def test_recompile_updates_every_sequence_with_the_template(self):
+        template = ["Hello.", "Goodbye."]
+        sequence1 = Sequence(self.game, template)
+        sequence2 = Sequence(self.game, template)
+        sequence2.position = [1]
+        template.insert(0, "Ahem.")
+        sequence1.recompile()
+        self.assertIs(sequence1._program, sequence2._program)
+        self.assertEqual(len(sequence2._program.locations), 3)
+        self.assertEqual(sequence2.position, [1])
+
+    def test_option_branch_continues_after_menu(self):
+        AFTER_ITEM = "Back on the main road."
+        sequence = Sequence(
+            self.game,
+            [
+                {
+                    "go left": ["You go left.", {"go deeper": ["You go deeper."]}],
+                    "go right": ["You go right."],
+                },
+                AFTER_ITEM,
+            ],
+        )
+        sequence.start()
+        self.game.turnMain("left")
+        self.assertEqual(sequence.position, [0, "go left", 1])
+        self.game.turnMain("deeper")
+        self.assertIn("You go deeper.", self.app.print_stack)
+        self.assertIn(AFTER_ITEM, self.app.print_stack)
+        self.assertFalse(sequence.active)
+
+    def test_position_can_be_set(self):
+        sequence = Sequence(self.game, ["Hello.", "Goodbye."])
+        sequence.position = [1]
+        self.assertEqual(sequence.current_item, "Goodbye.")
+
+    def test_jump_to_invalid_location_raises(self):
+        sequence = Sequence(self.game, ["Hello."])
+        with self.assertRaises(IFPError):
+            sequence.jump_to([3, 1])
+
+
+class TestInexactOptionMatching(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sequence = Sequence(
+            self.game,
+            [{"visit the lighthouse": ["You climb."], "row to shore": ["You row."]}],
+        )
+
+    def test_typos_not_accepted_by_default(self):
+        self.sequence.start()
+        self.game.turnMain("lighthose")
+        self.assertNotIn("You climb.", self.app.print_stack)
+
+    def test_match_option_with_typo(self):
+        self.sequence.max_typos = 1
+        self.sequence.start()
+        self.game.turnMain("lighthose")
+        self.assertIn("You climb.", self.app.print_stack)
+
+    def test_match_option_by_prefix(self):
+        self.sequence.match_prefixes = True
+        self.sequence.start()
+        self.game.turnMain("sho")
+        self.assertIn("You row.", self.app.print_stack)
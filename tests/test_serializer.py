@@ -1,10 +1,27 @@
+import importlib.util
+import json
 import os
 import pickle
-import uuid
-
-from intficpy.serializer import SaveGame, LoadGame
+import tempfile
+import unittest
+import zlib
+
+from intficpy.exceptions import DeserializationError, IFPError, Unserializable
+from intficpy.serializer import (
+    COMPRESSED_MAGIC,
+    AutoSave,
+    SaveGame,
+    LoadGame,
+    build_save_dictionary,
+    capture_game_state,
+    iter_save_records,
+)
+from intficpy.actor import Player
 from intficpy.daemons import Daemon
+from intficpy.ifp_game import IFPGame
+from intficpy.ifp_object import IFPObject
 from intficpy.thing_base import Thing
+from intficpy.room import Room
 from intficpy.things import Surface, Container
 
 from .helpers import IFPTestCase
@@ -13,10 +30,7 @@ from .helpers import IFPTestCase
 class TestSaveLoadOneRoomWithPlayer(IFPTestCase):
     def setUp(self):
         super().setUp()
-        FILENAME = f"_ifp_tests_saveload__{uuid.uuid4()}.sav"
-
-        path = os.path.dirname(os.path.realpath(__file__))
-        self.path = os.path.join(path, FILENAME)
+        self.path = self.make_save_path()
 
     def test_save_file_size_does_not_grow(self):
         size = []
@@ -111,18 +125,11 @@ class TestSaveLoadOneRoomWithPlayer(IFPTestCase):
             initial_obj, latest_obj, "Initial and final loaded data did not match."
         )
 
-    def tearDown(self):
-        super().tearDown()
-        os.remove(self.path)
-
 
 class TestSaveLoadNested(IFPTestCase):
     def setUp(self):
         super().setUp()
-        FILENAME = f"_ifp_tests_saveload__{uuid.uuid4()}.sav"
-
-        path = os.path.dirname(os.path.realpath(__file__))
-        self.path = os.path.join(path, FILENAME)
+        self.path = self.make_save_path()
 
         self.item1 = Surface(self.game, "table")
         self.item2 = Container(self.game, "box")
@@ -168,18 +175,11 @@ class TestSaveLoadNested(IFPTestCase):
             self.item4, self.item3.contains, "Failed to load item nested with depth 3."
         )
 
-    def tearDown(self):
-        super().tearDown()
-        os.remove(self.path)
-
 
 class TestSaveLoadComplexAttribute(IFPTestCase):
     def setUp(self):
         super().setUp()
-        FILENAME = "_ifp_tests_saveload__0003.sav"
-
-        path = os.path.dirname(os.path.realpath(__file__))
-        self.path = os.path.join(path, FILENAME)
+        self.path = self.make_save_path()
 
         self.item1 = Surface(self.game, "table")
         self.item2 = Container(self.game, "box")
@@ -214,18 +214,11 @@ class TestSaveLoadComplexAttribute(IFPTestCase):
             "Custom attribute does not match expected",
         )
 
-    def tearDown(self):
-        super().tearDown()
-        os.remove(self.path)
-
 
 class TestSaveLoadDaemon(IFPTestCase):
     def setUp(self):
         super().setUp()
-        FILENAME = "_ifp_tests_saveload__0004.sav"
-
-        path = os.path.dirname(os.path.realpath(__file__))
-        self.path = os.path.join(path, FILENAME)
+        self.path = self.make_save_path()
 
         self.initial_counter = 0
         self.daemon = Daemon(self.game, self._daemon_func)
@@ -266,6 +259,666 @@ class TestSaveLoadDaemon(IFPTestCase):
             "Daemon counter does not match expected.",
         )
 
+
+class TestLoadValidationAndRollback(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path()
+
+        self.box = Container(self.game, "box")
+        self.bean = Thing(self.game, "bean")
+        self.start_room.addThing(self.box)
+        self.box.addThing(self.bean)
+        self.bean.custom_attr = "saved"
+
+        SaveGame(self.game, self.path)
+        self.box.removeThing(self.bean)
+        self.me.addThing(self.bean)
+        self.bean.custom_attr = "current"
+
+    def _load_file(self, mutate_data):
+        l = LoadGame(self.game, self.path)
+        mutate_data(l.data)
+        return l
+
+    def test_bad_reference_is_invalid(self):
+        def add_bad_reference(data):
+            data["ifp_objects"][self.bean.ix]["custom_attr"] = "<IFP>Thing__99999"
+
+        l = self._load_file(add_bad_reference)
+        self.assertFalse(l.is_valid())
+        self.assertEqual(self.bean.custom_attr, "current")
+
+    def test_bad_active_sequence_is_invalid(self):
+        def add_bad_sequence(data):
+            data["active_sequence"] = "<IFP>Sequence__99999"
+
+        l = self._load_file(add_bad_sequence)
+        self.assertFalse(l.is_valid())
+
+    def test_bad_location_is_invalid(self):
+        def add_bad_location(data):
+            data["locations"][self.start_room.ix]["contains"]["Thing__99999"] = []
+
+        l = self._load_file(add_bad_location)
+        self.assertFalse(l.is_valid())
+
+    def test_failed_load_restores_game(self):
+        # save with a copy of the bean in the box, so loading needs to copy it
+        self.me.removeThing(self.bean)
+        self.box.addThing(self.bean)
+        self.box.addThing(self.bean.copyThing())
+        SaveGame(self.game, self.path)
+        self.box.removeThing(self.bean)
+        self.me.addThing(self.bean)
+        copy = self.box.contains[self.bean.ix][0]
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+
+        def fail_to_copy():
+            raise RuntimeError("the bean cannot be copied")
+
+        # fail while placing Things, after all attributes have been replaced
+        self.bean.copyThing = fail_to_copy
+        with self.assertRaises(DeserializationError):
+            l.load()
+
+        self.assertEqual(self.bean.custom_attr, "current")
+        self.assertIs(self.bean.location, self.me)
+        self.assertItemExactlyOnceIn(self.bean, self.me.contains, "bean not restored")
+        self.assertEqual(self.box.contains[self.bean.ix], [copy])
+        self.assertIs(copy.location, self.box)
+
+    def test_load_uses_staged_data(self):
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        self.assertEqual(self.bean.custom_attr, "saved")
+        self.assertIs(self.bean.location, self.box)
+
+    def test_load_copies_and_discards_things(self):
+        self.me.removeThing(self.bean)
+        self.box.addThing(self.bean)
+        self.box.addThing(self.bean.copyThing())
+        self.box.addThing(self.bean.copyThing())
+        SaveGame(self.game, self.path)
+        self.box.removeThing(self.bean)
+        for copy in list(self.box.contains[self.bean.ix]):
+            self.box.removeThing(copy)
+        extra = self.bean.copyThing()
+        self.start_room.addThing(extra)
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        beans = self.box.contains[self.bean.ix]
+        self.assertEqual(len(beans), 3)
+        self.assertIs(beans[0], self.bean)
+        self.assertTrue(all(bean.location is self.box for bean in beans))
+        self.assertNotIn(self.bean.ix, self.start_room.contains)
+        self.assertNotIn(extra, self.game.nouns["bean"])
+        for bean in beans:
+            self.assertEqual(self.game.nouns["bean"].count(bean), 1)
+
+
+class TestLoadVerb(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path()
+        self.app.openFilePrompt = lambda extension, filetype_desc, msg: self.path
+
+    def _write(self, contents):
+        with open(self.path, "wb") as f:
+            f.write(contents)
+
+    def test_load_verb(self):
+        SaveGame(self.game, self.path)
+        self.game.turnMain("load")
+        self.assertIn("Game loaded.", self.app.print_stack)
+
+    def test_load_verb_unreadable_file(self):
+        self._write(b"not a save file")
+        self.game.turnMain("load")
+        self.assertIn("Cannot load game file.", self.app.print_stack)
+
+    def test_load_verb_malformed_jsonl(self):
+        self._write(b'{"record": "object"}\n')
+        self.game.turnMain("load")
+        self.assertIn("Cannot load game file.", self.app.print_stack)
+
+    def test_load_verb_truncated_jsonl(self):
+        SaveGame(self.game, self.path, save_format="jsonl")
+        with open(self.path, "rb") as f:
+            contents = f.read()
+        self._write(contents[: len(contents) // 2])
+        self.game.turnMain("load")
+        self.assertIn("Cannot load game file.", self.app.print_stack)
+
+    def test_load_verb_msgpack(self):
+        # without msgpack installed, LoadGame raises IFPError
+        self._write(b"\x81\xa6record\xa6header")
+        self.game.turnMain("load")
+        self.assertIn("Cannot load game file.", self.app.print_stack)
+
+    def test_load_verb_compressed_by_different_game(self):
+        self.game.save_dictionary = b"another game"
+        SaveGame(self.game, self.path, compress=True)
+        self.game.save_dictionary = None
+        self.game.turnMain("load")
+        self.assertIn("Cannot load game file.", self.app.print_stack)
+
+
+class TestObjectKeys(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path()
+
+    def test_key_is_used_as_index(self):
+        lamp = Thing(self.game, "lamp", key="lamp")
+        self.assertEqual(lamp.ix, "lamp")
+        self.assertIs(self.game.ifp_objects["lamp"], lamp)
+
+    def test_keyed_object_does_not_change_generated_indexes(self):
+        next_ix = self.game.next_obj_ix
+        Container(self.game, "box", key="box")
+        self.assertEqual(self.game.next_obj_ix, next_ix)
+
+    def test_duplicate_key_raises(self):
+        Thing(self.game, "lamp", key="lamp")
+        with self.assertRaises(IFPError):
+            Thing(self.game, "lantern", key="lamp")
+
+    def test_key_like_generated_index_raises(self):
+        with self.assertRaises(IFPError):
+            Thing(self.game, "lamp", key="Thing__3")
+
+    def test_save_and_load_keyed_object(self):
+        bean = Thing(self.game, "bean", key="bean")
+        self.start_room.addThing(bean)
+        bean.custom_attr = "saved"
+        SaveGame(self.game, self.path)
+        self.start_room.removeThing(bean)
+        self.me.addThing(bean)
+        bean.custom_attr = "current"
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        self.assertIn("bean", l.validated_data["ifp_objects"])
+        l.load()
+
+        self.assertEqual(bean.custom_attr, "saved")
+        self.assertItemIn(bean, self.start_room.contains, "bean not in room")
+
+
+class TestRecreateObjects(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path()
+
+    def test_subclasses_registered_by_type_tag(self):
+        self.assertIs(IFPObject.registry["Thing"], Thing)
+        self.assertIs(IFPObject.registry["Container"], Container)
+        self.assertEqual(Surface.type_tag, "Surface")
+
+    def test_duplicate_type_tag_raises(self):
+        with self.assertRaises(IFPError):
+
+            class Box(Thing, type_tag="Container"):
+                pass
+
+        self.assertIs(IFPObject.registry["Container"], Container)
+
+    def test_class_defined_again_replaces_registered_class(self):
+        def define_lamp():
+            class Lamp(Thing):
+                pass
+
+            return Lamp
+
+        define_lamp()
+        lamp_class = define_lamp()
+        self.assertIs(IFPObject.registry[lamp_class.type_tag], lamp_class)
+
+    def test_default_type_tag_is_qualified_name(self):
+        def define_container():
+            # shares its name with the built in Container
+            class Container(Thing):
+                pass
+
+            return Container
+
+        container_class = define_container()
+        self.assertEqual(
+            container_class.type_tag,
+            f"{__name__}.{define_container.__qualname__}.<locals>.Container",
+        )
+        self.assertIs(IFPObject.registry[container_class.type_tag], container_class)
+        self.assertIs(IFPObject.registry["Container"], Container)
+
+    def test_save_records_type_tags(self):
+        SaveGame(self.game, self.path)
+        l = LoadGame(self.game, self.path)
+        self.assertEqual(l.data["types"][self.start_room.ix], "Room")
+
+    def test_missing_object_recreated_on_load(self):
+        box = Container(self.game, "box", key="box")
+        box.custom_attr = {"owner": self.me}
+        self.start_room.addThing(box)
+        SaveGame(self.game, self.path)
+
+        # the box does not exist in the game being loaded into
+        self.start_room.removeThing(box)
+        del self.game.ifp_objects["box"]
+        self.game.nouns["box"].remove(box)
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        self.assertNotIn("box", self.game.ifp_objects)
+        l.load()
+
+        new_box = self.game.ifp_objects["box"]
+        self.assertIsNot(new_box, box)
+        self.assertIsInstance(new_box, Container)
+        self.assertIs(new_box.game, self.game)
+        self.assertIs(new_box.custom_attr["owner"], self.me)
+        self.assertIs(new_box.location, self.start_room)
+        self.assertIn(new_box, self.game.nouns["box"])
+
+    def test_recreated_generated_index_not_reused(self):
+        bean = Thing(self.game, "bean")
+        SaveGame(self.game, self.path)
+        del self.game.ifp_objects[bean.ix]
+        self.game.next_obj_ix -= 1
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        self.assertIsInstance(self.game.ifp_objects[bean.ix], Thing)
+        self.assertNotEqual(Thing(self.game, "pebble").ix, bean.ix)
+
+    def test_unknown_type_tag_is_invalid(self):
+        Thing(self.game, "bean", key="bean")
+        SaveGame(self.game, self.path)
+        del self.game.ifp_objects["bean"]
+
+        l = LoadGame(self.game, self.path)
+        l.data["types"]["bean"] = "NoSuchClass"
+        self.assertFalse(l.is_valid())
+
+    def test_failed_load_removes_recreated_objects(self):
+        bean = Thing(self.game, "bean", key="bean")
+        self.start_room.addThing(bean)
+        SaveGame(self.game, self.path)
+        self.start_room.removeThing(bean)
+        del self.game.ifp_objects["bean"]
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load_locations = _fail
+        with self.assertRaises(DeserializationError):
+            l.load()
+        self.assertNotIn("bean", self.game.ifp_objects)
+
+
+def _fail():
+    raise RuntimeError("failed to place Things")
+
+
+class TestSaveFormats(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path()
+
+        self.box = Container(self.game, "box")
+        self.bean = Thing(self.game, "bean")
+        self.start_room.addThing(self.box)
+        self.box.addThing(self.bean)
+        self.bean.custom_attr = {"owner": self.me, "names": ["bean", "pea"]}
+
+    def _round_trip(self, save_format):
+        saved = SaveGame(self.game, self.path, save_format=save_format).data
+        self.box.removeThing(self.bean)
+        self.me.addThing(self.bean)
+        self.bean.custom_attr = None
+
+        l = LoadGame(self.game, self.path)
+        self.assertEqual(l.save_format, save_format)
+        self.assertEqual(l.data["ifp_objects"], saved["ifp_objects"])
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        self.assertIs(self.bean.custom_attr["owner"], self.me)
+        self.assertEqual(self.bean.custom_attr["names"], ["bean", "pea"])
+        self.assertItemIn(self.bean, self.box.contains, "bean not in box")
+
+    def test_jsonl_round_trip(self):
+        self._round_trip("jsonl")
+
+    def test_pickle_keeps_tuples_and_number_keys(self):
+        self.bean.custom_attr = {1: (self.me, "pea")}
+        SaveGame(self.game, self.path)
+        self.bean.custom_attr = None
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        self.assertEqual(self.bean.custom_attr, {1: (self.me, "pea")})
+
+    def test_jsonl_number_keys_unserializable(self):
+        self.bean.custom_attr = {1: "one"}
+        with self.assertRaises(Unserializable):
+            SaveGame(self.game, self.path, save_format="jsonl")
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_jsonl_tuples_unserializable(self):
+        SaveGame(self.game, self.path, save_format="jsonl")
+        self.bean.custom_attr = ("bean", "pea")
+        with self.assertRaises(Unserializable):
+            SaveGame(self.game, self.path, save_format="jsonl")
+
+        # the failed save does not replace the existing file
+        l = LoadGame(self.game, self.path)
+        saved_attr = l.data["ifp_objects"][self.bean.ix]["custom_attr"]
+        self.assertEqual(saved_attr["owner"], f"<IFP>{self.me.ix}")
+
+    @unittest.skipUnless(importlib.util.find_spec("msgpack"), "needs msgpack")
+    def test_msgpack_round_trip(self):
+        self._round_trip("msgpack")
+
+    @unittest.skipUnless(importlib.util.find_spec("msgpack"), "needs msgpack")
+    def test_msgpack_keeps_number_keys(self):
+        self.bean.custom_attr = {1: "one"}
+        SaveGame(self.game, self.path, save_format="msgpack")
+        self.bean.custom_attr = None
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        self.assertEqual(self.bean.custom_attr, {1: "one"})
+
+    @unittest.skipUnless(importlib.util.find_spec("msgpack"), "needs msgpack")
+    def test_msgpack_tuples_unserializable(self):
+        self.bean.custom_attr = ("bean", "pea")
+        with self.assertRaises(Unserializable):
+            SaveGame(self.game, self.path, save_format="msgpack")
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_jsonl_has_one_record_per_object(self):
+        SaveGame(self.game, self.path, save_format="jsonl")
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f]
+
+        self.assertEqual(records[0]["record"], "header")
+        objects = [record for record in records if record["record"] == "object"]
+        self.assertEqual(len(objects), len(self.game.ifp_objects))
+        bean = next(record for record in objects if record["ix"] == self.bean.ix)
+        self.assertEqual(bean["type"], "Thing")
+        self.assertEqual(bean["attrs"]["custom_attr"]["owner"], f"<IFP>{self.me.ix}")
+
+    def test_iter_save_records_reads_lazily(self):
+        SaveGame(self.game, self.path, save_format="jsonl")
+        records = iter_save_records(self.path)
+        self.assertEqual(next(records)["record"], "header")
+        records.close()
+
+    def test_iter_save_records_reads_pickle(self):
+        SaveGame(self.game, self.path)
+        records = list(iter_save_records(self.path))
+        self.assertEqual(records[0]["record"], "header")
+        self.assertIn(self.bean.ix, [record.get("ix") for record in records[1:]])
+
+    def test_unknown_format_raises(self):
+        with self.assertRaises(IFPError):
+            SaveGame(self.game, self.path, save_format="yaml")
+
+
+class TestCompressedSaves(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path()
+
+        for i in range(20):
+            bean = Thing(self.game, "bean")
+            bean.description = "A small, shiny bean, like every other bean. "
+            self.start_room.addThing(bean)
+        self.bean = bean
+        self.bean.custom_attr = "saved"
+
+    def _load(self):
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+        return l
+
+    def test_compressed_save_is_smaller(self):
+        SaveGame(self.game, self.path)
+        with open(self.path, "rb") as f:
+            plain = f.read()
+        SaveGame(self.game, self.path, compress=True)
+        compressed_size = os.path.getsize(self.path)
+
+        self.assertLess(compressed_size, len(plain) / 3)
+        # the preset dictionary does better than zlib on its own
+        self.assertLess(compressed_size, len(zlib.compress(plain, 9)))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(len(COMPRESSED_MAGIC)), COMPRESSED_MAGIC)
+
+    def test_load_compressed_save(self):
+        SaveGame(self.game, self.path, compress=True)
+        self.bean.custom_attr = "current"
+        self._load()
+        self.assertEqual(self.bean.custom_attr, "saved")
+
+    def test_load_compressed_jsonl_save(self):
+        SaveGame(self.game, self.path, save_format="jsonl", compress=True)
+        self.bean.custom_attr = "current"
+        l = self._load()
+        self.assertEqual(l.save_format, "jsonl")
+        self.assertEqual(self.bean.custom_attr, "saved")
+
+    def test_game_setting_compresses_saves(self):
+        self.game.compress_saves = True
+        SaveGame(self.game, self.path)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(len(COMPRESSED_MAGIC)), COMPRESSED_MAGIC)
+
+    def test_game_without_compress_saves_loads_compressed_save(self):
+        self.game.compress_saves = True
+        SaveGame(self.game, self.path)
+        self.game.compress_saves = False
+        self.game.save_dictionary = None
+        self.bean.custom_attr = "current"
+        self._load()
+        self.assertEqual(self.bean.custom_attr, "saved")
+
+    def test_custom_dictionary(self):
+        self.game.save_dictionary = b"custom_attr\0bean"
+        SaveGame(self.game, self.path, compress=True)
+        self.bean.custom_attr = "current"
+        self._load()
+        self.assertEqual(self.bean.custom_attr, "saved")
+
+    def test_different_dictionary_cannot_load(self):
+        self.game.save_dictionary = b"another game"
+        SaveGame(self.game, self.path, compress=True)
+        self.game.save_dictionary = None
+        with self.assertRaises(DeserializationError):
+            LoadGame(self.game, self.path)
+
+    def test_dictionary_does_not_depend_on_game_state(self):
+        dictionary = build_save_dictionary()
+        self.bean.description = "A different bean. "
+        self.bean.new_attr = 1
+        Thing(self.game, "pea")
+        self.assertEqual(build_save_dictionary(), dictionary)
+
+
+class TestOmitUnchangedText(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path()
+
+        self.box = Container(self.game, "box")
+        self.box.description = "A plain wooden box. "
+        self.start_room.addThing(self.box)
+        self.game.recordSaveDefaults()
+
+    def test_unchanged_text_left_out_of_save(self):
+        saved = SaveGame(self.game).data["ifp_objects"][self.box.ix]
+        self.assertNotIn("description", saved)
+        self.assertNotIn("name", saved)
+        self.assertIn("location", saved)
+
+    def test_changed_text_saved(self):
+        self.box.description = "A battered wooden box. "
+        saved = SaveGame(self.game).data["ifp_objects"][self.box.ix]
+        self.assertEqual(saved["description"], "A battered wooden box. ")
+
+    def test_load_restores_default_text(self):
+        SaveGame(self.game, self.path)
+        self.box.description = "A battered wooden box. "
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        self.assertEqual(self.box.description, "A plain wooden box. ")
+
+    def test_text_saved_when_turned_off(self):
+        self.game.save_defaults = {}
+        saved = SaveGame(self.game).data["ifp_objects"][self.box.ix]
+        self.assertEqual(saved["description"], "A plain wooden box. ")
+
+    def test_off_by_default(self):
+        self.assertFalse(self.game.omit_unchanged_text)
+
+    def test_defaults_recorded_by_init_game(self):
+        game = IFPGame(self.app, main=__name__)
+        game.omit_unchanged_text = True
+        me = Player(game)
+        room = Room(game, "room", "desc")
+        room.addThing(me)
+        game.setPlayer(me)
+        game.initGame()
+        self.assertEqual(game.save_defaults[me.ix]["name"], me.name)
+
+    def _remove_lamp(self, lamp):
+        self.start_room.removeThing(lamp)
+        del self.game.ifp_objects["lamp"]
+        self.game.nouns["lamp"].remove(lamp)
+
+    def test_object_with_text_left_out_not_recreated(self):
+        lamp = Thing(self.game, "lamp", key="lamp")
+        self.start_room.addThing(lamp)
+        self.game.recordSaveDefaults()
+        SaveGame(self.game, self.path)
+        self._remove_lamp(lamp)
+
+        l = LoadGame(self.game, self.path)
+        self.assertFalse(l.is_valid())
+        self.assertNotIn(None, self.game.nouns)
+        self.game.turnMain("look")
+
+    def test_object_with_all_text_saved_recreated(self):
+        # created after the defaults were recorded, so all of its text is saved
+        lamp = Thing(self.game, "lamp", key="lamp")
+        self.start_room.addThing(lamp)
+        SaveGame(self.game, self.path)
+        self._remove_lamp(lamp)
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        new_lamp = self.game.ifp_objects["lamp"]
+        self.assertEqual(new_lamp.name, "lamp")
+        self.assertIn(new_lamp, self.game.nouns["lamp"])
+        self.assertNotIn(None, self.game.nouns)
+        self.game.turnMain("look")
+        self.assertIn("lamp", self.app.print_stack[-1])
+
+
+class TestAutoSave(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.bean = Thing(self.game, "bean")
+        self.bean.custom_attr = 0
+        self.start_room.addThing(self.bean)
+
     def tearDown(self):
         super().tearDown()
-        os.remove(self.path)
+        self.directory.cleanup()
+
+    def _count_turn(self, game):
+        self.bean.custom_attr += 1
+
+    def test_autosave_rotates_slots(self):
+        autosave = AutoSave(self.game, self.directory.name, slots=2)
+        self.game.autosave = autosave
+        self.game.daemons.add(Daemon(self.game, self._count_turn))
+
+        for i in range(3):
+            self.game.turnMain("l")
+            autosave.wait()
+
+        self.assertIsNone(autosave.error)
+        self.assertEqual(autosave.saves, 3)
+        self.assertEqual(
+            sorted(os.listdir(self.directory.name)),
+            ["autosave_0.sav", "autosave_1.sav"],
+        )
+        self.assertEqual(autosave.latest, autosave.slot_path(0))
+
+        self.bean.custom_attr = 99
+        l = LoadGame(self.game, autosave.latest)
+        self.assertTrue(l.is_valid())
+        l.load()
+        self.assertEqual(self.bean.custom_attr, 3)
+
+    def test_autosave_captures_state_at_end_of_turn(self):
+        autosave = AutoSave(self.game, self.directory.name)
+        self.game.autosave = autosave
+
+        self.game.turnMain("take bean")
+        # changes after the turn ends are not included, even if the autosave has
+        # not been written yet
+        self.bean.custom_attr = 99
+        self.me.removeThing(self.bean)
+        autosave.wait()
+
+        l = LoadGame(self.game, autosave.latest)
+        self.assertTrue(l.is_valid())
+        l.load()
+        self.assertEqual(self.bean.custom_attr, 0)
+        self.assertIs(self.bean.location, self.me)
+
+    def test_captured_state_does_not_see_later_changes(self):
+        self.bean.custom_attr = {"tags": ["red"]}
+        state = capture_game_state(self.game)
+        self.bean.custom_attr["tags"].append("blue")
+        self.me.addThing(self.bean)
+
+        data = SaveGame(self.game, state=state).data
+
+        saved_attr = data["ifp_objects"][self.bean.ix]["custom_attr"]
+        self.assertEqual(saved_attr, {"tags": ["red"]})
+        room_contents = data["locations"][self.start_room.ix]["contains"]
+        self.assertIn(self.bean.ix, room_contents)
+
+    def test_autosave_every_few_turns(self):
+        autosave = AutoSave(self.game, self.directory.name, every=2)
+        self.game.autosave = autosave
+
+        for i in range(3):
+            self.game.turnMain("l")
+        autosave.wait()
+
+        self.assertEqual(autosave.saves, 1)
+        self.assertEqual(os.listdir(self.directory.name), ["autosave_0.sav"])
@@ -0,0 +1,128 @@
+import sys
+import types
+
+from intficpy.actor import Player
+from intficpy.daemons import Daemon
+from intficpy.exceptions import IFPError
+from intficpy.ifp_game import IFPGame
+from intficpy.room import Room
+from intficpy.snapshot import build_snapshot, load_snapshot
+from intficpy.things import Container
+from intficpy.thing_base import Thing
+
+from . import helpers
+
+
+def count_turns(game):
+    game.turns_counted = getattr(game, "turns_counted", 0) + 1
+
+
+class TestSnapshot(helpers.IFPTestCase):
+    def setUp(self):
+        # build the world without initializing the game, as an author's build
+        # step would
+        self.app = helpers.TestApp()
+        self.game = IFPGame(self.app, main=__name__)
+        self.me = Player(self.game)
+        self.start_room = Room(self.game, "room", "desc")
+        self.start_room.addThing(self.me)
+        self.game.setPlayer(self.me)
+
+        self.box = Container(self.game, "box")
+        self.box.setAdjectives(["wooden"])
+        self.start_room.addThing(self.box)
+        self.coin = Thing(self.game, "coin")
+        self.coin.addSynonym("money")
+        self.box.addThing(self.coin)
+
+        self.game.daemons.add(Daemon(self.game, count_turns))
+
+        self.path = self.make_save_path(".snap")
+        build_snapshot(self.game, self.path)
+
+        self.new_app = helpers.TestApp()
+        self.loaded = load_snapshot(self.new_app, self.path, main=sys.modules[__name__])
+
+    def test_loaded_game_has_same_objects(self):
+        self.assertIsNot(self.loaded, self.game)
+        self.assertEqual(
+            list(self.loaded.ifp_objects.keys()), list(self.game.ifp_objects.keys())
+        )
+        self.assertEqual(self.loaded.next_obj_ix, self.game.next_obj_ix)
+        for ix, obj in self.loaded.ifp_objects.items():
+            self.assertIs(type(obj), type(self.game.ifp_objects[ix]))
+            self.assertIs(obj.game, self.loaded)
+
+    def test_loaded_game_keeps_containment_and_vocabulary(self):
+        box = self.loaded.ifp_objects[self.box.ix]
+        coin = self.loaded.ifp_objects[self.coin.ix]
+        room = self.loaded.ifp_objects[self.start_room.ix]
+
+        self.assertItemExactlyOnceIn(box, room.contains, "box not in room")
+        self.assertItemExactlyOnceIn(coin, box.contains, "coin not in box")
+        self.assertIs(coin.location, box)
+        self.assertIn(coin, self.loaded.nouns["money"])
+        self.assertEqual(box.adjectives, ["wooden"])
+        self.assertEqual(self.loaded.verbs, self.game.verbs)
+
+    def test_loaded_game_can_be_played(self):
+        self.assertIs(self.new_app.game, self.loaded)
+        self.loaded.initGame()
+        self.loaded.turnMain("take coin")
+
+        coin = self.loaded.ifp_objects[self.coin.ix]
+        self.assertIs(coin.location, self.loaded.me)
+        self.assertTrue(self.new_app.print_stack)
+        self.assertFalse(self.app.print_stack)
+        self.assertEqual(self.loaded.turns_counted, 2)
+
+    def test_cannot_snapshot_lambda(self):
+        self.game.daemons.add(Daemon(self.game, lambda game: None))
+        with self.assertRaises(IFPError):
+            build_snapshot(self.game, self.path)
+
+
+GAME_SCRIPT = """
+from intficpy.daemons import Daemon
+from intficpy.thing_base import Thing
+
+class Lamp(Thing):
+    pass
+
+def count_lamps(game):
+    game.lamps_counted = True
+"""
+
+
+class TestSnapshotMainModule(helpers.IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path(".snap")
+
+    def run_script(self):
+        # a game script run as __main__, which cannot be imported again
+        script = types.ModuleType("__main__")
+        exec(GAME_SCRIPT, script.__dict__)
+        return script
+
+    def test_main_module_callbacks_found_in_loading_module(self):
+        script = self.run_script()
+        lamp = script.Lamp(self.game, "lamp")
+        self.start_room.addThing(lamp)
+        self.game.daemons.add(Daemon(self.game, script.count_lamps))
+        build_snapshot(self.game, self.path)
+
+        main = self.run_script()
+        loaded = load_snapshot(helpers.TestApp(), self.path, main=main)
+
+        self.assertIs(type(loaded.ifp_objects[lamp.ix]), main.Lamp)
+        daemon = loaded.daemons.active[0]
+        self.assertIs(daemon.func, main.count_lamps)
+
+    def test_missing_main_module_callback(self):
+        script = self.run_script()
+        self.game.daemons.add(Daemon(self.game, script.count_lamps))
+        build_snapshot(self.game, self.path)
+
+        with self.assertRaises(IFPError):
+            load_snapshot(helpers.TestApp(), self.path, main=types.ModuleType("main"))
@@ -0,0 +1,112 @@
+from intficpy.daemons import Daemon
+from intficpy.serializer import SaveGame, LoadGame
+from intficpy.storage import SQLiteEngine, stored_ix
+from intficpy.things import Container
+from intficpy.thing_base import Thing
+
+from .helpers import IFPTestCase
+
+
+class TestSQLiteEngine(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.box = Container(self.game, "box")
+        self.bead = Thing(self.game, "bead")
+        self.bead.custom_attr = {"count": 1, "tags": ["red", "glass"]}
+        self.box.addThing(self.bead)
+        self.start_room.addThing(self.box)
+        self.storage = SQLiteEngine(self.game, cache_size=2)
+        self.game.storage = self.storage
+
+    def tearDown(self):
+        super().tearDown()
+        self.storage.close()
+
+    def test_store_all_leaves_placeholders(self):
+        self.storage.store_all()
+
+        self.assertTrue(self.storage.is_stored(self.bead))
+        self.assertEqual(stored_ix(self.bead), self.bead.ix)
+        self.assertIs(self.game.ifp_objects[self.bead.ix], self.bead)
+
+    def test_object_loaded_on_first_use(self):
+        self.storage.store_all()
+
+        self.assertEqual(self.bead.custom_attr["tags"], ["red", "glass"])
+        self.assertFalse(self.storage.is_stored(self.bead))
+        self.assertIs(self.bead.location, self.box)
+        self.assertIn(self.bead.ix, self.box.contains)
+
+    def test_isinstance_does_not_load_object(self):
+        self.storage.store_all()
+
+        self.assertIsInstance(self.box, Container)
+        self.assertTrue(self.storage.is_stored(self.box))
+
+    def test_changes_written_at_end_of_turn(self):
+        self.storage.store_all()
+        self.bead.custom_attr["count"] = 5
+
+        self.game.turnMain("l")
+        self.storage.store_all()
+
+        state = self.storage.stored_state(self.bead)
+        self.assertEqual(state["custom_attr"]["count"], 5)
+
+    def test_least_recently_used_stored_at_end_of_turn(self):
+        self.storage.store_all()
+        self.game.turnMain("take bead")
+
+        self.assertLessEqual(len(self.storage.loaded), self.storage.cache_size)
+        self.assertIs(self.bead.location, self.me)
+
+    def test_unstorable_object_stays_in_memory(self):
+        daemon = Daemon(self.game, _noop)
+        self.storage.store_all()
+
+        self.assertFalse(self.storage.is_stored(daemon))
+        self.assertIn(daemon.ix, self.storage.pinned)
+        self.assertTrue(self.storage.is_stored(self.bead))
+
+
+class TestStorageSaveLoad(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.make_save_path()
+        self.bead = Thing(self.game, "bead")
+        self.bead.custom_attr = 1
+        self.start_room.addThing(self.bead)
+        self.storage = SQLiteEngine(self.game)
+        self.game.storage = self.storage
+
+    def tearDown(self):
+        super().tearDown()
+        self.storage.close()
+
+    def test_save_does_not_load_stored_objects(self):
+        memory_save = SaveGame(self.game).data
+        self.storage.store_all()
+
+        SaveGame(self.game, self.path)
+
+        self.assertTrue(self.storage.is_stored(self.bead))
+        self.assertTrue(self.storage.is_stored(self.start_room))
+        stored_save = SaveGame(self.game).data
+        self.assertEqual(stored_save, memory_save)
+
+    def test_load_into_stored_game(self):
+        SaveGame(self.game, self.path)
+        self.bead.custom_attr = 2
+        self.me.addThing(self.bead)
+        self.storage.store_all()
+
+        l = LoadGame(self.game, self.path)
+        self.assertTrue(l.is_valid())
+        l.load()
+
+        self.assertEqual(self.bead.custom_attr, 1)
+        self.assertIs(self.bead.location, self.start_room)
+
+
+def _noop(game):
+    pass
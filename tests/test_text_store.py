@@ -0,0 +1,95 @@
+import os
+import uuid
+
+from intficpy.actor import Actor, Topic
+from intficpy.exceptions import IFPError
+from intficpy.sequence import Sequence
+from intficpy.serializer import SaveGame, LoadGame
+from intficpy.text_store import TextStore, StoryText
+from intficpy.thing_base import Thing
+
+from .helpers import IFPTestCase
+
+
+class TestTextStore(IFPTestCase):
+    DESCRIPTION = "A battered brass lamp sits here, its glass fogged with soot. "
+    X_DESCRIPTION = "The lamp is old, but the wick still looks serviceable. "
+    TOPIC_TEXT = '"The lighthouse has been dark for years," says the keeper.'
+    SEQUENCE_TEXT = "The keeper sighs, and looks out over the grey water."
+
+    def setUp(self):
+        super().setUp()
+        path = os.path.dirname(os.path.realpath(__file__))
+        self.path = os.path.join(path, f"_ifp_tests_text_store__{uuid.uuid4()}.txt")
+
+        self.lamp = Thing(self.game, "lamp")
+        self.lamp.description = self.DESCRIPTION
+        self.lamp.x_description = self.X_DESCRIPTION
+        self.start_room.addThing(self.lamp)
+
+        self.keeper = Actor(self.game, "keeper")
+        self.topic = Topic(self.game, self.TOPIC_TEXT)
+        self.keeper.addTopic("ask", self.topic, self.lamp)
+        self.start_room.addThing(self.keeper)
+
+        self.sequence = Sequence(self.game, [self.SEQUENCE_TEXT])
+
+        TextStore.build(self.game, self.path)
+        self.store = TextStore(self.path)
+        self.store.attach(self.game)
+
+    def tearDown(self):
+        super().tearDown()
+        self.store.close()
+        os.remove(self.path)
+
+    def test_attach_replaces_long_strings_with_story_text(self):
+        self.assertIsInstance(self.lamp.description, StoryText)
+        self.assertIsInstance(self.topic.text, StoryText)
+        self.assertIsInstance(self.sequence.template[0], StoryText)
+        self.assertEqual(self.lamp.description, self.DESCRIPTION)
+
+    def test_short_strings_are_not_stored(self):
+        self.assertIs(type(self.lamp.name), str)
+
+    def test_identical_strings_are_stored_once(self):
+        other = Thing(self.game, "lamp")
+        other.description = self.DESCRIPTION
+        self.assertEqual(TextStore.build(self.game, self.path), 5)
+        store = TextStore(self.path)
+        descriptions = [entry for entry in store.entries if entry[1] == ["description"]]
+        self.assertEqual(descriptions[0][2], descriptions[1][2])
+        store.close()
+
+    def test_stored_text_prints(self):
+        self.game.turnMain("x lamp")
+        self.assertIn(self.X_DESCRIPTION, self.app.print_stack.pop())
+
+        self.game.turnMain("l")
+        self.assertIn(self.DESCRIPTION, self.app.print_stack.pop())
+
+        self.game.turnMain("ask keeper about lamp")
+        self.assertIn(self.TOPIC_TEXT, self.app.print_stack)
+
+    def test_stored_sequence_text_prints(self):
+        self.sequence.start()
+        self.game.runTurnEvents()
+        self.assertIn(self.SEQUENCE_TEXT, self.app.print_stack)
+
+    def test_attach_to_changed_game_raises(self):
+        self.lamp.description = "Something else entirely, and of a different length."
+        with self.assertRaises(IFPError):
+            self.store.attach(self.game)
+
+    def test_save_and_load_story_text_reference(self):
+        save_path = self.path + ".sav"
+        SaveGame(self.game, save_path)
+        self.lamp.description = "A lamp. "
+
+        l = LoadGame(self.game, save_path)
+        self.assertTrue(l.is_valid())
+        l.load()
+        os.remove(save_path)
+
+        self.assertIsInstance(self.lamp.description, StoryText)
+        self.assertEqual(self.lamp.description, self.DESCRIPTION)
@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from intficpy.tokenizer import (
+    cleanInput,
+    editDistance,
+    removeArticles,
+    splitCommands,
+    tokenizeText,
+    PhraseIndex,
+)
+
+
+class TestTokenizer(TestCase):
+    def test_clean_input_removes_punctuation_and_lowercases(self):
+        self.assertEqual(cleanInput("Take the LAMP, please!"), "take the lamp please")
+
+    def test_remove_articles_modifies_tokens_in_place(self):
+        tokens = ["take", "the", "lamp", "and", "a", "box"]
+        result = removeArticles(tokens)
+        self.assertIs(result, tokens)
+        self.assertEqual(tokens, ["take", "lamp", "and", "box"])
+
+    def test_tokenize_text(self):
+        tokenized = tokenizeText("Ask about the Lighthouse.")
+        self.assertEqual(tokenized.tokens, ("ask", "about", "the", "lighthouse"))
+        self.assertEqual(tokenized.words, ("ask", "about", "lighthouse"))
+        self.assertIn("the", tokenized.token_set)
+        self.assertNotIn("the", tokenized.word_set)
+
+    def test_tokenize_text_reuses_result(self):
+        text = "ask about the lighthouse keeper"
+        self.assertIs(tokenizeText(text), tokenizeText(text))
+
+    def test_split_commands(self):
+        self.assertEqual(
+            splitCommands("take lamp. n; open door then go east!"),
+            ["take lamp", "n", "open door", "go east"],
+        )
+
+    def test_split_commands_keeps_single_command_and_numbers(self):
+        self.assertEqual(splitCommands("look"), ["look"])
+        self.assertEqual(splitCommands("turn dial to 7.5"), ["turn dial to 7.5"])
+        self.assertEqual(splitCommands("..."), [])
+
+    def test_split_commands_needs_command_on_both_sides_of_then(self):
+        self.assertEqual(splitCommands("what happened then"), ["what happened then"])
+        self.assertEqual(splitCommands("then look"), ["then look"])
+
+
+class TestPhraseIndex(TestCase):
+    def setUp(self):
+        self.index = PhraseIndex()
+        self.index.add("ask about the lighthouse")
+        self.index.add("ask about the light")
+        self.index.add("tell him you are lost")
+
+    def test_match_requires_every_token(self):
+        self.assertEqual(self.index.match(["ask", "light"]), {"ask about the light"})
+        self.assertEqual(self.index.match(["ask", "boat"]), set())
+
+    def test_match_accepts_i_for_you(self):
+        self.assertEqual(self.index.match(["i", "lost"]), {"tell him you are lost"})
+
+    def test_rank_prefers_exact_match_to_prefix(self):
+        ranked = self.index.rank(["light"], prefixes=True)
+        self.assertEqual(
+            ranked, [("ask about the light", 0), ("ask about the lighthouse", 1)]
+        )
+
+    def test_rank_with_typos(self):
+        ranked = self.index.rank(["lihgthouse"], max_typos=2)
+        self.assertEqual(ranked, [("ask about the lighthouse", 2)])
+        self.assertEqual(self.index.rank(["lihgthouse"], max_typos=1), [])
+
+    def test_edit_distance(self):
+        self.assertEqual(editDistance("lamp", "lamb", 1), 1)
+        self.assertEqual(editDistance("lamp", "lamp", 0), 0)
+        self.assertIsNone(editDistance("lamp", "clamps", 1))
@@ -0,0 +1,16 @@
+from unittest import TestCase
+
+from intficpy.tools import lineDefinesNewIx
+
+
+class TestLineDefinesNewIx(TestCase):
+    def test_thing_defines_new_ix(self):
+        self.assertTrue(lineDefinesNewIx('lamp = Thing(game, "lamp")'))
+
+    def test_thing_with_key_does_not_define_new_ix(self):
+        self.assertFalse(lineDefinesNewIx('lamp = Thing(game, "lamp", key="lamp")'))
+        self.assertFalse(lineDefinesNewIx('lamp = Thing(game, "lamp", key = "lamp")'))
+
+    def test_other_arguments_ending_in_key_define_new_ix(self):
+        self.assertTrue(lineDefinesNewIx('monkey = Thing(game, "monkey"); monkey="x"'))
+        self.assertTrue(lineDefinesNewIx("bird = Thing(game, turkey=True)"))
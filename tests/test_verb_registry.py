@@ -0,0 +1,122 @@
+from .helpers import IFPTestCase
+
+from intficpy.verb import (
+    Verb,
+    DirectObjectVerb,
+    GetVerb,
+    LookVerb,
+    StandUpVerb,
+)
+from intficpy.verb_registry import VerbRegistry
+
+
+# subclass the base verbs indirectly, so these verbs are not added to the base
+# verb set of every new game
+class UnlistedVerb(Verb):
+    pass
+
+
+class UnlistedDirectObjectVerb(DirectObjectVerb):
+    pass
+
+
+class DanceVerb(UnlistedVerb):
+    word = "dance"
+    synonyms = ["boogie"]
+    syntax = [["dance"], ["dance", "all", "night"]]
+    keywords = ["all"]
+
+
+class TwirlVerb(UnlistedDirectObjectVerb):
+    word = "twirl"
+    syntax = [["twirl", "<dobj>"], ["twirl", "<dobj>", "around"]]
+    preposition = ["around"]
+    dscope = "near"
+
+
+class StompVerb(UnlistedVerb):
+    word = "dance"
+    syntax = [["dance"]]
+
+
+class TestVerbRegistry(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = VerbRegistry([DanceVerb, TwirlVerb])
+
+    def test_verbs_are_looked_up_by_word_and_synonym(self):
+        self.assertEqual(self.registry["dance"], [DanceVerb])
+        self.assertEqual(self.registry["boogie"], [DanceVerb])
+        self.assertIn("twirl", self.registry)
+        self.assertNotIn("jump", self.registry)
+
+    def test_secondary_indexes(self):
+        self.assertEqual(self.registry.with_keyword("all"), {DanceVerb})
+        self.assertEqual(self.registry.with_preposition("around"), {TwirlVerb})
+        self.assertEqual(self.registry.with_syntax_word("night"), {DanceVerb})
+        self.assertEqual(self.registry.with_syntax_word("<dobj>"), {TwirlVerb})
+        self.assertEqual(self.registry.with_arity(True, False), {TwirlVerb})
+        self.assertEqual(self.registry.with_arity(False, False), {DanceVerb})
+        self.assertEqual(self.registry.with_scope("near"), {TwirlVerb})
+
+    def test_unregister_removes_verb_from_all_indexes(self):
+        generation = self.registry.generation
+        self.registry.unregister(DanceVerb)
+
+        self.assertNotIn("dance", self.registry)
+        self.assertNotIn("boogie", self.registry)
+        self.assertFalse(self.registry.with_keyword("all"))
+        self.assertFalse(self.registry.with_arity(False, False))
+        self.assertEqual(self.registry.verbs, [TwirlVerb])
+        self.assertGreater(self.registry.generation, generation)
+
+
+class TestVerbsAtRuntime(IFPTestCase):
+    def test_add_and_remove_verb(self):
+        self.game.addVerb(DanceVerb)
+        self.game.turnMain("dance all night")
+        self.assertIs(self.game.parser.command.verb, DanceVerb)
+
+        self.game.removeVerb(DanceVerb)
+        self.game.turnMain("dance")
+        self.assertIsNone(self.game.parser.command.verb)
+
+    def test_removing_verb_keeps_other_verbs_for_word(self):
+        self.game.removeVerb(StandUpVerb)
+        self.assertNotIn(StandUpVerb, self.game.verbs["stand"])
+        self.assertNotIn(StandUpVerb, self.game.verbs["get"])
+        self.assertIn(GetVerb, self.game.verbs["get"])
+
+
+class TestMatchPrepKeywords(IFPTestCase):
+    def test_verbs_without_objects_that_cannot_use_preposition_are_removed(self):
+        self.game.parser.command.tokens = ["get", "up"]
+        self.game.parser.annotateCommand()
+        self.game.parser.command.verb_matches = list(self.game.verbs["get"])
+        self.game.parser.matchPrepKeywords()
+
+        self.assertIn(StandUpVerb, self.game.parser.command.verb_matches)
+        self.assertIn(GetVerb, self.game.parser.command.verb_matches)
+        for verb in self.game.parser.command.verb_matches:
+            self.assertTrue(
+                verb.hasDobj
+                or verb.hasIobj
+                or any("up" in form for form in verb.syntax),
+                f"{verb} cannot match 'get up'",
+            )
+
+    def test_command_without_prepositions_keeps_all_candidates(self):
+        self.game.parser.command.tokens = ["look"]
+        self.game.parser.annotateCommand()
+        self.game.parser.command.verb_matches = [LookVerb]
+        self.game.parser.matchPrepKeywords()
+        self.assertEqual(self.game.parser.command.verb_matches, [LookVerb])
+
+    def test_verbs_without_objects_must_declare_keyword(self):
+        self.game.addVerb(DanceVerb)
+        self.game.addVerb(StompVerb)
+        self.game.parser.command.tokens = ["dance", "all", "night"]
+        self.game.parser.annotateCommand()
+        self.game.parser.command.verb_matches = list(self.game.verbs["dance"])
+        self.game.parser.matchPrepKeywords()
+        self.assertEqual(self.game.parser.command.verb_matches, [DanceVerb])
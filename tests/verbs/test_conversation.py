@@ -5,6 +5,7 @@ from intficpy.actor import Actor, Topic, SpecialTopic
 from intficpy.thing_base import Thing
 from intficpy.verb import AskVerb, TellVerb, GiveVerb, ShowVerb
 from intficpy.room import Room
+from intficpy.storage import SQLiteEngine
 
 
 class TestLeadDirection(IFPTestCase):
@@ -95,6 +96,66 @@ class TestSpecialTopic(IFPTestCase):
         self.assertIn(self.text, self.app.print_stack)
 
 
+class TestSpecialTopicMatching(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.actor = Actor(self.game, "shepherd")
+        self.actor.moveTo(self.start_room)
+
+        self.help_text = "He nods gratefully."
+        self.help_topic = SpecialTopic(self.game, "ask if you can help", self.help_text)
+        self.actor.addSpecialTopic(self.help_topic)
+
+        self.sheep_text = "He points to the hills."
+        self.sheep_topic = SpecialTopic(
+            self.game, "ask where the sheep are", self.sheep_text
+        )
+        self.actor.addSpecialTopic(self.sheep_topic)
+
+    def test_i_and_you_are_interchangeable(self):
+        self.game.turnMain("hi")
+        self.game.turnMain("can i help")
+        self.assertIn(self.help_text, self.app.print_stack)
+
+    def test_ambiguous_response_does_not_match(self):
+        self.game.turnMain("hi")
+        self.game.turnMain("ask")
+        self.assertNotIn(self.help_text, self.app.print_stack)
+        self.assertNotIn(self.sheep_text, self.app.print_stack)
+
+    def test_alternate_phrasing_added_after_topic(self):
+        self.sheep_topic.addAlternatePhrasing("where is the flock")
+        self.assertIs(
+            self.actor.special_topics_alternate_keys["where is the flock"],
+            self.sheep_topic,
+        )
+        self.game.turnMain("hi")
+        self.game.turnMain("flock")
+        self.assertIn(self.sheep_text, self.app.print_stack)
+
+    def test_removed_topic_is_removed_from_index(self):
+        self.actor.removeSpecialTopic(self.sheep_topic)
+        self.assertNotIn("ask where the sheep are", self.actor.special_topic_index)
+        self.assertEqual(
+            self.actor.special_topic_index.match(["ask"]), {"ask if you can help"}
+        )
+
+    def test_index_is_rebuilt_when_topics_are_replaced(self):
+        self.actor.special_topics = {"ask if you can help": self.help_topic}
+        self.assertEqual(self.actor.special_topic_index.match(["sheep"]), set())
+
+    def test_index_is_not_stored_with_actor(self):
+        index = self.actor.special_topic_index
+        self.assertNotIn(index, self.actor.__dict__.values())
+
+        storage = SQLiteEngine(self.game)
+        self.game.storage = storage
+        storage.store_all()
+        self.assertTrue(storage.is_stored(self.actor))
+        storage.close()
+
+
 class TestTalkTo(IFPTestCase):
     def setUp(self):
         super().setUp()
@@ -1,4 +1,4 @@
-from intficpy.score import HintNode, Hint
+from intficpy.score import Achievement, HintNode, Hint
 
 from ..helpers import IFPTestCase
 
@@ -16,3 +16,49 @@ class TestHintVerb(IFPTestCase):
         self.game.turnMain("hint")
         self.assertIn("1/1", self.app.print_stack.pop())
         self.assertIn(HINT_TEXT, self.app.print_stack.pop())
+
+
+class TestPendingHintNodes(IFPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = HintNode(self.game, [Hint(self.game, "Find the key.")])
+        self.second = HintNode(self.game, [Hint(self.game, "Open the door.")])
+        self.second.open_require_nodes_complete = [self.first]
+
+    def test_pending_node_opens_when_prerequisite_completes(self):
+        self.game.hints.setNode(self.game, self.second)
+        self.assertIn(self.second, self.game.hints.pending)
+        self.assertIsNot(self.game.hints.cur_node, self.second)
+
+        self.first.complete = True
+        self.assertNotIn(self.second, self.game.hints.pending)
+        self.assertIs(self.game.hints.cur_node, self.second)
+
+    def test_pending_node_opens_when_last_achievement_awarded(self):
+        achievements = [
+            Achievement(self.game, 1, "one"),
+            Achievement(self.game, 1, "two"),
+        ]
+        self.second.open_require_nodes_complete = []
+        self.second.open_require_achievements = achievements
+        self.game.hints.setNode(self.game, self.second)
+
+        achievements[0].award(self.game)
+        self.assertIn(self.second, self.game.hints.pending)
+
+        achievements[1].award(self.game)
+        self.assertIs(self.game.hints.cur_node, self.second)
+
+    def test_pending_node_closed_when_required_incomplete_node_completes(self):
+        third = HintNode(self.game, [Hint(self.game, "Knock.")])
+        third.open_require_nodes_complete = [self.first]
+        third.open_require_nodes_incomplete = [self.second]
+        self.game.hints.setNode(self.game, third)
+
+        self.second.complete = True
+        self.assertNotIn(third, self.game.hints.pending)
+        self.assertTrue(third.complete)
+
+    def test_pending_daemon_not_scheduled(self):
+        self.game.hints.setNode(self.game, self.second)
+        self.assertFalse(self.game.daemons.isScheduled(self.game.hints.pending_daemon))